@@ -1,22 +1,55 @@
 import os
-import threading
+import json
+import time
 import uuid
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 from supabase import create_client, Client
-import subprocess
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-import requests
-import zipfile
-import shutil
+import cekirdek
+from cekirdek import (
+    GOREV_DIZINI, metrikler, indirme_motoru, donusturucu,
+    playlist_id_cikar, playlist_zipi_hazirla, gorev_dosyalarini_sil
+)
+from gorev_durumu import GorevDurumDeposu, BITIS_DURUMLARI
+from is_kuyrugu import IsKuyrugu, IsciHavuzu, KuyrukDolu, GorevIptalEdildi
+from istemciler import spotify_istemcisi, http_oturumu
+from teslim_kaydi import TeslimKaydi
+from yukleme import TusYukleyici
+from ortak_depo import OrtakParcaDeposu
 
 # ENV DEĞİŞKENLERİ
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 PORT = os.environ.get("PORT", "8080")
-SPOTIFY_CLIENT_ID = os.environ.get("SPOTIFY_CLIENT_ID")
-SPOTIFY_CLIENT_SECRET = os.environ.get("SPOTIFY_CLIENT_SECRET")
-YT_KEY = os.environ.get("YT_KEY")
+# Tüm örneklerin paylaştığı Storage parça deposu (yerel önbellekten sonra bakılır)
+ORTAK_DEPO = os.environ.get("ORTAK_DEPO", "1") == "1"
+ORTAK_DEPO_KOVASI = os.environ.get("ORTAK_DEPO_KOVASI", "downloads")
+ORTAK_DEPO_TABLOSU = os.environ.get("ORTAK_DEPO_TABLOSU", "parca_deposu")
+# Senkron mod: playlist başına teslim edilmiş şarkıların kaydı
+TESLIM_KAYDI_YOLU = os.environ.get("TESLIM_KAYDI_YOLU", "/tmp/nexus-veri/teslim.db")
+# İlerleme güncellemelerinin gorevler tablosuna en sık yazılma aralığı (saniye)
+DURUM_YAZMA_ARALIGI = float(os.environ.get("DURUM_YAZMA_ARALIGI", "5"))
+# Yazılamayan bir durum güncellemesi en fazla bu kadar kez denenir
+DURUM_YAZMA_DENEMESI = int(os.environ.get("DURUM_YAZMA_DENEMESI", "5"))
+# Kalıcı iş kuyruğu: süreç başına iş işçisi, tüm süreçlerde toplam çalışan ve bekleyen iş sınırı
+IS_KUYRUGU_YOLU = os.environ.get("IS_KUYRUGU_YOLU", "/tmp/nexus-veri/kuyruk.db")
+IS_ISCI_SAYISI = max(1, int(os.environ.get("IS_ISCI_SAYISI", "8")))
+MAKS_CALISAN_IS = int(os.environ.get("MAKS_CALISAN_IS", str(IS_ISCI_SAYISI)))
+MAKS_BEKLEYEN_IS = int(os.environ.get("MAKS_BEKLEYEN_IS", "50"))
+# Aynı playlist+snapshot+format için biten bir işin ZIP'i bu süre (saniye) boyunca yeniden kullanılır
+HAZIR_SONUC_SURESI = int(os.environ.get("HAZIR_SONUC_SURESI", str(6 * 3600)))
+# Süreç çökmesiyle yarıda kalan bir iş en fazla bu kadar kez yeniden denenir
+MAKS_IS_DENEMESI = int(os.environ.get("MAKS_IS_DENEMESI", "3"))
+# SSE akışı: tek bağlantının en uzun süresi ve başka süreçteki görevler için Supabase okuma aralığı.
+# gunicorn.conf.py gthread worker kullanır; sync worker'la çalıştırılırsa SSE_MAKS_SURE gunicorn
+# timeout'undan (varsayılan 30 sn) kısa tutulmalıdır, yoksa worker öldürülür
+SSE_MAKS_SURE = int(os.environ.get("SSE_MAKS_SURE", "300"))
+SSE_UZAK_OKUMA_ARALIGI = int(os.environ.get("SSE_UZAK_OKUMA_ARALIGI", "5"))
+# Storage'a resumable yüklemede parça boyutu (Supabase son parça dışında 6 MB bekler)
+YUKLEME_PARCA_BOYUTU = int(os.environ.get("YUKLEME_PARCA_BOYUTU", str(6 * 1024 * 1024)))
+# Bu kadar saniye durumu sorgulanmayan (istemcisi gitmiş) görevler iptal edilir (0 = kapalı)
+IPTAL_YOKLAMA_SURESI = int(os.environ.get("IPTAL_YOKLAMA_SURESI", "900"))
+# Yoklamalar kuyruğa görev başına en fazla bu aralıkla (saniye) yazılır
+YOKLAMA_YAZMA_ARALIGI = 30
 
 # Template ve static folder path'lerini açıkça belirt
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -31,274 +64,247 @@ app = Flask(__name__,
 # Supabase Setup
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Gunicorn'un tüm worker süreçleri aynı kuyruk dosyasını paylaşır
+is_kuyrugu = IsKuyrugu(
+    IS_KUYRUGU_YOLU,
+    maks_bekleyen=MAKS_BEKLEYEN_IS,
+    maks_calisan=MAKS_CALISAN_IS,
+    sonuc_saklama=HAZIR_SONUC_SURESI
+)
+
+# Görev durumları bellekte tutulur, gorevler tablosuna arka planda yazılır;
+# aynı işe bağlanan görevlerin satırları da birlikte güncellenir
+durum_deposu = GorevDurumDeposu(
+    supabase,
+    yazma_araligi=DURUM_YAZMA_ARALIGI,
+    maks_deneme=DURUM_YAZMA_DENEMESI,
+    takipci_bul=is_kuyrugu.takipciler
+)
+
+# Diğer örneklerle paylaşılan parça deposu; çekirdekteki indirme hattı yerel önbellekten sonra buna bakar
+ortak_depo = OrtakParcaDeposu(
+    supabase, http_oturumu, SUPABASE_URL, SUPABASE_KEY, ORTAK_DEPO_KOVASI, ORTAK_DEPO_TABLOSU,
+    gecici_dizin=os.path.join(GOREV_DIZINI, "nexus-ortak")
+) if ORTAK_DEPO else None
+cekirdek.ortak_depo = ortak_depo
+teslim_kaydi = TeslimKaydi(TESLIM_KAYDI_YOLU)
+
 # CORS için basit header ekle
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,POST,OPTIONS')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,POST,DELETE,OPTIONS')
     return response
 
-# YT-DLP ve FFmpeg ile indirme fonksiyonu
-def yt_dlp_ile_indir_ve_donustur(youtube_url, sarki_adi, output_format, output_dir):
-    """YouTube'dan şarkıyı indirir ve belirtilen formata çevirir"""
-    try:
-        # Güvenli dosya adı oluştur
-        safe_filename = "".join(c for c in sarki_adi if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        if not safe_filename:
-            safe_filename = str(uuid.uuid4())[:8]
-        
-        output_path = os.path.join(output_dir, f"{safe_filename}.{output_format}")
-        
-        # yt-dlp komutu
-        command = [
-            'yt-dlp',
-            '-x',  # Sadece ses
-            '--audio-format', output_format,
-            '--audio-quality', '0',  # En iyi kalite
-            '-o', output_path.replace(f'.{output_format}', '.%(ext)s'),
-            '--no-playlist',
-            '--quiet',
-            '--no-warnings',
-            youtube_url
-        ]
-        
-        # İndirme işlemini çalıştır
-        result = subprocess.run(command, capture_output=True, text=True, timeout=300)
-        
-        if result.returncode == 0:
-            # Başarılı, dosyayı bul
-            possible_extensions = ['mp3', 'm4a', 'opus', 'wav', 'webm']
-            for ext in possible_extensions:
-                test_path = output_path.replace(f'.{output_format}', f'.{ext}')
-                if os.path.exists(test_path):
-                    # Doğru formatta değilse ffmpeg ile çevir
-                    if ext != output_format:
-                        final_path = output_path
-                        convert_cmd = [
-                            'ffmpeg', '-i', test_path,
-                            '-acodec', 'libmp3lame' if output_format == 'mp3' else 'copy',
-                            '-q:a', '0',
-                            '-y',
-                            final_path
-                        ]
-                        subprocess.run(convert_cmd, capture_output=True, timeout=60)
-                        os.remove(test_path)
-                        return final_path
-                    return test_path
-            
-            return output_path if os.path.exists(output_path) else None
-        else:
-            print(f"yt-dlp hata: {result.stderr}")
-            return None
-            
-    except Exception as e:
-        print(f"İndirme hatası: {str(e)}")
-        return None
-
-def spotify_playlist_parcala(playlist_url):
-    """Spotify playlist'inden şarkı bilgilerini çeker"""
-    try:
-        auth_manager = SpotifyClientCredentials(
-            client_id=SPOTIFY_CLIENT_ID,
-            client_secret=SPOTIFY_CLIENT_SECRET
-        )
-        sp = spotipy.Spotify(auth_manager=auth_manager)
-        
-        # Playlist ID'sini URL'den çıkar
-        playlist_id = playlist_url.split('/')[-1].split('?')[0]
-        
-        sarki_listesi = []
-        offset = 0
-        limit = 100
-        
-        while True:
-            results = sp.playlist_items(
-                playlist_id, 
-                fields='items.track(name,artists.name),next',
-                limit=limit,
-                offset=offset
-            )
-            
-            for item in results['items']:
-                track = item.get('track')
-                if track and track.get('name'):
-                    sanatci = track['artists'][0]['name'] if track.get('artists') else "Unknown Artist"
-                    sarki_adi = track['name']
-                    
-                    sarki_listesi.append({
-                        'sanatci': sanatci,
-                        'sarki_adi': sarki_adi,
-                        'arama_sorgusu': f"{sanatci} - {sarki_adi}"
-                    })
-            
-            # Sonraki sayfa var mı kontrol et
-            if results['next']:
-                offset += limit
-            else:
-                break
-        
-        return sarki_listesi
-        
-    except Exception as e:
-        print(f"Spotify hatası: {str(e)}")
-        raise ValueError(f"Spotify playlist okunamadı: {str(e)}")
-
-def youtube_video_ara(sorgu):
-    """YouTube Data API kullanarak video arar"""
-    try:
-        API_URL = "https://www.googleapis.com/youtube/v3/search"
-        
-        params = {
-            'part': 'snippet',
-            'q': sorgu,
-            'key': YT_KEY,
-            'type': 'video',
-            'maxResults': 1,
-            'videoCategoryId': '10'  # Müzik kategorisi
-        }
-        
-        response = requests.get(API_URL, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get('items'):
-            video_id = data['items'][0]['id']['videoId']
-            return f"https://www.youtube.com/watch?v={video_id}"
-        else:
-            return "BULUNAMADI"
-            
-    except Exception as e:
-        print(f"YouTube API Hatası: {str(e)}")
-        return "API_HATASI"
+def zip_yukle(zip_yolu, dosya_adi, ilerleme=None):
+    """ZIP'i Supabase Storage'a parça parça (resumable) yükler ve public URL'ini döner"""
+    file_path = f"downloads/{dosya_adi}"
+    # Oturum fork sonrası yeniden kurulduğundan yükleyici her çağrıda oluşturulur
+    yukleyici = TusYukleyici(http_oturumu(), SUPABASE_URL, SUPABASE_KEY, parca_boyutu=YUKLEME_PARCA_BOYUTU)
+    yukleyici.yukle(zip_yolu, "downloads", file_path, ilerleme=ilerleme)
+    return supabase.storage.from_("downloads").get_public_url(file_path)
 
 # ARKA PLAN İŞLEMİ (CELERYsiz - Threading ile)
-def toplu_indirme_gorevi(playlist_url, output_format, gorev_id):
-    """Arkaplanda çalışan indirme görevi"""
-    temp_dir = os.path.join("/tmp", str(gorev_id))
-    os.makedirs(temp_dir, exist_ok=True)
+def toplu_indirme_gorevi(playlist_url, output_format, gorev_id, senkron_anahtari=None, tam_arsiv=False, iptal=None,
+                         snapshot_id=None):
+    """Arkaplanda çalışan indirme görevi: ZIP'i çekirdekte hazırlar, Storage'a yükler ve durumu yazar.
+    
+    senkron_anahtari verilirse (senkron mod) yalnızca bu playlist'ten o anahtara daha önce teslim
+    edilmemiş şarkılar işlenir (delta ZIP); tam_arsiv=True ise önceki şarkılar da eklenmiş ikinci
+    bir ZIP hazırlanır.
+    Süreç ölür ve görev kuyruktan yeniden alınırsa ZIP'e yazılmış şarkılar atlanır.
+    
+    iptal (threading.Event) kurulunca görev ilk fırsatta İPTAL durumuna geçer ve dosyaları silinir.
+    """
+    gorev_baslangici = time.perf_counter()
+    senkron = senkron_anahtari is not None
     
     try:
         # Görev durumunu başlat - İLERLEME MUTLAKA EKLENMELİ
-        supabase.table("gorevler").insert({
-            "id": gorev_id,
-            "durum": "BAŞLADI",
-            "kaynak": playlist_url,
-            "ilerleme": "0/0",
-            "indirme_url": None,
-            "hata_mesaji": None
-        }).execute()
-        
-        print(f"[{gorev_id}] Playlist parsing başladı...")
-        
-        # Spotify playlist'i parse et
-        sarki_listesi = spotify_playlist_parcala(playlist_url)
-        toplam_sarki = len(sarki_listesi)
-        
-        if toplam_sarki == 0:
-            raise Exception("Playlist'te şarkı bulunamadı")
-        
-        # Toplam şarkı sayısını güncelle
-        supabase.table("gorevler").update({
-            "ilerleme": f"0/{toplam_sarki}",
-            "durum": "İŞLENİYOR"
-        }).eq("id", gorev_id).execute()
-        
-        print(f"[{gorev_id}] {toplam_sarki} şarkı bulundu")
-        
-        mp3_yollari = []
-        
-        for i, sarki in enumerate(sarki_listesi):
-            try:
-                # İlerlemeyi güncelle - Her şarkıda
-                current_progress = f"{i+1}/{toplam_sarki}"
-                supabase.table("gorevler").update({
-                    "ilerleme": current_progress,
-                    "durum": "İŞLENİYOR"
-                }).eq("id", gorev_id).execute()
-                
-                print(f"[{gorev_id}] İşleniyor ({current_progress}): {sarki['arama_sorgusu']}")
-                
-                # YouTube'da ara
-                youtube_url = youtube_video_ara(sarki['arama_sorgusu'])
-                
-                if "BULUNAMADI" in youtube_url or "API_HATASI" in youtube_url:
-                    print(f"[{gorev_id}] Atlandı: {sarki['arama_sorgusu']}")
-                    continue
-                
-                # İndir ve çevir
-                downloaded_file = yt_dlp_ile_indir_ve_donustur(
-                    youtube_url,
-                    sarki['arama_sorgusu'],
-                    output_format,
-                    temp_dir
-                )
-                
-                if downloaded_file and os.path.exists(downloaded_file):
-                    mp3_yollari.append(downloaded_file)
-                    print(f"[{gorev_id}] Başarılı: {os.path.basename(downloaded_file)}")
-                    
-            except Exception as e:
-                print(f"[{gorev_id}] Şarkı hatası ({sarki['arama_sorgusu']}): {str(e)}")
-                continue
+        durum_deposu.olustur(
+            gorev_id,
+            durum="BAŞLADI",
+            kaynak=playlist_url,
+            ilerleme="0/0",
+            indirme_url=None,
+            hata_mesaji=None
+        )
         
-        if not mp3_yollari:
-            raise Exception("Hiçbir şarkı indirilemedi")
+        playlist_id = playlist_id_cikar(playlist_url)
         
-        print(f"[{gorev_id}] ZIP oluşturuluyor... ({len(mp3_yollari)} dosya)")
+        def iptal_kontrol():
+            if iptal is not None and iptal.is_set():
+                raise GorevIptalEdildi("Görev iptal edildi.")
         
-        # ZIP durumunu göster
-        supabase.table("gorevler").update({
-            "ilerleme": f"{len(mp3_yollari)}/{toplam_sarki}",
-            "durum": "ZIP OLUŞTURULUYOR"
-        }).eq("id", gorev_id).execute()
+        def ilerleme_bildir(tamamlanan, toplam):
+            # Tabloya seyrekleştirilerek yazılır
+            durum_deposu.guncelle(
+                gorev_id,
+                ilerleme=f"{tamamlanan}/{toplam if toplam is not None else '?'}",
+                durum="İŞLENİYOR"
+            )
         
-        # ZIP oluştur
-        zip_cikti_yolu = os.path.join("/tmp", f"{gorev_id}.zip")
-        with zipfile.ZipFile(zip_cikti_yolu, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for mp3_yolu in mp3_yollari:
-                zipf.write(mp3_yolu, os.path.basename(mp3_yolu))
+        sonuc = playlist_zipi_hazirla(
+            playlist_url, output_format, gorev_id,
+            onceki_teslimler=teslim_kaydi.teslimler(senkron_anahtari, playlist_id, output_format) if senkron else None,
+            tam_arsiv=tam_arsiv,
+            ilerleme_bildir=ilerleme_bildir,
+            iptal=iptal,
+            snapshot_id=snapshot_id
+        )
+        iptal_kontrol()
         
         print(f"[{gorev_id}] Supabase'e yükleniyor...")
         
         # Upload durumu
-        supabase.table("gorevler").update({
-            "durum": "YÜKLENIYOR"
-        }).eq("id", gorev_id).execute()
+        durum_deposu.guncelle(
+            gorev_id,
+            ilerleme=f"{sonuc.eklenen}/{sonuc.toplam}",
+            durum="YÜKLENIYOR"
+        )
+        
+        # Yükleme yüzdesi, yüklenecek tüm ZIP'lerin toplam baytı üzerinden hesaplanır
+        yuklenecekler = [yol for yol, adet in ((sonuc.zip_yolu, sonuc.eklenen), (sonuc.tam_zip_yolu, sonuc.tam_eklenen)) if adet]
+        toplam_bayt = sum(os.path.getsize(yol) for yol in yuklenecekler) or 1
+        biten_bayt = 0
         
-        # Supabase Storage'a yükle
-        file_path = f"downloads/{gorev_id}.zip"
-        with open(zip_cikti_yolu, 'rb') as f:
-            supabase.storage.from_("downloads").upload(file_path, f.read())
+        def yukleme_ilerlemesi(gonderilen, _):
+            # Fırlatılan iptal yüklemeyi parça sınırında keser
+            iptal_kontrol()
+            durum_deposu.guncelle(gorev_id, yukleme_yuzdesi=int(100 * (biten_bayt + gonderilen) / toplam_bayt))
         
-        # Public URL al
-        indirme_linki = supabase.storage.from_("downloads").get_public_url(file_path)
+        # Supabase Storage'a yükle (senkronda yeni şarkı yoksa delta ZIP yüklenmez)
+        with metrikler.olc("yukleme", gorev_id):
+            indirme_linki = None
+            if sonuc.eklenen:
+                indirme_linki = zip_yukle(sonuc.zip_yolu, f"{gorev_id}.zip", yukleme_ilerlemesi)
+                biten_bayt += os.path.getsize(sonuc.zip_yolu)
+            tam_arsiv_linki = zip_yukle(sonuc.tam_zip_yolu, f"{gorev_id}_tam.zip", yukleme_ilerlemesi) if sonuc.tam_eklenen else None
+        
+        if senkron:
+            teslim_kaydi.kaydet(senkron_anahtari, playlist_id, output_format, sonuc.yeni_teslimler)
         
         # Görevi tamamla
-        supabase.table("gorevler").update({
+        tamamlama = {
             "durum": "TAMAMLANDI",
             "indirme_url": indirme_linki,
-            "ilerleme": f"{len(mp3_yollari)}/{toplam_sarki}"
-        }).eq("id", gorev_id).execute()
+            "ilerleme": f"{sonuc.eklenen}/{sonuc.toplam}"
+        }
+        if tam_arsiv_linki:
+            tamamlama["tam_arsiv_url"] = tam_arsiv_linki
+        if senkron and not sonuc.eklenen:
+            tamamlama["hata_mesaji"] = "Playlist'te yeni şarkı yok."
+        metrikler.kaydet("gorev", time.perf_counter() - gorev_baslangici, gorev_id)
+        metrikler.say("gorev", durum="TAMAMLANDI")
+        tamamlama["zamanlama"] = metrikler.gorev_ozeti(gorev_id)
+        durum_deposu.guncelle(gorev_id, **tamamlama)
         
         print(f"[{gorev_id}] TAMAMLANDI! Link: {indirme_linki}")
         
         # Temizlik
-        shutil.rmtree(temp_dir, ignore_errors=True)
-        if os.path.exists(zip_cikti_yolu):
-            os.remove(zip_cikti_yolu)
+        gorev_dosyalarini_sil(gorev_id)
+        
+    except GorevIptalEdildi as e:
+        print(f"[{gorev_id}] İPTAL EDİLDİ")
+        
+        metrikler.kaydet("gorev", time.perf_counter() - gorev_baslangici, gorev_id)
+        metrikler.say("gorev", durum="İPTAL")
+        durum_deposu.guncelle(
+            gorev_id,
+            durum="İPTAL",
+            hata_mesaji=str(e),
+            zamanlama=metrikler.gorev_ozeti(gorev_id)
+        )
+        gorev_dosyalarini_sil(gorev_id)
         
     except Exception as e:
         hata_mesaji = str(e)
         print(f"[{gorev_id}] GENEL HATA: {hata_mesaji}")
         
-        supabase.table("gorevler").update({
-            "durum": "HATA",
-            "hata_mesaji": hata_mesaji
-        }).eq("id", gorev_id).execute()
+        metrikler.kaydet("gorev", time.perf_counter() - gorev_baslangici, gorev_id)
+        metrikler.say("gorev", durum="HATA")
+        durum_deposu.guncelle(
+            gorev_id,
+            durum="HATA",
+            hata_mesaji=hata_mesaji,
+            zamanlama=metrikler.gorev_ozeti(gorev_id)
+        )
         
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir, ignore_errors=True)
+        gorev_dosyalarini_sil(gorev_id)
+    
+    finally:
+        # Hangi durumla biterse bitsin görevin ölçümleri bellekte kalmaz; iptal sonrası
+        # bitmeye devam eden indirme/dönüştürmelerin ölçümleri görev özetine eklenmez
+        metrikler.gorevi_bitir(gorev_id)
+
+def kuyruktaki_isi_calistir(is_):
+    """Kuyruktan kiralanan işi çalıştırır"""
+    if is_['deneme'] > MAKS_IS_DENEMESI:
+        print(f"[{is_['id']}] {MAKS_IS_DENEMESI} denemede tamamlanamadı, bırakılıyor")
+        # Yarıda kalan denemelerin dosyaları
+        gorev_dosyalarini_sil(is_['id'])
+        durum_deposu.guncelle(
+            is_['id'],
+            durum="HATA",
+            hata_mesaji="Görev tekrar tekrar yarıda kaldı."
+        )
+        return
+    secenekler = is_.get('secenekler') or {}
+    toplu_indirme_gorevi(
+        is_['playlist_url'],
+        is_['output_format'],
+        is_['id'],
+        senkron_anahtari=secenekler.get('senkron_anahtari'),
+        tam_arsiv=secenekler.get('tam_arsiv', False),
+        iptal=is_.get('iptal'),
+        snapshot_id=secenekler.get('snapshot_id')
+    )
+    
+    # Aynı anahtarla gelecek istekler bu ZIP'i yeniden kullanır (senkron delta'sı tek kullanımlıktır:
+    # teslim geçmişine yazıldığından sonraki senkron yalnızca yeni şarkıları almalı)
+    son_durum = durum_deposu.al(is_['id']) or {}
+    if is_.get('anahtar') and not secenekler.get('senkron_anahtari') and \
+            son_durum.get('durum') == "TAMAMLANDI" and son_durum.get('indirme_url'):
+        is_kuyrugu.sonuc_kaydet(is_['anahtar'], is_['id'], son_durum['indirme_url'], son_durum.get('ilerleme'))
+
+def playlist_snapshot_al(playlist_url):
+    """Playlist'in güncel snapshot_id'si; okunamazsa None (iş yine kuyruğa alınır, yalnızca birleştirilmez).
+
+    Okunan değer işin seçeneklerine yazılır; işçi playlist'i okurken aynı isteği tekrarlamaz.
+    """
+    try:
+        return spotify_istemcisi().playlist(playlist_id_cikar(playlist_url), fields='snapshot_id')['snapshot_id']
+    except Exception as e:
+        print(f"Playlist snapshot'ı alınamadı: {str(e)}")
+        return None
+
+def is_birlestirme_anahtari(playlist_url, output_format, snapshot_id):
+    """Aynı içeriği üretecek işleri eşleştiren anahtar (playlist + snapshot + format); snapshot yoksa None"""
+    if not snapshot_id:
+        return None
+    return f"{playlist_id_cikar(playlist_url)}:{snapshot_id}:{output_format}"
+
+def surecleri_durdur(gorev_id):
+    """İptal edilen görevin çalışan yt-dlp ve ffmpeg süreçlerini öldürür"""
+    indirilen = indirme_motoru.iptal_et(gorev_id)
+    donusturulen = donusturucu.iptal_et(gorev_id)
+    print(f"[{gorev_id}] İptal: {indirilen} indirme, {donusturulen} dönüştürme durduruldu")
+
+def bekleyen_iptal_edildi(gorev_id):
+    """Sırası gelmeden yoklanmadığı için kuyruktan silinen görev"""
+    durum_deposu.guncelle(gorev_id, durum="İPTAL", hata_mesaji="Görev takip edilmediği için iptal edildi.")
+
+# Havuz, süreç başlarken çalıştırılır (gunicorn'da post_worker_init, bkz. gunicorn.conf.py;
+# doğrudan çalıştırmada __main__): kuyruktaki işler ilk HTTP isteğini beklemez
+is_havuzu = IsciHavuzu(
+    is_kuyrugu,
+    kuyruktaki_isi_calistir,
+    isci_sayisi=IS_ISCI_SAYISI,
+    sessiz_sure=IPTAL_YOKLAMA_SURESI,
+    iptal_cagrisi=surecleri_durdur,
+    bekleyen_iptal_cagrisi=bekleyen_iptal_edildi
+)
 
 # FLASK ROUTE'LAR
 @app.route('/')
@@ -441,36 +447,89 @@ def index():
                         statusText.textContent = '✓ Download started! Tracking progress...';
                         const taskId = data.task_id;
                         
-                        const checkStatus = setInterval(async () => {
-                            try {
-                                const statusRes = await fetch('/api/status/' + taskId);
-                                const statusData = await statusRes.json();
-                                
-                                if (statusData.status === 'TAMAMLANDI') {
-                                    clearInterval(checkStatus);
-                                    statusDiv.classList.add('success');
-                                    statusText.textContent = '✓ Download Complete!';
-                                    progressDiv.textContent = 'Files: ' + statusData.ilerleme;
-                                    downloadLink.innerHTML = '<a href="' + statusData.link + '" download>📥 Download ZIP File</a>';
-                                    submitBtn.disabled = false;
-                                    submitBtn.textContent = '🚀 Start Download';
-                                    
-                                } else if (statusData.status === 'HATA') {
-                                    clearInterval(checkStatus);
-                                    statusDiv.classList.add('error');
-                                    statusText.textContent = '✗ Error: ' + (statusData.message || 'Unknown error');
-                                    progressDiv.textContent = '';
-                                    submitBtn.disabled = false;
-                                    submitBtn.textContent = '🚀 Start Download';
-                                    
+                        // Returns true once the task reaches a final state
+                        const handleStatus = (statusData) => {
+                            if (statusData.status === 'TAMAMLANDI') {
+                                statusDiv.classList.add('success');
+                                statusText.textContent = '✓ Download Complete!';
+                                progressDiv.textContent = 'Files: ' + statusData.ilerleme;
+                                // Senkronda yeni şarkı yoksa delta linki gelmez
+                                const link = statusData.link || statusData.tam_link;
+                                if (link) {
+                                    downloadLink.innerHTML = '<a href="' + link + '" download>📥 Download ZIP File</a>';
                                 } else {
-                                    statusText.textContent = '⏳ Status: ' + statusData.status;
-                                    progressDiv.textContent = 'Progress: ' + (statusData.ilerleme || '0/0');
+                                    statusText.textContent = '✓ ' + (statusData.message || 'No new tracks');
+                                    downloadLink.innerHTML = '';
                                 }
-                            } catch (err) {
-                                console.error('Status check error:', err);
+                                submitBtn.disabled = false;
+                                submitBtn.textContent = '🚀 Start Download';
+                                return true;
+                                
+                            } else if (statusData.status === 'HATA') {
+                                statusDiv.classList.add('error');
+                                statusText.textContent = '✗ Error: ' + (statusData.message || 'Unknown error');
+                                progressDiv.textContent = '';
+                                submitBtn.disabled = false;
+                                submitBtn.textContent = '🚀 Start Download';
+                                return true;
+                                
+                            } else if (statusData.status === 'İPTAL') {
+                                statusText.textContent = '✗ Cancelled: ' + (statusData.message || 'Task was cancelled');
+                                progressDiv.textContent = '';
+                                submitBtn.disabled = false;
+                                submitBtn.textContent = '🚀 Start Download';
+                                return true;
+                                
+                            } else if (statusData.kuyruk_sirasi) {
+                                statusText.textContent = '⏳ Queued, position ' + statusData.kuyruk_sirasi;
+                                return false;
+                                
+                            } else if (statusData.yukleme_yuzdesi !== undefined) {
+                                statusText.textContent = '⏳ Uploading: ' + statusData.yukleme_yuzdesi + '%';
+                                progressDiv.textContent = 'Progress: ' + (statusData.ilerleme || '0/0');
+                                return false;
+                                
+                            } else {
+                                statusText.textContent = '⏳ Status: ' + statusData.status;
+                                progressDiv.textContent = 'Progress: ' + (statusData.ilerleme || '0/0');
+                                return false;
                             }
-                        }, 3000);
+                        };
+                        
+                        // Polling is only a fallback when the event stream is unavailable
+                        const startPolling = () => {
+                            const checkStatus = setInterval(async () => {
+                                try {
+                                    const statusRes = await fetch('/api/status/' + taskId);
+                                    const statusData = await statusRes.json();
+                                    if (handleStatus(statusData)) {
+                                        clearInterval(checkStatus);
+                                    }
+                                } catch (err) {
+                                    console.error('Status check error:', err);
+                                }
+                            }, 3000);
+                        };
+                        
+                        if (window.EventSource) {
+                            const events = new EventSource('/api/status/' + taskId + '/events');
+                            let errorCount = 0;
+                            events.onmessage = (ev) => {
+                                errorCount = 0;
+                                if (handleStatus(JSON.parse(ev.data))) {
+                                    events.close();
+                                }
+                            };
+                            events.onerror = () => {
+                                errorCount++;
+                                if (events.readyState === EventSource.CLOSED || errorCount > 3) {
+                                    events.close();
+                                    startPolling();
+                                }
+                            };
+                        } else {
+                            startPolling();
+                        }
                         
                     } catch (err) {
                         statusDiv.classList.add('error');
@@ -490,10 +549,18 @@ def handle_spotify_download():
     try:
         playlist_url = request.form.get('playlist_url')
         output_format = request.form.get('output_format', 'mp3')
+        # mod=senkron: yalnızca önceki teslimden sonra eklenen şarkılar (tam_arsiv=1 ile tam ZIP de).
+        # Teslim geçmişi istemcinin gönderdiği senkron_anahtari'na (kullanıcı/cihaz) göre tutulur.
+        senkron = request.form.get('mod') == 'senkron'
+        senkron_anahtari = (request.form.get('senkron_anahtari') or '').strip() if senkron else None
+        tam_arsiv = request.form.get('tam_arsiv') in ('1', 'true', 'on')
         
         if not playlist_url:
             return jsonify({"success": False, "message": "Playlist URL gerekli."}), 400
         
+        if senkron and not 0 < len(senkron_anahtari) <= 128:
+            return jsonify({"success": False, "message": "Senkron mod için senkron_anahtari (en fazla 128 karakter) gerekli."}), 400
+        
         # Validate Spotify URL
         if 'spotify.com/playlist/' not in playlist_url:
             return jsonify({"success": False, "message": "Geçersiz Spotify playlist URL'i."}), 400
@@ -501,36 +568,158 @@ def handle_spotify_download():
         # Unique task ID oluştur
         task_id = str(uuid.uuid4())
         
-        # Thread başlat (arkaplanda çalışır)
-        thread = threading.Thread(
-            target=toplu_indirme_gorevi,
-            args=(playlist_url, output_format, task_id),
-            daemon=True
-        )
-        thread.start()
+        # Aynı playlist aynı anda birden çok kez istenirse tek iş çalışır. Senkron sonucu anahtarın
+        # teslim geçmişine bağlı olduğundan yalnızca aynı senkron anahtarlı istekler birleşir.
+        snapshot_id = playlist_snapshot_al(playlist_url)
+        anahtar = is_birlestirme_anahtari(playlist_url, output_format, snapshot_id)
+        if anahtar and senkron:
+            anahtar = f"senkron:{senkron_anahtari}:{int(tam_arsiv)}:{anahtar}"
+        
+        # Kalıcı kuyruğa ekle; işçiler sırası gelince çalıştırır
+        try:
+            kuyruk_sonucu = is_kuyrugu.ekle(
+                task_id, playlist_url, output_format,
+                secenekler={"senkron_anahtari": senkron_anahtari, "tam_arsiv": tam_arsiv, "snapshot_id": snapshot_id},
+                anahtar=anahtar
+            )
+        except KuyrukDolu:
+            response = jsonify({
+                "success": False,
+                "message": "Sunucu şu anda çok yoğun, lütfen biraz sonra tekrar deneyin."
+            })
+            response.headers['Retry-After'] = '60'
+            return response, 429
+        
+        if "hazir" in kuyruk_sonucu:
+            # Aynı içerik yakın zamanda hazırlandı: ZIP yeniden kullanılır
+            hazir = kuyruk_sonucu["hazir"]
+            durum_deposu.olustur(
+                task_id,
+                durum="TAMAMLANDI",
+                kaynak=playlist_url,
+                ilerleme=hazir['ilerleme'],
+                indirme_url=hazir['indirme_url'],
+                hata_mesaji=None
+            )
+            return jsonify({
+                "success": True,
+                "message": "Bu playlist yakın zamanda hazırlandı.",
+                "task_id": task_id
+            }), 202
+        
+        if "lider_id" in kuyruk_sonucu:
+            # Aynı iş zaten kuyrukta/çalışıyor: bu görev onun durumunu izler
+            try:
+                lider_durumu = gorev_durumu_oku(kuyruk_sonucu["lider_id"]) or {}
+            except Exception:
+                lider_durumu = {}
+            supabase.table("gorevler").upsert({
+                "id": task_id,
+                "durum": lider_durumu.get('durum', "BEKLİYOR"),
+                "kaynak": playlist_url,
+                "ilerleme": lider_durumu.get('ilerleme', "0/0"),
+                "indirme_url": lider_durumu.get('indirme_url'),
+                "hata_mesaji": lider_durumu.get('hata_mesaji')
+            }).execute()
+            return jsonify({
+                "success": True,
+                "message": "Aynı playlist için çalışan göreve bağlanıldı.",
+                "task_id": task_id,
+                "kuyruk_sirasi": kuyruk_sonucu["sira"]
+            }), 202
+        
+        # Bekleyen satır doğrudan tabloya yazılır (yerel depoya değil): işi hangi worker süreci
+        # kiralarsa durumu o yazar, diğer süreçler Supabase'den okur. Satır zaten varsa (iş bu
+        # arada başka bir süreçte başladıysa) ezilmez.
+        supabase.table("gorevler").upsert({
+            "id": task_id,
+            "durum": "BEKLİYOR",
+            "kaynak": playlist_url,
+            "ilerleme": "0/0",
+            "indirme_url": None,
+            "hata_mesaji": None
+        }, ignore_duplicates=True).execute()
+        is_havuzu.uyandir()
         
         return jsonify({
             "success": True,
-            "message": "İndirme görevi başlatıldı.",
-            "task_id": task_id
+            "message": "İndirme görevi kuyruğa alındı.",
+            "task_id": task_id,
+            "kuyruk_sirasi": kuyruk_sonucu["sira"]
         }), 202
         
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
+def yerel_durum(task_id):
+    """Görev bu süreçte çalışıyor ya da burada bittiyse bellekteki durumu, değilse None.
+
+    Başka bir worker sürecinin kiraladığı işin burada kalmış eski durumu güvenilir değildir.
+    """
+    data = durum_deposu.al(task_id)
+    if data and (data.get('durum') in BITIS_DURUMLARI or is_havuzu.calisiyor(task_id)):
+        return data
+    return None
+
+def izlenen_gorev(task_id):
+    """Başka bir işe bağlanmış görevler o işin durumunu izler"""
+    if yerel_durum(task_id) is not None:
+        return task_id
+    return is_kuyrugu.lider(task_id) or task_id
+
+def gorev_durumu_oku(task_id):
+    """Bu süreçte çalışan görevler bellekten, diğerleri Supabase'den okunur"""
+    task_id = izlenen_gorev(task_id)
+    data = yerel_durum(task_id)
+    if data is None:
+        response = supabase.table("gorevler").select("*").eq("id", task_id).single().execute()
+        data = response.data
+    return data
+
+def durum_yaniti(data):
+    """gorevler satırını istemcinin beklediği durum yanıtına çevirir"""
+    yanit = {
+        "status": data.get('durum', 'UNKNOWN'),
+        "ilerleme": data.get('ilerleme', '0/0'),
+        "link": data.get('indirme_url'),
+        "message": data.get('hata_mesaji')
+    }
+    if data.get('tam_arsiv_url'):
+        yanit["tam_link"] = data['tam_arsiv_url']
+    if yanit["status"] == "YÜKLENIYOR" and data.get('yukleme_yuzdesi') is not None:
+        yanit["yukleme_yuzdesi"] = data['yukleme_yuzdesi']
+    if yanit["status"] == "BEKLİYOR":
+        yanit["kuyruk_sirasi"] = is_kuyrugu.sira(data.get('id'))
+    return yanit
+
+# Görev başına kuyruğa son yoklama yazma zamanı (süreç içi seyreltme)
+_son_yoklamalar = {}
+
+def yoklama_kaydet(task_id):
+    """İstemcinin görevi hâlâ izlediğini kuyruğa yazar; görev başına en fazla YOKLAMA_YAZMA_ARALIGI'nda bir"""
+    if not IPTAL_YOKLAMA_SURESI:
+        return
+    simdi = time.time()
+    if simdi - _son_yoklamalar.get(task_id, 0) < YOKLAMA_YAZMA_ARALIGI:
+        return
+    if len(_son_yoklamalar) > 10000:
+        for eski_id, zaman in list(_son_yoklamalar.items()):
+            if simdi - zaman >= YOKLAMA_YAZMA_ARALIGI:
+                _son_yoklamalar.pop(eski_id, None)
+    _son_yoklamalar[task_id] = simdi
+    try:
+        is_kuyrugu.yoklandi(task_id)
+    except Exception as e:
+        print(f"[{task_id}] Yoklama kaydedilemedi: {str(e)}")
+
 @app.route('/api/status/<task_id>', methods=['GET'])
 def get_task_status(task_id):
     try:
-        response = supabase.table("gorevler").select("*").eq("id", task_id).single().execute()
-        data = response.data
+        yoklama_kaydet(task_id)
+        data = gorev_durumu_oku(task_id)
         
         if data:
-            return jsonify({
-                "status": data.get('durum', 'UNKNOWN'),
-                "ilerleme": data.get('ilerleme', '0/0'),
-                "link": data.get('indirme_url'),
-                "message": data.get('hata_mesaji')
-            })
+            return jsonify(durum_yaniti(data))
         
         return jsonify({
             "status": "BEKLİYOR",
@@ -545,6 +734,92 @@ def get_task_status(task_id):
             "ilerleme": "0/0"
         }), 500
 
+@app.route('/api/status/<task_id>/events', methods=['GET'])
+def task_status_events(task_id):
+    """Görev ilerlemesini Server-Sent Events olarak anlık iletir"""
+    izlenen_id = izlenen_gorev(task_id)
+    
+    def olay_akisi():
+        # Bağlantı kopar veya SSE_MAKS_SURE dolarsa tarayıcı 3 sn sonra yeniden bağlanır
+        yield "retry: 3000\n\n"
+        
+        bitis_zamani = time.time() + SSE_MAKS_SURE
+        surum = 0
+        son_yanit = None
+        
+        while time.time() < bitis_zamani:
+            yoklama_kaydet(task_id)
+            surum, data = durum_deposu.degisiklik_bekle(izlenen_id, surum, zaman_asimi=15)
+            if data is not None:
+                data = yerel_durum(izlenen_id)
+            
+            if data is None:
+                # Görev başka bir süreçte çalışıyor: Supabase'den seyrek oku
+                try:
+                    data = gorev_durumu_oku(izlenen_id)
+                except Exception:
+                    data = None
+                if not data:
+                    yield ": bekleniyor\n\n"
+                    time.sleep(SSE_UZAK_OKUMA_ARALIGI)
+                    continue
+            
+            yanit = durum_yaniti(data)
+            if yanit != son_yanit:
+                son_yanit = yanit
+                yield f"data: {json.dumps(yanit)}\n\n"
+            else:
+                # Proxy'lerin boşta bağlantıyı kapatmaması için
+                yield ": ping\n\n"
+            
+            if yanit["status"] in BITIS_DURUMLARI:
+                return
+            if yerel_durum(izlenen_id) is None:
+                time.sleep(SSE_UZAK_OKUMA_ARALIGI)
+    
+    return Response(
+        stream_with_context(olay_akisi()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/task/<task_id>', methods=['DELETE'])
+def cancel_task(task_id):
+    """Görevi iptal eder: bekliyorsa kuyruktan çıkarılır, çalışıyorsa süreçleri durdurulup dosyaları silinir"""
+    try:
+        sonuc = is_kuyrugu.iptal_et(task_id)
+        
+        if sonuc == "paylasiliyor":
+            # Aynı işe bağlı başka kullanıcılar var; onların indirmesi kesilmez
+            return jsonify({"success": False, "message": "Görev başka isteklerle paylaşılıyor, iptal edilemez."}), 409
+        
+        if sonuc is None:
+            try:
+                data = gorev_durumu_oku(task_id)
+            except Exception:
+                # Satırı olmayan görevde single() hata fırlatır
+                data = None
+            if not data:
+                return jsonify({"success": False, "message": "Görev bulunamadı."}), 404
+            return jsonify({"success": False, "message": "Görev zaten bitmiş.", "status": data.get('durum')}), 409
+        
+        if sonuc == "calisiyor":
+            # Bu süreçte çalışıyorsa hemen, değilse sahibi işareti okuyunca (birkaç saniye) durur
+            is_havuzu.iptal_et(task_id)
+            return jsonify({"success": True, "message": "Görev iptal ediliyor.", "task_id": task_id}), 202
+        
+        # Kuyrukta bekleyen görev ya da başka bir işe bağlanmış takipçi: iş çalışmaya devam etmez/bağ kopar
+        durum_deposu.guncelle(task_id, durum="İPTAL", hata_mesaji="Görev iptal edildi.")
+        return jsonify({"success": True, "message": "Görev iptal edildi.", "task_id": task_id}), 200
+        
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+# Prometheus metrikleri (her worker süreci kendi değerlerini raporlar)
+@app.route('/metrics')
+def metrics():
+    return Response(metrikler.prometheus_metni(), mimetype='text/plain; version=0.0.4')
+
 # Health check endpoint
 @app.route('/health')
 def health():
@@ -555,5 +830,7 @@ def health():
     }), 200
 
 if __name__ == '__main__':
+    # Yarıda kalan görevler ilk isteği beklemeden devam etsin
+    is_havuzu.baslat()
     # Production modda debug=False
     app.run(host='0.0.0.0', port=int(PORT), debug=False)
@@ -0,0 +1,344 @@
+"""Çevrimdışı uçtan uca benchmark.
+
+Spotify ve YouTube Data API'leri yerel bir sahte sunucuya, yt-dlp/ffmpeg/ffprobe benchmark/sahte
+altındaki karşılıklarına, Supabase tablo ve storage'ı bellekteki bir karşılığa yönlendirilir;
+hiçbir canlı API'ye istek gitmez ve kota harcanmaz.
+
+Kullanım (depo kökünden):
+    python benchmark/calistir.py
+    python benchmark/calistir.py --boyutlar 10 100 --yuk-gorev 30 --yuk-sarki 20 --json sonuc.json
+
+Sahte indirme/kodlama davranışı ortam değişkenleriyle ayarlanır: BENCH_DOSYA_BOYUTU,
+BENCH_INDIRME_GECIKMESI, BENCH_KODLAMA_GECIKMESI, BENCH_KAYNAK_CODEC (ör. 'aac' + m4a = remux yolu).
+RSS ve disk ölçümü /proc üzerinden yapıldığından Linux gerektirir.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIZINI = os.path.dirname(os.path.abspath(__file__))
+DEPO_KOKU = os.path.dirname(BENCH_DIZINI)
+SAHTE_DIZINI = os.path.join(BENCH_DIZINI, "sahte")
+
+sys.path.insert(0, DEPO_KOKU)
+
+from sahte_sunucu import SahteSunucu, playlist_id  # noqa: E402
+from sahte_supabase import SahteSupabase  # noqa: E402
+
+
+def ortami_hazirla(sunucu, veri_dizini):
+    """app içe aktarılmadan önce tüm dış bağımlılıkları yerel karşılıklarına yönlendirir"""
+    os.environ.update({
+        "SUPABASE_URL": sunucu.adres,
+        "SUPABASE_KEY": "sahte.anahtar.imza",
+        "SPOTIFY_CLIENT_ID": "bench",
+        "SPOTIFY_CLIENT_SECRET": "bench",
+        "SPOTIFY_API_URL": f"{sunucu.adres}/v1/",
+        "SPOTIFY_TOKEN_URL": f"{sunucu.adres}/api/token",
+        "YT_KEY": "bench",
+        "YOUTUBE_API_URL": f"{sunucu.adres}/youtube/v3",
+        "PARCA_ONBELLEK_DIZINI": os.path.join(veri_dizini, "parcalar"),
+        "ARAMA_ONBELLEK_YOLU": os.path.join(veri_dizini, "arama.db"),
+        "PLAYLIST_ONBELLEK_YOLU": os.path.join(veri_dizini, "playlist.db"),
+        "IS_KUYRUGU_YOLU": os.path.join(veri_dizini, "kuyruk.db"),
+        "TESLIM_KAYDI_YOLU": os.path.join(veri_dizini, "teslim.db"),
+        "HIZ_SINIRI_YOLU": os.path.join(veri_dizini, "hiz_siniri.db"),
+    })
+    # yt-dlp işçi süreçleri ve ffmpeg/ffprobe çağrıları bu ortamı devralır
+    os.environ["PATH"] = os.path.join(SAHTE_DIZINI, "bin") + os.pathsep + os.environ.get("PATH", "")
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [SAHTE_DIZINI, os.environ.get("PYTHONPATH")]))
+
+
+def _rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for satir in f:
+                if satir.startswith("VmRSS:"):
+                    return int(satir.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _cocuklar(pid):
+    cocuklar = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                cocuklar.extend(int(c) for c in f.read().split())
+    except OSError:
+        pass
+    return cocuklar
+
+
+def surec_agaci_rss_kb():
+    """Bu süreç ve tüm alt süreçlerinin (yt-dlp işçileri, ffmpeg) toplam RSS'i"""
+    toplam, yigin = 0, [os.getpid()]
+    while yigin:
+        pid = yigin.pop()
+        toplam += _rss_kb(pid)
+        yigin.extend(_cocuklar(pid))
+    return toplam
+
+
+def disk_kullanimi(yollar):
+    toplam = 0
+    for yol in yollar:
+        if os.path.isfile(yol):
+            toplam += os.path.getsize(yol)
+        elif os.path.isdir(yol):
+            for kok, _, dosyalar in os.walk(yol):
+                for dosya in dosyalar:
+                    try:
+                        toplam += os.path.getsize(os.path.join(kok, dosya))
+                    except OSError:
+                        pass
+    return toplam
+
+
+class Ornekleyici:
+    """Ölçüm boyunca tepe RSS'i ve verilen yolların tepe disk kullanımını örnekler"""
+
+    def __init__(self, yollar, aralik=0.05):
+        self.yollar = yollar
+        self.aralik = aralik
+        self.tepe_rss_kb = 0
+        self.taban_disk = disk_kullanimi(yollar())
+        self.tepe_disk = 0
+        self._dur = threading.Event()
+        self._thread = threading.Thread(target=self._dongu, daemon=True)
+
+    def _dongu(self):
+        while not self._dur.is_set():
+            self.tepe_rss_kb = max(self.tepe_rss_kb, surec_agaci_rss_kb())
+            self.tepe_disk = max(self.tepe_disk, disk_kullanimi(self.yollar()) - self.taban_disk)
+            self._dur.wait(self.aralik)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._dur.set()
+        self._thread.join()
+
+
+def ilerleme_sayisi(durum):
+    try:
+        return int(str((durum or {}).get('ilerleme', '0')).split('/')[0])
+    except ValueError:
+        return 0
+
+
+def playlist_senaryosu(app, sarki_sayisi, output_format, etiket=None, senaryo=None):
+    """Tek bir playlist'i toplu_indirme_gorevi ile doğrudan işler"""
+    etiket = etiket or uuid.uuid4().hex[:8]
+    gorev_id = f"bench-{uuid.uuid4().hex[:8]}"
+    playlist_url = f"https://open.spotify.com/playlist/{playlist_id(sarki_sayisi, etiket)}"
+
+    def yollar():
+        return [*app.cekirdek.gorev_yollari(gorev_id), app.cekirdek.PARCA_ONBELLEK_DIZINI]
+
+    ilk_parca = None
+    bitti = threading.Event()
+
+    def ilk_parcayi_izle():
+        nonlocal ilk_parca
+        while not bitti.is_set():
+            if ilerleme_sayisi(app.durum_deposu.al(gorev_id)) > 0:
+                ilk_parca = time.perf_counter() - baslangic
+                return
+            time.sleep(0.01)
+
+    izleyici = threading.Thread(target=ilk_parcayi_izle, daemon=True)
+    with Ornekleyici(yollar) as ornekleyici:
+        baslangic = time.perf_counter()
+        izleyici.start()
+        app.toplu_indirme_gorevi(playlist_url, output_format, gorev_id)
+        sure = time.perf_counter() - baslangic
+        bitti.set()
+    izleyici.join()
+
+    son = app.durum_deposu.al(gorev_id) or {}
+    islenen = ilerleme_sayisi(son)
+    return {
+        "senaryo": senaryo or f"playlist-{sarki_sayisi}",
+        "etiket": etiket,
+        "durum": son.get("durum"),
+        "islenen": islenen,
+        "sure_sn": round(sure, 3),
+        "parca_per_sn": round(islenen / sure, 2) if sure else None,
+        "ilk_parca_sn": round(ilk_parca, 3) if ilk_parca is not None else None,
+        "tepe_rss_mb": round(ornekleyici.tepe_rss_kb / 1024, 1),
+        "tepe_tmp_mb": round(ornekleyici.tepe_disk / 1024 ** 2, 1),
+        "asama_toplam_sn": {asama: ozet["toplam_sn"] for asama, ozet in (son.get("zamanlama") or {}).items()},
+    }
+
+
+def yuk_senaryosu(app, gorev_sayisi, sarki_sayisi, output_format, ayni_playlist, zaman_asimi):
+    """Flask uç noktasına eşzamanlı görev gönderir ve hepsi bitene kadar bekler"""
+    istemci = app.app.test_client()
+    # gunicorn'da post_worker_init'in yaptığı gibi kuyruk işçileri istekten önce başlatılır
+    app.is_havuzu.baslat()
+    ortak_etiket = uuid.uuid4().hex[:8]
+
+    def gonder(_):
+        etiket = ortak_etiket if ayni_playlist else uuid.uuid4().hex[:8]
+        baslangic = time.perf_counter()
+        yanit = istemci.post('/api/download/spotify', data={
+            "playlist_url": f"https://open.spotify.com/playlist/{playlist_id(sarki_sayisi, etiket)}",
+            "output_format": output_format,
+        })
+        return yanit.status_code, time.perf_counter() - baslangic, (yanit.get_json() or {}).get("task_id")
+
+    gorev_idleri = set()
+
+    def yollar():
+        return [yol for gorev_id in gorev_idleri for yol in app.cekirdek.gorev_yollari(gorev_id)] + [app.cekirdek.PARCA_ONBELLEK_DIZINI]
+
+    with Ornekleyici(yollar) as ornekleyici:
+        baslangic = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(gorev_sayisi, 32)) as havuz:
+            sonuclar = list(havuz.map(gonder, range(gorev_sayisi)))
+        gorev_idleri.update(task_id for kod, _, task_id in sonuclar if kod == 202 and task_id)
+
+        bitenler, son_durumlar = set(), {}
+        while len(bitenler) < len(gorev_idleri) and time.perf_counter() - baslangic < zaman_asimi:
+            for task_id in gorev_idleri - bitenler:
+                try:
+                    durum = app.gorev_durumu_oku(task_id) or {}
+                except Exception:
+                    continue
+                if durum.get("durum") in app.BITIS_DURUMLARI:
+                    bitenler.add(task_id)
+                    son_durumlar[task_id] = durum
+            time.sleep(0.2)
+        sure = time.perf_counter() - baslangic
+
+    gecikmeler = sorted(gecikme for _, gecikme, _ in sonuclar)
+    islenen = sum(ilerleme_sayisi(d) for d in son_durumlar.values())
+    return {
+        "senaryo": f"yuk-{gorev_sayisi}x{sarki_sayisi}" + ("-ayni" if ayni_playlist else ""),
+        "kabul": sum(1 for kod, _, _ in sonuclar if kod == 202),
+        "reddedilen_429": sum(1 for kod, _, _ in sonuclar if kod == 429),
+        "tamamlanan": sum(1 for d in son_durumlar.values() if d.get("durum") == "TAMAMLANDI"),
+        "hata": sum(1 for d in son_durumlar.values() if d.get("durum") == "HATA"),
+        "bitmeyen": len(gorev_idleri) - len(bitenler),
+        "gonderim_p50_ms": round(statistics.median(gecikmeler) * 1000, 1),
+        "gonderim_p95_ms": round(gecikmeler[min(len(gecikmeler) - 1, int(0.95 * len(gecikmeler)))] * 1000, 1),
+        "sure_sn": round(sure, 3),
+        "parca_per_sn": round(islenen / sure, 2) if sure else None,
+        "tepe_rss_mb": round(ornekleyici.tepe_rss_kb / 1024, 1),
+        "tepe_tmp_mb": round(ornekleyici.tepe_disk / 1024 ** 2, 1),
+    }
+
+
+def adillik_senaryosu(app, buyuk, kucuk, output_format):
+    """Büyük bir görev çalışırken gönderilen küçük görevin ne kadar beklediğini ölçer"""
+    def calistir(sarki_sayisi, sureler):
+        gorev_id = f"bench-{uuid.uuid4().hex[:8]}"
+        playlist_url = f"https://open.spotify.com/playlist/{playlist_id(sarki_sayisi, uuid.uuid4().hex[:8])}"
+        baslangic = time.perf_counter()
+        app.toplu_indirme_gorevi(playlist_url, output_format, gorev_id)
+        sureler[sarki_sayisi] = time.perf_counter() - baslangic
+
+    sureler = {}
+    buyuk_thread = threading.Thread(target=calistir, args=(buyuk, sureler))
+    buyuk_thread.start()
+    # Büyük görevin işçileri doldurmasına zaman tanınır
+    time.sleep(1.0)
+    calistir(kucuk, sureler)
+    buyuk_thread.join()
+    return {
+        "senaryo": f"adillik-{buyuk}+{kucuk}",
+        "buyuk_sure_sn": round(sureler[buyuk], 3),
+        "kucuk_sure_sn": round(sureler[kucuk], 3),
+    }
+
+
+def raporla(sonuclar):
+    for sonuc in sonuclar:
+        print(f"\n== {sonuc['senaryo']}")
+        for anahtar, deger in sonuc.items():
+            if anahtar != "senaryo":
+                print(f"  {anahtar:<18} {deger}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Çevrimdışı uçtan uca benchmark")
+    parser.add_argument("--boyutlar", type=int, nargs="*", default=[10, 100, 1000],
+                        help="Tek görev senaryosundaki playlist boyutları")
+    parser.add_argument("--format", default="mp3")
+    parser.add_argument("--yuk-gorev", type=int, default=20, help="Yük testinde eşzamanlı gönderilen görev sayısı (0 = kapalı)")
+    parser.add_argument("--yuk-sarki", type=int, default=20, help="Yük testindeki her playlist'in şarkı sayısı")
+    parser.add_argument("--ayni-playlist", action="store_true", help="Yük testinde tüm görevler aynı playlist'i ister")
+    parser.add_argument("--yuk-zaman-asimi", type=float, default=900)
+    parser.add_argument("--api-gecikmesi", type=float, default=0.02, help="Sahte API yanıt gecikmesi (sn)")
+    parser.add_argument("--arama-kotasi", type=int, help="Bu kadar YouTube aramasından sonra kota bitmiş sayılır")
+    parser.add_argument("--adillik", type=int, nargs=2, metavar=("BUYUK", "KUCUK"),
+                        help="BUYUK şarkılı görev çalışırken KUCUK şarkılı görev gönderir ve sürelerini karşılaştırır")
+    parser.add_argument("--ikinci-dugum", action="store_true",
+                        help="Her playlist'i yerel parça önbelleği boşken yeniden işler (ortak depodan okuyan başka bir düğüm)")
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    parser.add_argument("--sakla", action="store_true", help="Önbellek/kuyruk dizinini silme")
+    args = parser.parse_args()
+
+    veri_dizini = tempfile.mkdtemp(prefix="nexus-bench-")
+    sunucu = SahteSunucu(api_gecikmesi=args.api_gecikmesi, arama_kotasi=args.arama_kotasi).baslat()
+    ortami_hazirla(sunucu, veri_dizini)
+
+    import app
+    app.supabase = SahteSupabase(sunucu.adres)
+    app.durum_deposu.supabase = app.supabase
+    if app.ortak_depo:
+        app.ortak_depo.supabase = app.supabase
+
+    sonuclar = []
+    try:
+        for boyut in args.boyutlar:
+            print(f"Playlist senaryosu: {boyut} şarkı...")
+            sonuc = playlist_senaryosu(app, boyut, args.format)
+            sonuclar.append(sonuc)
+            if args.ikinci_dugum:
+                print(f"Aynı playlist ikinci düğümde: {boyut} şarkı...")
+                if app.ortak_depo:
+                    app.ortak_depo.bekle()
+                # Yeni düğümün yerel parça önbelleği boştur
+                app.cekirdek.parca_onbellegi = app.cekirdek.ParcaOnbellegi(
+                    os.path.join(veri_dizini, f"parcalar-{sonuc['etiket']}"), app.cekirdek.PARCA_ONBELLEK_BAYT
+                )
+                sonuclar.append(playlist_senaryosu(app, boyut, args.format, sonuc["etiket"], f"playlist-{boyut}-ikinci-dugum"))
+        if args.adillik:
+            print(f"Adillik senaryosu: {args.adillik[0]} + {args.adillik[1]} şarkı...")
+            sonuclar.append(adillik_senaryosu(app, *args.adillik, args.format))
+        if args.yuk_gorev > 0:
+            print(f"Yük senaryosu: {args.yuk_gorev} görev x {args.yuk_sarki} şarkı...")
+            sonuclar.append(yuk_senaryosu(
+                app, args.yuk_gorev, args.yuk_sarki, args.format, args.ayni_playlist, args.yuk_zaman_asimi
+            ))
+    finally:
+        app.indirme_motoru.kapat()
+        app.donusturucu.kapat()
+        if app.ortak_depo:
+            app.ortak_depo.kapat()
+        sunucu.durdur()
+        if not args.sakla:
+            shutil.rmtree(veri_dizini, ignore_errors=True)
+
+    raporla(sonuclar)
+    print(f"\nSahte API istekleri: {sunucu.istekler}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"sonuclar": sonuclar, "api_istekleri": sunucu.istekler}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Benchmark için yt_dlp yerine geçen modül: ağa çıkmadan belirli boyut ve gecikmeyle sahte ses dosyası yazar.
+
+BENCH_DOSYA_BOYUTU (bayt) ve BENCH_INDIRME_GECIKMESI (saniye) ortam değişkenleriyle ayarlanır.
+"""
+import hashlib
+import os
+import time
+
+DOSYA_BOYUTU = int(os.environ.get("BENCH_DOSYA_BOYUTU", str(4 * 1024 * 1024)))
+INDIRME_GECIKMESI = float(os.environ.get("BENCH_INDIRME_GECIKMESI", "0.2"))
+_BLOK = os.urandom(64 * 1024)
+
+
+class YoutubeDL:
+    def __init__(self, params):
+        self.params = params
+
+    def extract_info(self, url, download=True):
+        if url.startswith("ytsearch"):
+            # Kotasız arama: sahte sunucuyla aynı sorgu -> video ID eşlemesi (önce uzun video)
+            adet, sorgu = url[len("ytsearch"):].split(":", 1)
+            video_id = hashlib.sha1(sorgu.encode('utf-8')).hexdigest()[:11]
+            sure = 150 + int(video_id[:4], 16) % 120
+            girdiler = [{"id": "L" + video_id[1:], "duration": 3 * 3600}, {"id": video_id, "duration": sure}]
+            return {"entries": girdiler[:int(adet or 1)]}
+        video_id = url.rsplit('=', 1)[-1]
+        # 'L' önekli ID'ler sahte sunucudaki saatlerce süren videolardır
+        bilgi = {"id": video_id, "ext": "webm", "duration": 3 * 3600 if video_id.startswith("L") else 200}
+        match_filter = self.params.get('match_filter')
+        if match_filter and match_filter(bilgi, incomplete=False):
+            return bilgi
+        yol = self.params['outtmpl']['default'].replace('%(id)s', video_id).replace('%(ext)s', 'webm')
+        time.sleep(INDIRME_GECIKMESI)
+        if download:
+            with open(yol, 'wb') as f:
+                kalan = DOSYA_BOYUTU
+                while kalan > 0:
+                    f.write(_BLOK[:kalan])
+                    kalan -= len(_BLOK)
+        return {**bilgi, "requested_downloads": [{"filepath": yol}]}
+
+    def download(self, urls):
+        for url in urls:
+            self.extract_info(url)
+        return 0
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def playlist_id(sarki_sayisi, etiket):
+    """Sahte sunucunun şarkı sayısını ID'den okuyabildiği playlist ID'si (spotipy yalnızca base62 kabul eder)"""
+    return f"bench{sarki_sayisi}x{etiket}"
+
+
+def _sarki_sayisi(pid):
+    eslesme = re.match(r"bench(\d+)x", pid)
+    return int(eslesme.group(1)) if eslesme else 0
+
+
+def _video_id(sorgu):
+    """Her arama sorgusu için kararlı, 11 karakterlik sahte video ID'si"""
+    return hashlib.sha1(sorgu.encode('utf-8')).hexdigest()[:11]
+
+
+def _uzun_video_id(sorgu):
+    """Sorgunun "full album" benzeri uzun videosu; sahte yt_dlp 'L' önekinden süresini anlar"""
+    return "L" + _video_id(sorgu)[1:]
+
+
+def sarki_suresi(sorgu):
+    """Sorgudaki şarkının kararlı sahte süresi (sn); sahte yt_dlp aynı hesabı yapar"""
+    return 150 + int(_video_id(sorgu)[:4], 16) % 120
+
+
+def video_suresi(video_id, sorgu):
+    return 3 * 3600 if video_id.startswith("L") else sarki_suresi(sorgu)
+
+
+class _Isleyici(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, veri, kod=200):
+        govde = json.dumps(veri).encode('utf-8')
+        self.send_response(kod)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(govde)))
+        self.end_headers()
+        self.wfile.write(govde)
+
+    def _bos(self, kod, **basliklar):
+        self.send_response(kod)
+        for ad, deger in basliklar.items():
+            self.send_header(ad.replace('_', '-'), deger)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _nesne_yolu(self):
+        """/storage/v1/object/<kova>/<yol> -> depo dizinindeki dosya (yoksa None)"""
+        yol = urlparse(self.path).path
+        onek = "/storage/v1/object/"
+        if not yol.startswith(onek) or yol.startswith(onek + "public/"):
+            return None
+        return os.path.join(self.server.depo_dizini, yol[len(onek):].replace('/', '__'))
+
+    def do_POST(self):
+        uzunluk = int(self.headers.get("Content-Length") or 0)
+
+        # Supabase Storage nesne yükleme (x-upsert yoksa var olan nesne korunur)
+        nesne = self._nesne_yolu()
+        if nesne:
+            self.server.istek_say("nesne_yukle")
+            gecici = f"{nesne}.{threading.get_ident()}.tmp"
+            with open(gecici, 'wb') as f:
+                kalan = uzunluk
+                while kalan:
+                    parca = self.rfile.read(min(kalan, 1024 * 1024))
+                    kalan -= len(parca)
+                    f.write(parca)
+            if self.headers.get("x-upsert") != "true" and os.path.exists(nesne):
+                os.remove(gecici)
+                return self._json({"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"}, kod=400)
+            os.replace(gecici, nesne)
+            return self._json({"Key": urlparse(self.path).path.split("/object/", 1)[1]})
+
+        self.rfile.read(uzunluk)
+
+        # Supabase Storage TUS: yükleme oluştur
+        if urlparse(self.path).path == "/storage/v1/upload/resumable":
+            self.server.istek_say("yukleme_baslat")
+            yukleme_id = self.server.yukleme_olustur(int(self.headers["Upload-Length"]))
+            return self._bos(201, Location=f"{self.server.adres}/storage/v1/upload/resumable/{yukleme_id}")
+
+        # Spotify Client Credentials token isteği
+        self.server.istek_say("token")
+        self._json({"access_token": "sahte", "token_type": "Bearer", "expires_in": 3600})
+
+    def do_PATCH(self):
+        yukleme_id = urlparse(self.path).path.rsplit('/', 1)[-1]
+        uzunluk = int(self.headers.get("Content-Length") or 0)
+        # İçerik saklanmaz; parça okunup yalnızca konum ilerletilir
+        kalan = uzunluk
+        while kalan:
+            kalan -= len(self.rfile.read(min(kalan, 1024 * 1024)))
+        self.server.istek_say("yukleme_parca")
+        konum = self.server.yukleme_ilerlet(yukleme_id, int(self.headers["Upload-Offset"]), uzunluk)
+        if konum is None:
+            return self._bos(409)
+        self._bos(204, Upload_Offset=str(konum), Tus_Resumable="1.0.0")
+
+    def do_HEAD(self):
+        yukleme = self.server.yuklemeler.get(urlparse(self.path).path.rsplit('/', 1)[-1])
+        if yukleme is None:
+            return self._bos(404)
+        self._bos(200, Upload_Offset=str(yukleme["konum"]), Upload_Length=str(yukleme["uzunluk"]))
+
+    def do_GET(self):
+        nesne = self._nesne_yolu()
+        if nesne:
+            self.server.istek_say("nesne_indir")
+            if not os.path.exists(nesne):
+                return self._json({"statusCode": "404", "error": "not_found"}, kod=404)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(os.path.getsize(nesne)))
+            self.end_headers()
+            with open(nesne, 'rb') as f:
+                shutil.copyfileobj(f, self.wfile)
+            return
+
+        adres = urlparse(self.path)
+        parametreler = {k: v[0] for k, v in parse_qs(adres.query).items()}
+        parcalar = [p for p in adres.path.split('/') if p]
+        time.sleep(self.server.api_gecikmesi)
+
+        # /v1/playlists/<id> ve /v1/playlists/<id>/tracks
+        if parcalar[:2] == ["v1", "playlists"] and len(parcalar) >= 3:
+            pid = parcalar[2]
+            toplam = _sarki_sayisi(pid)
+            if len(parcalar) == 3:
+                self.server.istek_say("spotify_playlist")
+                return self._json({"snapshot_id": f"{pid}-snap"})
+
+            self.server.istek_say("spotify_sayfa")
+            limit = int(parametreler.get("limit", 100))
+            offset = int(parametreler.get("offset", 0))
+            items = [
+                {"track": {
+                    "id": f"{pid}-{i}",
+                    "name": f"Parca {i} {pid}",
+                    "duration_ms": sarki_suresi(f"Sanatci {i % 50} - Parca {i} {pid}") * 1000,
+                    "artists": [{"name": f"Sanatci {i % 50}"}]
+                }}
+                for i in range(offset, min(offset + limit, toplam))
+            ]
+            sonraki = offset + limit < toplam
+            return self._json({
+                "items": items,
+                "total": toplam,
+                "next": f"{self.server.adres}/v1/playlists/{pid}/tracks?offset={offset + limit}" if sonraki else None
+            })
+
+        # YouTube Data API: /youtube/v3/search
+        if parcalar[-1:] == ["search"]:
+            self.server.istek_say("youtube_arama")
+            if self.server.arama_kotasi is not None and self.server.istekler["youtube_arama"] > self.server.arama_kotasi:
+                return self._json({"error": {"code": 403, "errors": [{"reason": "quotaExceeded"}]}}, kod=403)
+            sorgu = parametreler.get("q", "")
+            # İlk sonuç saatlerce süren bir "full album" videosudur; doğru parça ikinci sıradadır
+            adaylar = [_uzun_video_id(sorgu), _video_id(sorgu)][:int(parametreler.get("maxResults", 1))]
+            with self.server._kilit:
+                for video_id in adaylar:
+                    self.server.video_sureleri[video_id] = video_suresi(video_id, sorgu)
+            return self._json({"items": [{"id": {"videoId": video_id}} for video_id in adaylar]})
+
+        # YouTube Data API: /youtube/v3/videos (süreler)
+        if parcalar[-1:] == ["videos"]:
+            self.server.istek_say("youtube_video")
+            items = []
+            for video_id in parametreler.get("id", "").split(","):
+                sure = self.server.video_sureleri.get(video_id)
+                if sure is not None:
+                    items.append({"id": video_id, "contentDetails": {"duration": f"PT{sure // 60}M{sure % 60}S"}})
+            return self._json({"items": items})
+
+        self._json({"error": {"status": 404, "message": "bulunamadı"}}, kod=404)
+
+
+class SahteSunucu(ThreadingHTTPServer):
+    """Spotify Web API ve YouTube Data API'nin benchmark için gereken kısmını taklit eden yerel sunucu.
+
+    Playlist ID'si `bench<şarkı sayısı>x<etiket>` biçimindedir; sayfalar istek anında üretilir.
+    Supabase Storage'ın TUS yükleme uç noktası da burada; yüklenen ZIP içeriği saklanmaz.
+    Ortak parça deposu için nesne yükleme/indirme uç noktaları dosyaları geçici bir dizinde tutar.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, api_gecikmesi=0.0, arama_kotasi=None):
+        super().__init__(("127.0.0.1", 0), _Isleyici)
+        self.api_gecikmesi = api_gecikmesi
+        # Bu kadar aramadan sonra YouTube kotası bitmiş gibi 403 quotaExceeded döner
+        self.arama_kotasi = arama_kotasi
+        self.adres = f"http://127.0.0.1:{self.server_address[1]}"
+        self.istekler = {}
+        self.yuklemeler = {}    # yükleme id -> {"uzunluk", "konum"}
+        self.video_sureleri = {}
+        self.depo_dizini = tempfile.mkdtemp(prefix="bench-depo-")
+        self._kilit = threading.Lock()
+        self._thread = None
+
+    def istek_say(self, tur):
+        with self._kilit:
+            self.istekler[tur] = self.istekler.get(tur, 0) + 1
+
+    def yukleme_olustur(self, uzunluk):
+        with self._kilit:
+            yukleme_id = str(len(self.yuklemeler) + 1)
+            self.yuklemeler[yukleme_id] = {"uzunluk": uzunluk, "konum": 0}
+        return yukleme_id
+
+    def yukleme_ilerlet(self, yukleme_id, konum, uzunluk):
+        """Parça beklenen konumdan başlıyorsa yeni konumu, değilse None döner"""
+        with self._kilit:
+            yukleme = self.yuklemeler.get(yukleme_id)
+            if yukleme is None or yukleme["konum"] != konum:
+                return None
+            yukleme["konum"] = min(yukleme["uzunluk"], konum + uzunluk)
+            return yukleme["konum"]
+
+    def baslat(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def durdur(self):
+        self.shutdown()
+        self.server_close()
+        shutil.rmtree(self.depo_dizini, ignore_errors=True)
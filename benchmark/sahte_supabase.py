@@ -0,0 +1,118 @@
+import threading
+
+
+class _Yanit:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Sorgu:
+    """supabase-py sorgu zincirinin (select/eq/in_/single/upsert/update) bellekte karşılığı"""
+
+    def __init__(self, tablo, kilit):
+        self._tablo = tablo
+        self._kilit = kilit
+        self._islem = "select"
+        self._veri = None
+        self._cakisma_alani = "id"
+        self._cakismayi_yoksay = False
+        self._filtreler = []
+        self._tek = False
+
+    def select(self, *_):
+        self._islem = "select"
+        return self
+
+    def upsert(self, veri, on_conflict="id", ignore_duplicates=False):
+        self._islem, self._veri = "upsert", veri
+        self._cakisma_alani, self._cakismayi_yoksay = on_conflict, ignore_duplicates
+        return self
+
+    def insert(self, veri):
+        self._islem, self._veri = "upsert", veri
+        return self
+
+    def update(self, veri):
+        self._islem, self._veri = "update", veri
+        return self
+
+    def eq(self, alan, deger):
+        self._filtreler.append(lambda satir: satir.get(alan) == deger)
+        return self
+
+    def in_(self, alan, degerler):
+        degerler = set(degerler)
+        self._filtreler.append(lambda satir: satir.get(alan) in degerler)
+        return self
+
+    def single(self):
+        self._tek = True
+        return self
+
+    def _eslesenler(self):
+        return [satir for satir in self._tablo.values() if all(f(satir) for f in self._filtreler)]
+
+    def execute(self):
+        with self._kilit:
+            if self._islem == "upsert":
+                for satir in (self._veri if isinstance(self._veri, list) else [self._veri]):
+                    anahtar = satir[self._cakisma_alani]
+                    if self._cakismayi_yoksay and anahtar in self._tablo:
+                        continue
+                    self._tablo.setdefault(anahtar, {}).update(satir)
+                return _Yanit([dict(self._veri)] if isinstance(self._veri, dict) else self._veri)
+            if self._islem == "update":
+                eslesenler = self._eslesenler()
+                for satir in eslesenler:
+                    satir.update(self._veri)
+                return _Yanit([dict(satir) for satir in eslesenler])
+            eslesenler = [dict(satir) for satir in self._eslesenler()]
+            if self._tek:
+                if len(eslesenler) != 1:
+                    raise Exception("Satır bulunamadı")
+                return _Yanit(eslesenler[0])
+            return _Yanit(eslesenler)
+
+
+class _Kova:
+    def __init__(self, ad, depo, kilit, adres):
+        self._ad = ad
+        self._depo = depo
+        self._kilit = kilit
+        self._adres = adres
+
+    def upload(self, yol, veri, *_args, **_kwargs):
+        with self._kilit:
+            self._depo[(self._ad, yol)] = len(veri)
+        return _Yanit({"Key": f"{self._ad}/{yol}"})
+
+    def get_public_url(self, yol):
+        return f"{self._adres}/storage/v1/object/public/{self._ad}/{yol}"
+
+
+class _Depolama:
+    def __init__(self, depo, kilit, adres):
+        self._depo = depo
+        self._kilit = kilit
+        self._adres = adres
+
+    def from_(self, kova):
+        return _Kova(kova, self._depo, self._kilit, self._adres)
+
+
+class SahteSupabase:
+    """Benchmark için gorevler tablosu ve storage'ın bellekte tutulan karşılığı.
+
+    Yüklenen dosyaların yalnızca boyutu saklanır; içerik bellekte tutulmaz.
+    """
+
+    def __init__(self, adres="http://supabase.yerel"):
+        self._kilit = threading.Lock()
+        self.tablolar = {}
+        self.dosyalar = {}
+        self.storage = _Depolama(self.dosyalar, self._kilit, adres)
+
+    def table(self, ad):
+        with self._kilit:
+            tablo = self.tablolar.setdefault(ad, {})
+        return _Sorgu(tablo, self._kilit)
@@ -0,0 +1,696 @@
+import os
+import re
+import shutil
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from contextlib import ExitStack
+from typing import NamedTuple
+
+from onbellek import ParcaOnbellegi, AramaOnbellegi, PlaylistOnbellegi
+from indirme_motoru import IndirmeMotoru, IndirmeHatasi, SinirAsildi
+from donusturme import Donusturucu, hazir, sonra
+from metrikler import Metrikler
+from hiz_siniri import HizSinirlayici
+from kontrol_noktasi import GorevManifesti
+from is_kuyrugu import GorevIptalEdildi
+from istemciler import spotify_istemcisi, http_oturumu
+from zamanlayici import AdilZamanlayici
+from ortak_depo import OrtakDepoHatasi
+
+# ENV DEĞİŞKENLERİ
+YT_KEY = os.environ.get("YT_KEY")
+# Yerel test/benchmark sunucusuna yönlendirmek için değiştirilebilir
+YOUTUBE_API_URL = os.environ.get("YOUTUBE_API_URL", "https://www.googleapis.com/youtube/v3")
+# YouTube Data API'ye süreç genelinde saniyede en fazla bu kadar istek (ani yük: kapasite)
+YOUTUBE_ISTEK_HIZI = float(os.environ.get("YOUTUBE_ISTEK_HIZI", "5"))
+YOUTUBE_ISTEK_KAPASITESI = int(os.environ.get("YOUTUBE_ISTEK_KAPASITESI", "10"))
+# Hız sınırı, geri çekilme ve kota durumunun worker süreçleri arasında paylaşıldığı dosya
+# (boş = her süreç kendi sınırını uygular; hız süreç sayısıyla çarpılır)
+HIZ_SINIRI_YOLU = os.environ.get("HIZ_SINIRI_YOLU", "/tmp/nexus-onbellek/hiz_siniri.db")
+# 429/5xx/ağ hatalarında aynı sorgu için deneme sayısı
+YOUTUBE_MAKS_DENEME = int(os.environ.get("YOUTUBE_MAKS_DENEME", "4"))
+# Aramada süreye göre sıralanacak aday sayısı; şarkı süresinden bu kadar saniye sapma eşit sayılır
+YOUTUBE_ADAY_SAYISI = max(1, int(os.environ.get("YOUTUBE_ADAY_SAYISI", "5")))
+YOUTUBE_SURE_TOLERANSI = int(os.environ.get("YOUTUBE_SURE_TOLERANSI", "10"))
+# İndirme öncesi sınırlar: video süresi (sn; yalnızca şarkı süresi bilinmiyorsa) ve dosya
+# boyutu (bayt); aşanlar hiç indirilmez
+MAKS_VIDEO_SURESI = int(os.environ.get("MAKS_VIDEO_SURESI", "1200"))
+MAKS_INDIRME_BAYT = int(os.environ.get("MAKS_INDIRME_BAYT", str(60 * 1024 * 1024)))
+# API kullanılamadığında (kota bitti, anahtar yok/geçersiz, denemeler tükendi) yt-dlp ile kotasız arama
+YOUTUBE_YEDEK_ARAMA = os.environ.get("YOUTUBE_YEDEK_ARAMA", "1") == "1"
+# Görev dizinleri (parçalar + manifest) ve ZIP'ler; yarıda kalan görevler buradan devam eder
+GOREV_DIZINI = os.environ.get("GOREV_DIZINI", "/tmp")
+# Süreçteki tüm görevlerin paylaştığı indirme işçisi sayısı (şarkılar görevler arasında adil dağıtılır)
+ISCI_SAYISI = max(1, int(os.environ.get("ISCI_SAYISI", "4")))
+# Bu sayıdan az şarkılı görevlere orantılı olarak daha fazla işçi payı verilir (0 = eşit pay)
+KUCUK_IS_ESIGI = int(os.environ.get("KUCUK_IS_ESIGI", "0"))
+# Eşzamanlı ffmpeg kodlama sayısı (varsayılan: CPU sayısı)
+DONUSTURME_ISCI_SAYISI = int(os.environ.get("DONUSTURME_ISCI_SAYISI", "0")) or os.cpu_count()
+# Yeniden kodlama bekleyen (diskte ham duran) en fazla parça sayısı; dolunca kodlama gerektiren
+# parçayı indiren işçi, sırayı yer açılana kadar bekler. Taşıma/remux yapılan parçalar sayılmaz
+DONUSTURME_KUYRUK_SINIRI = max(1, int(os.environ.get("DONUSTURME_KUYRUK_SINIRI", "0")) or 2 * DONUSTURME_ISCI_SAYISI)
+# Dönüştürülmüş parça önbelleği (0 bayt = kapalı)
+PARCA_ONBELLEK_DIZINI = os.environ.get("PARCA_ONBELLEK_DIZINI", "/tmp/nexus-onbellek/parcalar")
+PARCA_ONBELLEK_BAYT = int(os.environ.get("PARCA_ONBELLEK_BAYT", str(2 * 1024 ** 3)))
+# YouTube arama önbelleği (sorgu -> video), süreler saniye cinsinden
+ARAMA_ONBELLEK_YOLU = os.environ.get("ARAMA_ONBELLEK_YOLU", "/tmp/nexus-onbellek/arama.db")
+ARAMA_ONBELLEK_TTL = int(os.environ.get("ARAMA_ONBELLEK_TTL", str(30 * 24 * 3600)))
+ARAMA_ONBELLEK_NEGATIF_TTL = int(os.environ.get("ARAMA_ONBELLEK_NEGATIF_TTL", str(24 * 3600)))
+# Spotify playlist sayfalarını aynı anda çeken istek sayısı
+SPOTIFY_SAYFA_PARALELLIGI = max(1, int(os.environ.get("SPOTIFY_SAYFA_PARALELLIGI", "4")))
+# Şarkı listesi önbelleği (playlist_id + snapshot_id)
+PLAYLIST_ONBELLEK_YOLU = os.environ.get("PLAYLIST_ONBELLEK_YOLU", "/tmp/nexus-onbellek/playlist.db")
+
+# Görevler arasında paylaşılan parça önbelleği
+parca_onbellegi = ParcaOnbellegi(PARCA_ONBELLEK_DIZINI, PARCA_ONBELLEK_BAYT)
+arama_onbellegi = AramaOnbellegi(ARAMA_ONBELLEK_YOLU, ARAMA_ONBELLEK_TTL, ARAMA_ONBELLEK_NEGATIF_TTL)
+playlist_onbellegi = PlaylistOnbellegi(PLAYLIST_ONBELLEK_YOLU)
+
+# Örnekler arası ortak parça deposu (OrtakParcaDeposu); Supabase kuruluysa app.py bağlar
+ortak_depo = None
+
+# Uzun ömürlü yt-dlp işçileri (parça başına 300 sn zaman aşımı)
+indirme_motoru = IndirmeMotoru(ISCI_SAYISI, zaman_asimi=300)
+indirme_zamanlayici = AdilZamanlayici(ISCI_SAYISI)
+
+# Yeniden kodlamalar indirme işçilerinden ayrı, CPU sayısı kadar eşzamanlı ffmpeg ile ve
+# görevler arasında adil sırayla yapılır
+donusturucu = Donusturucu(
+    DONUSTURME_ISCI_SAYISI,
+    kuyruk_siniri=DONUSTURME_KUYRUK_SINIRI,
+    yer_bekleme_olcumu=lambda gorev_id: metrikler.olc("donusturme_yeri_bekleme", gorev_id)
+)
+
+# Tüm görevler (ve HIZ_SINIRI_YOLU ile tüm süreçler) aynı YouTube API hız sınırını ve geri
+# çekilme durumunu paylaşır
+youtube_sinirlayici = HizSinirlayici(
+    YOUTUBE_ISTEK_HIZI, YOUTUBE_ISTEK_KAPASITESI, db_yolu=HIZ_SINIRI_YOLU or None, ad="youtube"
+)
+
+# Aşama süreleri ve sayaçlar (/metrics); görev başına özet görev kaydına yazılır
+metrikler = Metrikler()
+
+def guvenli_dosya_adi(sarki_adi):
+    """Şarkı adından dosya sisteminde güvenli bir ad üretir"""
+    safe_filename = "".join(c for c in sarki_adi if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    if not safe_filename:
+        safe_filename = str(uuid.uuid4())[:8]
+    return safe_filename
+
+def video_id_cikar(youtube_url):
+    """watch?v=... biçimindeki URL'den video ID'sini çıkarır"""
+    return youtube_url.split('v=')[-1].split('&')[0]
+
+# YT-DLP ve FFmpeg ile indirme fonksiyonu
+def yt_dlp_ile_indir(youtube_url, sarki_adi, output_format, output_dir, maks_sure=MAKS_VIDEO_SURESI, gorev_id=None):
+    """YouTube'dan şarkının ses akışını dönüştürmeden indirir; ham dosya yolunu veya None döner.
+    
+    Video süre/boyut sınırını aşıyorsa SinirAsildi fırlatır (önbellekteki eşleşme geçersizdir).
+    """
+    try:
+        # Ham dosya, dönüştürülmüş hedef dosyayla çakışmasın diye ayrı bir adla indirilir
+        sablon = os.path.join(output_dir, f"{guvenli_dosya_adi(sarki_adi)}.indirilen.%(ext)s")
+        
+        # İndirme işlemini uzun ömürlü yt-dlp işçisinde çalıştır
+        dosya_yolu = indirme_motoru.indir(youtube_url, sablon, output_format, maks_sure, MAKS_INDIRME_BAYT, etiket=gorev_id)
+        if dosya_yolu and os.path.exists(dosya_yolu):
+            return dosya_yolu
+        
+        # yt-dlp yolu bildirmediyse olası uzantılarda ara
+        for ext in ['m4a', 'webm', 'opus', 'mp3', 'ogg', 'wav']:
+            test_path = sablon.replace('%(ext)s', ext)
+            if os.path.exists(test_path):
+                return test_path
+        return None
+            
+    except SinirAsildi:
+        raise
+    except IndirmeHatasi as e:
+        print(f"yt-dlp hata: {str(e)}")
+        return None
+    except Exception as e:
+        print(f"İndirme hatası: {str(e)}")
+        return None
+
+class Sarki(NamedTuple):
+    """Playlist'teki tek şarkı; tuple tabanlı olduğundan binlerce kayıtta az bellek tutar"""
+    sanatci: str
+    sarki_adi: str
+    spotify_id: str = None
+    sure_ms: int = None
+    
+    @property
+    def arama_sorgusu(self):
+        return f"{self.sanatci} - {self.sarki_adi}"
+
+def onbellek_kaydi_gecerli(kayitlar):
+    """Spotify track ID'si veya süresi olmayan eski biçimdeki önbellek kayıtları yeniden çekilir"""
+    return all(isinstance(kayit, list) and len(kayit) >= 4 for kayit in kayitlar)
+
+def playlist_id_cikar(playlist_url):
+    """Playlist ID'sini URL'den çıkarır"""
+    return playlist_url.split('/')[-1].split('?')[0]
+
+def sayfadaki_sarkilar(results):
+    """playlist_items yanıtındaki geçerli şarkıları Sarki listesine çevirir"""
+    sarkilar = []
+    for item in results['items']:
+        track = item.get('track')
+        if track and track.get('name'):
+            sanatci = track['artists'][0]['name'] if track.get('artists') else "Unknown Artist"
+            sarkilar.append(Sarki(sanatci, track['name'], track.get('id'), track.get('duration_ms')))
+    return sarkilar
+
+def spotify_playlist_akisi(playlist_url, toplam_bildir=None, gorev_id=None, snapshot_id=None):
+    """Spotify playlist'inin şarkılarını sayfa sayfa (Sarki listeleri olarak) üretir.
+    
+    İlk sayfa gelir gelmez tüketilebilir. toplam_bildir verilirse toplam şarkı sayısı
+    öğrenildiğinde çağrılır. snapshot_id verilirse (istek anında okunmuşsa) yeniden sorulmaz.
+    """
+    try:
+        # Süreç genelinde paylaşılan istemci (token önbellekte)
+        sp = spotify_istemcisi()
+        
+        # Playlist ID'sini URL'den çıkar
+        playlist_id = playlist_id_cikar(playlist_url)
+        
+        # Playlist değişmediyse (aynı snapshot) sayfalama yapılmaz
+        if not snapshot_id:
+            snapshot_id = sp.playlist(playlist_id, fields='snapshot_id')['snapshot_id']
+        onbellekteki = playlist_onbellegi.al(playlist_id, snapshot_id)
+        if onbellekteki is not None and onbellek_kaydi_gecerli(onbellekteki):
+            metrikler.say("onbellek", onbellek="playlist", sonuc="isabet")
+            sarki_listesi = [Sarki(*kayit) for kayit in onbellekteki]
+            if toplam_bildir:
+                toplam_bildir(len(sarki_listesi))
+            yield sarki_listesi
+            return
+        
+        metrikler.say("onbellek", onbellek="playlist", sonuc="kayip")
+        limit = 100
+        
+        def sayfa_getir(offset):
+            with metrikler.olc("spotify_sayfa", gorev_id):
+                return sp.playlist_items(
+                    playlist_id, 
+                    fields='items.track(id,name,duration_ms,artists.name),next,total',
+                    limit=limit,
+                    offset=offset
+                )
+        
+        # İlk sayfa toplam şarkı sayısını verir ve hemen tüketiciye gider
+        ilk_sayfa = sayfa_getir(0)
+        if toplam_bildir:
+            toplam_bildir(ilk_sayfa.get('total'))
+        ilk_sarkilar = sayfadaki_sarkilar(ilk_sayfa)
+        sarki_listesi = list(ilk_sarkilar)
+        yield ilk_sarkilar
+        
+        # Kalan sayfalar sınırlı paralellikle çekilir ve playlist sırasıyla üretilir
+        # (429 yanıtlarında spotipy Retry-After'a uyarak yeniden dener)
+        kalan_offsetler = range(limit, ilk_sayfa.get('total') or 0, limit)
+        if ilk_sayfa['next'] and kalan_offsetler:
+            havuz = ThreadPoolExecutor(max_workers=SPOTIFY_SAYFA_PARALELLIGI)
+            try:
+                gelecekler = [havuz.submit(sayfa_getir, offset) for offset in kalan_offsetler]
+                for gelecek in gelecekler:
+                    sayfa = sayfadaki_sarkilar(gelecek.result())
+                    sarki_listesi.extend(sayfa)
+                    yield sayfa
+            finally:
+                # Tüketici erken bırakırsa bekleyen sayfalar çekilmez
+                havuz.shutdown(wait=False, cancel_futures=True)
+        
+        playlist_onbellegi.kaydet(playlist_id, snapshot_id, sarki_listesi)
+        
+    except Exception as e:
+        print(f"Spotify hatası: {str(e)}")
+        raise ValueError(f"Spotify playlist okunamadı: {str(e)}")
+
+def spotify_playlist_parcala(playlist_url):
+    """Spotify playlist'inden şarkı bilgilerini çeker"""
+    return [sarki for sayfa in spotify_playlist_akisi(playlist_url) for sarki in sayfa]
+
+def arama_sonuc_etiketi(sonuc):
+    return sonuc if sonuc in ("BULUNAMADI", "API_HATASI") else "BULUNDU"
+
+def maks_video_suresi(sure_ms=None):
+    """Şarkı için kabul edilen en uzun video süresi (sn): şarkının iki katı + 1 dk; süre bilinmiyorsa MAKS_VIDEO_SURESI"""
+    if not sure_ms:
+        return MAKS_VIDEO_SURESI
+    return int(sure_ms / 1000 * 2 + 60)
+
+def iso_sure_saniye(sure):
+    """YouTube'un ISO 8601 süresini (ör. PT1H2M3S) saniyeye çevirir; okunamazsa None"""
+    eslesme = re.fullmatch(r'P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', sure or '')
+    if not eslesme or not sure.strip('PT'):
+        return None
+    gun, saat, dakika, saniye = (int(parca or 0) for parca in eslesme.groups())
+    return ((gun * 24 + saat) * 60 + dakika) * 60 + saniye
+
+def aday_sec(adaylar, sure_ms=None):
+    """[(video_id, süre_sn)] adaylarından şarkıya en uygun video ID'sini seçer; uygun aday yoksa None.
+    
+    Süre sınırını aşanlar elenir. Şarkı süresi biliniyorsa en yakın süreli aday seçilir
+    (tolerans içindeki farklar eşit sayılır, eşitlikte arama sırası korunur).
+    """
+    maks_sure = maks_video_suresi(sure_ms)
+    uygunlar = [(sira, video_id, sure) for sira, (video_id, sure) in enumerate(adaylar) if not sure or sure <= maks_sure]
+    elenen = len(adaylar) - len(uygunlar)
+    if elenen:
+        metrikler.say("youtube_aday_elendi", elenen)
+    if not uygunlar:
+        return None
+    if not sure_ms:
+        return uygunlar[0][1]
+    hedef = sure_ms / 1000
+    
+    def uzaklik(aday):
+        sira, _, sure = aday
+        # Süresi bilinmeyen adaylar bilinenlerin arkasına düşer
+        if not sure:
+            return (1, 0, sira)
+        return (0, max(0, abs(sure - hedef) - YOUTUBE_SURE_TOLERANSI), sira)
+    
+    return min(uygunlar, key=uzaklik)[1]
+
+def youtube_video_ara(sorgu, gorev_id=None, sure_ms=None):
+    """YouTube Data API kullanarak video arar; sonuçlar kalıcı önbellekten gelebilir.
+    
+    Birkaç aday alınır ve süresi şarkıya (sure_ms) en yakın olan seçilir.
+    API kullanılamıyorsa yt-dlp'nin kotasız aramasına düşülür.
+    """
+    onbellekteki = arama_onbellegi.al(sorgu, sure_ms)
+    if onbellekteki is not None:
+        metrikler.say("youtube_arama", kaynak="onbellek", sonuc=arama_sonuc_etiketi(onbellekteki))
+        return onbellekteki
+    
+    kaynak = "api"
+    with metrikler.olc("youtube_arama", gorev_id):
+        sonuc = _youtube_api_ara(sorgu, sure_ms)
+    
+    if sonuc == "API_HATASI" and YOUTUBE_YEDEK_ARAMA:
+        kaynak = "ytsearch"
+        with metrikler.olc("ytsearch", gorev_id):
+            sonuc = _ytdlp_ara(sorgu, sure_ms, gorev_id)
+    
+    metrikler.say("youtube_arama", kaynak=kaynak, sonuc=arama_sonuc_etiketi(sonuc))
+    arama_onbellegi.kaydet(sorgu, sonuc, sure_ms)
+    return sonuc
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+def _hata_nedeni(response):
+    """YouTube API hata yanıtındaki ilk reason (ör. quotaExceeded)"""
+    try:
+        return response.json()['error']['errors'][0]['reason']
+    except Exception:
+        return None
+
+def _youtube_api_istegi(uc_nokta, params):
+    """YouTube Data API'ye GET isteği; yanıt JSON'unu veya API kullanılamıyorsa None döner.
+    
+    İstekler ortak hız sınırlayıcıdan geçer; 429/5xx ve ağ hatalarında jitter'lı üstel
+    geri çekilmeyle yeniden denenir. Kota bittiğinde sıfırlanana kadar API'ye gidilmez.
+    """
+    if not YT_KEY or youtube_sinirlayici.kota_bitti:
+        return None
+    
+    API_URL = f"{YOUTUBE_API_URL}/{uc_nokta}"
+    
+    for deneme in range(YOUTUBE_MAKS_DENEME):
+        youtube_sinirlayici.al()
+        try:
+            response = http_oturumu().get(API_URL, params={**params, 'key': YT_KEY}, timeout=10)
+        except Exception as e:
+            bekleme = youtube_sinirlayici.geri_cekil()
+            print(f"YouTube API Hatası: {str(e)} ({bekleme:.1f} sn sonra tekrar)")
+            continue
+        
+        neden = _hata_nedeni(response) if response.status_code == 403 else None
+        if neden in ("quotaExceeded", "dailyLimitExceeded"):
+            youtube_sinirlayici.kota_bitti_isaretle()
+            metrikler.say("youtube_kota_bitti")
+            print("YouTube API kotası bitti, sıfırlanana kadar yedek arama kullanılacak")
+            return None
+        
+        if response.status_code == 429 or response.status_code >= 500 or neden in ("rateLimitExceeded", "userRateLimitExceeded"):
+            bekleme = youtube_sinirlayici.geri_cekil(_retry_after(response))
+            metrikler.say("youtube_geri_cekilme", kod=response.status_code)
+            print(f"YouTube API Hatası: HTTP {response.status_code} ({bekleme:.1f} sn sonra tekrar)")
+            continue
+        
+        if not response.ok:
+            print(f"YouTube API Hatası: HTTP {response.status_code} {neden or ''}".rstrip())
+            return None
+        
+        youtube_sinirlayici.basarili()
+        return response.json()
+    
+    return None
+
+def _youtube_api_ara(sorgu, sure_ms=None):
+    """YouTube Data API'de arar; adayların süreleri videos.list ile (1 kota birimi) okunur"""
+    data = _youtube_api_istegi("search", {
+        'part': 'snippet',
+        'q': sorgu,
+        'type': 'video',
+        'maxResults': YOUTUBE_ADAY_SAYISI,
+        'videoCategoryId': '10'  # Müzik kategorisi
+    })
+    if data is None:
+        return "API_HATASI"
+    
+    video_idleri = [item['id']['videoId'] for item in data.get('items', []) if item.get('id', {}).get('videoId')]
+    if not video_idleri:
+        return "BULUNAMADI"
+    
+    # Süreler okunamazsa adaylar arama sırasıyla kalır; indirme sınırı yine uygulanır
+    detay = _youtube_api_istegi("videos", {'part': 'contentDetails', 'id': ','.join(video_idleri)})
+    sureler = {
+        item['id']: iso_sure_saniye(item.get('contentDetails', {}).get('duration'))
+        for item in (detay or {}).get('items', [])
+    }
+    video_id = aday_sec([(video_id, sureler.get(video_id)) for video_id in video_idleri], sure_ms)
+    return f"https://www.youtube.com/watch?v={video_id}" if video_id else "BULUNAMADI"
+
+def _ytdlp_ara(sorgu, sure_ms=None, gorev_id=None):
+    """yt-dlp `ytsearchN:` ile kotasız arama; yt-dlp işçilerinde çalışır"""
+    try:
+        adaylar = indirme_motoru.ara(sorgu, YOUTUBE_ADAY_SAYISI, etiket=gorev_id)
+    except Exception as e:
+        print(f"Yedek arama hatası: {str(e)}")
+        return "API_HATASI"
+    video_id = aday_sec(adaylar, sure_ms)
+    return f"https://www.youtube.com/watch?v={video_id}" if video_id else "BULUNAMADI"
+
+def ortak_parcayi_al(video_id, output_format, hedef_yol, gorev_id):
+    """Parçayı başka bir örneğin yüklediği ortak depodan indirir; bulunursa yerel önbelleğe de ekler"""
+    if not ortak_depo:
+        return False
+    try:
+        with metrikler.olc("ortak_depo", gorev_id):
+            bulundu = ortak_depo.al(video_id, output_format, hedef_yol)
+    except OrtakDepoHatasi as e:
+        # Depo erişilemezse parça her zamanki gibi yerelde üretilir
+        print(f"[{gorev_id}] Ortak depo okunamadı: {str(e)}")
+        bulundu = None
+    metrikler.say("onbellek", onbellek="ortak", sonuc="isabet" if bulundu else "kayip")
+    if not bulundu:
+        return False
+    print(f"[{gorev_id}] Ortak depodan: {os.path.basename(hedef_yol)}")
+    try:
+        parca_onbellegi.ekle(video_id, output_format, hedef_yol)
+    except OSError as e:
+        print(f"[{gorev_id}] Önbelleğe eklenemedi: {str(e)}")
+    return True
+
+def video_getir(youtube_url, dosya_adi, output_format, output_dir, gorev_id, sure_ms=None):
+    """Videoyu önbellekten alır ya da indirip çevirir; dosya yolunu (veya None) taşıyan Future döner.
+    
+    Yeniden kodlama gerekiyorsa dönüştürme havuzunda sürer; çağıran indirme işçisi beklemez.
+    Kodlama sırası DONUSTURME_KUYRUK_SINIRI'na ulaştıysa işçi, indirdiği dosyayı sıraya
+    koyabilmek için yer açılana kadar bekler.
+    """
+    # Önbellekte varsa yt-dlp ve ffmpeg tamamen atlanır
+    video_id = video_id_cikar(youtube_url)
+    hedef_yol = os.path.join(output_dir, f"{guvenli_dosya_adi(dosya_adi)}.{output_format}")
+    if os.path.exists(hedef_yol):
+        # Yarıda kalan önceki denemede dönüştürülüp henüz ZIP'e yazılmamış dosya
+        print(f"[{gorev_id}] Diskten: {os.path.basename(hedef_yol)}")
+        return hazir(hedef_yol)
+    if parca_onbellegi.al(video_id, output_format, hedef_yol):
+        metrikler.say("onbellek", onbellek="parca", sonuc="isabet")
+        print(f"[{gorev_id}] Önbellekten: {os.path.basename(hedef_yol)}")
+        return hazir(hedef_yol)
+    metrikler.say("onbellek", onbellek="parca", sonuc="kayip")
+    if ortak_parcayi_al(video_id, output_format, hedef_yol, gorev_id):
+        return hazir(hedef_yol)
+    
+    with metrikler.olc("yt_dlp", gorev_id):
+        ham_dosya = yt_dlp_ile_indir(youtube_url, dosya_adi, output_format, output_dir, maks_video_suresi(sure_ms), gorev_id)
+    if not ham_dosya:
+        metrikler.say("indirme_hatasi")
+        return hazir(None)
+    
+    # Dönüştürme süresi havuzda beklemeyi de içerir (kodlama kapasitesi yetmiyorsa burada görünür)
+    donusum_baslangici = time.perf_counter()
+    
+    def donusunce(dosya_yolu):
+        metrikler.kaydet("donusturme", time.perf_counter() - donusum_baslangici, gorev_id)
+        print(f"[{gorev_id}] Başarılı: {os.path.basename(dosya_yolu)}")
+        try:
+            parca_onbellegi.ekle(video_id, output_format, dosya_yolu)
+            if ortak_depo:
+                ortak_depo.ekle(video_id, output_format, dosya_yolu)
+        except OSError as e:
+            print(f"[{gorev_id}] Önbelleğe eklenemedi: {str(e)}")
+        return dosya_yolu
+    
+    donusum = donusturucu.donustur(ham_dosya, hedef_yol, output_format, gorev_id)
+    return sonra(donusum, donusunce)
+
+def sarki_isle(sarki, dosya_adi, output_format, output_dir, gorev_id):
+    """Tek bir şarkıyı YouTube'da arar ve indirir; (dosya_yolu, video_id) taşıyan Future veya None döner"""
+    print(f"[{gorev_id}] İşleniyor: {sarki.arama_sorgusu}")
+    
+    # YouTube'da ara
+    youtube_url = youtube_video_ara(sarki.arama_sorgusu, gorev_id, sarki.sure_ms)
+    
+    if "BULUNAMADI" in youtube_url or "API_HATASI" in youtube_url:
+        print(f"[{gorev_id}] Atlandı: {sarki.arama_sorgusu}")
+        return None
+    
+    video_id = video_id_cikar(youtube_url)
+    try:
+        donusum = video_getir(youtube_url, dosya_adi, output_format, output_dir, gorev_id, sarki.sure_ms)
+    except SinirAsildi as e:
+        # Bulunan video kabul edilmiyor; önbellekte kalırsa her seferinde yeniden seçilirdi
+        arama_onbellegi.sil(sarki.arama_sorgusu, sarki.sure_ms)
+        metrikler.say("indirme_hatasi")
+        print(f"[{gorev_id}] Atlandı ({str(e)}): {sarki.arama_sorgusu}")
+        return None
+    return sonra(donusum, lambda dosya_yolu: (dosya_yolu, video_id) if dosya_yolu else None)
+
+def teslim_edileni_getir(video_id, arsiv_adi, output_format, output_dir, gorev_id):
+    """Önceki senkronda teslim edilen şarkıyı arama yapmadan yeniden toplar (tam arşiv için)"""
+    youtube_url = f"https://www.youtube.com/watch?v={video_id}"
+    dosya_adi = os.path.splitext(arsiv_adi)[0]
+    try:
+        donusum = video_getir(youtube_url, dosya_adi, output_format, output_dir, gorev_id)
+    except SinirAsildi as e:
+        metrikler.say("indirme_hatasi")
+        print(f"[{gorev_id}] Atlandı ({str(e)}): {arsiv_adi}")
+        return None
+    return sonra(donusum, lambda dosya_yolu: (dosya_yolu, video_id) if dosya_yolu else None)
+
+def benzersiz_dosya_adi(ad, goruldu):
+    """Paralel indirmelerde aynı dosyaya yazılmaması için tekrar eden adlara numara ekler"""
+    anahtar = ad.lower()
+    goruldu[anahtar] = goruldu.get(anahtar, 0) + 1
+    if goruldu[anahtar] > 1:
+        ad = f"{ad} ({goruldu[anahtar]})"
+    return ad
+
+# Zaten sıkıştırılmış ses formatları ZIP'e sıkıştırılmadan (STORED) yazılır
+SIKISTIRILMIS_FORMATLAR = {'mp3', 'm4a', 'aac', 'opus', 'ogg', 'webm', 'flac'}
+
+def zip_sikistirma_turu(dosya_yolu):
+    """Dosya uzantısına göre ZIP sıkıştırma yöntemini seçer"""
+    uzanti = os.path.splitext(dosya_yolu)[1].lstrip('.').lower()
+    return zipfile.ZIP_STORED if uzanti in SIKISTIRILMIS_FORMATLAR else zipfile.ZIP_DEFLATED
+
+def gorev_yollari(gorev_id, dizin=None):
+    """Görevin çalışma dizini, delta ZIP'i ve tam arşiv ZIP'i (varsayılan kök: GOREV_DIZINI)"""
+    dizin = dizin or GOREV_DIZINI
+    return (
+        os.path.join(dizin, str(gorev_id)),
+        os.path.join(dizin, f"{gorev_id}.zip"),
+        os.path.join(dizin, f"{gorev_id}_tam.zip"),
+    )
+
+def gorev_dosyalarini_sil(gorev_id, dizin=None):
+    """Görevin çalışma dizinini ve ZIP'lerini siler"""
+    temp_dir, zip_cikti_yolu, tam_zip_yolu = gorev_yollari(gorev_id, dizin)
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    for yol in (zip_cikti_yolu, tam_zip_yolu):
+        if os.path.exists(yol):
+            os.remove(yol)
+
+class ZipSonucu(NamedTuple):
+    """playlist_zipi_hazirla sonucu; tam_eklenen 0 ise tam arşiv ZIP'i yoktur"""
+    zip_yolu: str
+    tam_zip_yolu: str
+    eklenen: int
+    tam_eklenen: int
+    toplam: int
+    yeni_teslimler: list
+
+def playlist_zipi_hazirla(playlist_url, output_format, gorev_id, onceki_teslimler=None, tam_arsiv=False,
+                          ilerleme_bildir=None, iptal=None, dizin=None, snapshot_id=None):
+    """Playlist'in şarkılarını bulup indirir ve görev ZIP'ine yazar; ZipSonucu döner.
+    
+    onceki_teslimler ({spotify_id: (video_id, arsiv_adi)}) verilirse senkron moddur: yalnızca
+    bunlarda olmayan şarkılar işlenir (delta ZIP); tam_arsiv=True ise öncekiler de eklenmiş
+    ikinci bir ZIP hazırlanır.
+    
+    ZIP'e yazılan her şarkı görev dizinindeki manifeste işlenir; aynı gorev_id ile yeniden
+    çağrılırsa yazılmış şarkılar atlanır, diskte kalan dönüştürülmüş dosyalar kullanılır.
+    
+    ilerleme_bildir(tamamlanan, toplam) her biten şarkıda çağrılır (toplam bilinmiyorsa None).
+    iptal (threading.Event) kurulunca ilk fırsatta GorevIptalEdildi fırlatılır; dosyalar silinmez.
+    snapshot_id, playlist'in istek anındaki snapshot'ıdır (bkz. spotify_playlist_akisi).
+    """
+    temp_dir, zip_cikti_yolu, tam_zip_yolu = gorev_yollari(gorev_id, dizin)
+    os.makedirs(temp_dir, exist_ok=True)
+    senkron = onceki_teslimler is not None
+    onceki_teslimler = onceki_teslimler or {}
+    tam_arsiv = senkron and tam_arsiv
+    
+    print(f"[{gorev_id}] Playlist parsing başladı...")
+    
+    yeni_teslimler = []
+    toplam_sarki = None  # İlk sayfa gelene kadar bilinmiyor
+    gonderilen = 0
+    tamamlanan = 0
+    zipe_eklenen = 0
+    tam_arsive_eklenen = 0
+    goruldu = {}
+    
+    def iptal_kontrol():
+        if iptal is not None and iptal.is_set():
+            raise GorevIptalEdildi("Görev iptal edildi.")
+    
+    def bildir():
+        if ilerleme_bildir:
+            ilerleme_bildir(tamamlanan, toplam_sarki)
+    
+    def toplam_bildir(sayi):
+        nonlocal toplam_sarki
+        # Senkron modda yeni şarkı sayısı ancak playlist bitince belli olur
+        if not senkron:
+            toplam_sarki = sayi
+        if KUCUK_IS_ESIGI:
+            havuz.agirlik_ayarla(max(1.0, KUCUK_IS_ESIGI / max(sayi, 1)))
+            kodlama_kuyrugu.agirlik_ayarla(havuz.agirlik)
+        # Toplam şarkı sayısını güncelle
+        bildir()
+        print(f"[{gorev_id}] {sayi} şarkı bulundu (ortak {ISCI_SAYISI} işçi, ağırlık {havuz.agirlik:g})")
+    
+    def biteni_isle(is_, anahtar, sarki, zipf, tam_zipf):
+        """Biten şarkıyı hemen ZIP'e yazar ve ilerlemeyi günceller; sarki None ise önceki teslimdir"""
+        nonlocal tamamlanan, zipe_eklenen, tam_arsive_eklenen
+        try:
+            sonuc = is_.result()
+            if isinstance(sonuc, Future):
+                # İndirme bitti, dönüştürme sürüyor: indirme işçisi serbest, sonucu ayrıca beklenir
+                bekleyenler[sonuc] = (anahtar, sarki)
+                return
+            if sonuc:
+                dosya_yolu, video_id = sonuc
+                arsiv_adi = os.path.basename(dosya_yolu)
+                sikistirma = zip_sikistirma_turu(dosya_yolu)
+                yazilanlar = {}
+                with metrikler.olc("zip", gorev_id):
+                    if sarki is not None:
+                        zipf.write(dosya_yolu, arsiv_adi, compress_type=sikistirma)
+                        yazilanlar["delta"] = (zipf, arsiv_adi)
+                    if tam_zipf is not None:
+                        tam_zipf.write(dosya_yolu, arsiv_adi, compress_type=sikistirma)
+                        yazilanlar["tam"] = (tam_zipf, arsiv_adi)
+                    manifest.kaydet(
+                        anahtar, yazilanlar,
+                        spotify_id=sarki.spotify_id if sarki is not None else None,
+                        video_id=video_id,
+                        arsiv_adi=arsiv_adi
+                    )
+                if sarki is not None:
+                    zipe_eklenen += 1
+                    yeni_teslimler.append((sarki.spotify_id, video_id, arsiv_adi))
+                if tam_zipf is not None:
+                    tam_arsive_eklenen += 1
+                # Aynı veri diskte iki kez durmasın
+                os.remove(dosya_yolu)
+        except Exception as e:
+            ad = sarki.arama_sorgusu if sarki is not None else "önceki teslim"
+            print(f"[{gorev_id}] Şarkı hatası ({ad}): {str(e)}")
+        
+        # İlerlemeyi güncelle - Her biten şarkıda
+        if sarki is not None:
+            tamamlanan += 1
+            bildir()
+    
+    # Şarkılar tüm görevlerin paylaştığı işçilerde adil sırayla işlenir; playlist'in ilk
+    # sayfası gelir gelmez indirmeler başlar, kalan sayfalar bu sırada yüklenir
+    bekleyenler = {}
+    with ExitStack() as yigin:
+        manifest = yigin.enter_context(GorevManifesti(temp_dir))
+        if manifest.devam_edilebilir({"delta": zip_cikti_yolu, "tam": tam_zip_yolu}):
+            print(f"[{gorev_id}] Kaldığı yerden devam ediliyor ({len(manifest.parcalar)} şarkı hazır)")
+            zipe_eklenen = manifest.girdi_sayisi("delta")
+            tam_arsive_eklenen = manifest.girdi_sayisi("tam")
+            yeni_teslimler.extend(
+                (kayit['spotify_id'], kayit['video_id'], kayit['arsiv_adi'])
+                for kayit in manifest.parcalar.values() if kayit['spotify_id']
+            )
+        zipf = yigin.enter_context(manifest.zip_ac(zip_cikti_yolu, "delta"))
+        tam_zipf = yigin.enter_context(manifest.zip_ac(tam_zip_yolu, "tam")) if tam_arsiv else None
+        # Kodlama kuyruğu indirme kuyruğundan önce açılır: çıkışta indirmeler bittikten sonra kapanır
+        kodlama_kuyrugu = yigin.enter_context(donusturucu.kuyruk(gorev_id))
+        havuz = yigin.enter_context(indirme_zamanlayici.kuyruk(gorev_id))
+        
+        if tam_arsiv:
+            # Önceki teslimler arama yapılmadan, önbellekteki dosyalardan yeniden toplanır
+            onceki_dizin = os.path.join(temp_dir, "onceki")
+            os.makedirs(onceki_dizin, exist_ok=True)
+            for video_id, arsiv_adi in onceki_teslimler.values():
+                anahtar = f"onceki:{arsiv_adi}"
+                if anahtar in manifest.parcalar:
+                    continue
+                is_ = havuz.gonder(teslim_edileni_getir, video_id, arsiv_adi, output_format, onceki_dizin, gorev_id)
+                bekleyenler[is_] = (anahtar, None)
+        
+        for sayfa in spotify_playlist_akisi(playlist_url, toplam_bildir, gorev_id, snapshot_id):
+            iptal_kontrol()
+            for sarki in sayfa:
+                if sarki.spotify_id and sarki.spotify_id in onceki_teslimler:
+                    continue
+                # Dosya adı görev içinde benzersiz ve aynı playlist için her çalıştırmada aynıdır
+                dosya_adi = benzersiz_dosya_adi(sarki.arama_sorgusu, goruldu)
+                gonderilen += 1
+                if dosya_adi in manifest.parcalar:
+                    tamamlanan += 1
+                    continue
+                is_ = havuz.gonder(sarki_isle, sarki, dosya_adi, output_format, temp_dir, gorev_id)
+                bekleyenler[is_] = (dosya_adi, sarki)
+            
+            # Sayfalar arasında biten şarkılar beklemeden ZIP'e yazılır
+            bitenler, _ = wait(bekleyenler, timeout=0)
+            for is_ in bitenler:
+                biteni_isle(is_, *bekleyenler.pop(is_), zipf, tam_zipf)
+        
+        if gonderilen == 0 and not senkron:
+            raise Exception("Playlist'te şarkı bulunamadı")
+        
+        # Kesin sayı: Spotify toplamından yerel dosyalar ve silinmiş şarkılar düşülür
+        toplam_sarki = gonderilen
+        
+        # Dönüştürmeye geçen şarkılar bekleyenlere yeniden eklendiğinden liste her turda tazelenir;
+        # iptal işareti de en geç saniyede bir okunur
+        while bekleyenler:
+            iptal_kontrol()
+            bitenler, _ = wait(bekleyenler, timeout=1, return_when=FIRST_COMPLETED)
+            for is_ in bitenler:
+                biteni_isle(is_, *bekleyenler.pop(is_), zipf, tam_zipf)
+    
+    if zipe_eklenen == 0 and not senkron:
+        raise Exception("Hiçbir şarkı indirilemedi")
+    
+    print(f"[{gorev_id}] ZIP hazır ({zipe_eklenen} dosya)")
+    return ZipSonucu(zip_cikti_yolu, tam_zip_yolu, zipe_eklenen, tam_arsive_eklenen, toplam_sarki, yeni_teslimler)
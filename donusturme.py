@@ -0,0 +1,221 @@
+import os
+import subprocess
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+
+from zamanlayici import AdilZamanlayici
+
+# Hedef format -> (stream-copy ile taşınabilecek kaynak codec'leri, gerçek kodlama ayarları)
+HEDEF_FORMATLAR = {
+    'mp3': ({'mp3'}, ['-c:a', 'libmp3lame', '-q:a', '0']),
+    'm4a': ({'aac', 'alac'}, ['-c:a', 'aac', '-b:a', '256k']),
+    'wav': ({'pcm_s16le'}, ['-c:a', 'pcm_s16le']),
+    'opus': ({'opus'}, ['-c:a', 'libopus', '-b:a', '160k']),
+    'ogg': ({'vorbis', 'opus'}, ['-c:a', 'libvorbis', '-q:a', '6']),
+    'flac': ({'flac'}, ['-c:a', 'flac']),
+}
+
+
+# İptal edilen görev etiketlerinden bellekte tutulan en fazla sayı
+IPTAL_KAYDI_SINIRI = 1000
+
+
+class DonusturmeHatasi(Exception):
+    """ffmpeg/ffprobe'un dönüştürmeyi tamamlayamadığı durum"""
+
+
+def hazir(sonuc):
+    """Sonucu zaten belli olan tamamlanmış bir Future"""
+    gelecek = Future()
+    gelecek.set_result(sonuc)
+    return gelecek
+
+
+def sonra(gelecek, islev):
+    """gelecek bitince sonucuna islev'i uygulayan yeni bir Future döner; hata aynen aktarılır"""
+    yeni = Future()
+
+    def bitince(f):
+        try:
+            yeni.set_result(islev(f.result()))
+        except Exception as e:
+            yeni.set_exception(e)
+
+    gelecek.add_done_callback(bitince)
+    return yeni
+
+
+def kaynak_codec(dosya_yolu):
+    """Dosyadaki ilk ses akışının codec adını ffprobe ile okur; okunamazsa None"""
+    try:
+        sonuc = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
+             '-show_entries', 'stream=codec_name', '-of', 'default=noprint_wrappers=1:nokey=1',
+             dosya_yolu],
+            capture_output=True, text=True, timeout=30
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    codec = sonuc.stdout.strip().splitlines()
+    return codec[0] if sonuc.returncode == 0 and codec else None
+
+
+def _ffmpeg(kaynak, hedef, codec_ayarlari, zaman_asimi, surec_kaydi=None):
+    """ffmpeg'i çalıştırır; başarısız olursa yarım kalan çıktıyı silip DonusturmeHatasi fırlatır.
+
+    surec_kaydi verilirse başlayan süreç onunla kaydedilir (iptalde öldürülebilsin diye).
+    """
+    # Önce geçici ada yazılır: hedef yalnızca tamamlanmış dönüştürmeden sonra var olur
+    kok, uzanti = os.path.splitext(hedef)
+    gecici = f"{kok}.yarim{uzanti}"
+    komut = ['ffmpeg', '-v', 'error', '-nostdin', '-i', kaynak, '-vn', *codec_ayarlari, '-y', gecici]
+    try:
+        surec = subprocess.Popen(komut, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        with surec_kaydi(surec) if surec_kaydi else nullcontext():
+            try:
+                _, hata = surec.communicate(timeout=zaman_asimi)
+            except subprocess.TimeoutExpired:
+                surec.kill()
+                surec.communicate()
+                raise DonusturmeHatasi(f"Dönüştürme {zaman_asimi} saniyede bitmedi")
+        if surec.returncode != 0:
+            raise DonusturmeHatasi(hata.strip()[-300:] or f"ffmpeg çıkış kodu {surec.returncode}")
+        os.replace(gecici, hedef)
+    except BaseException:
+        if os.path.exists(gecici):
+            os.remove(gecici)
+        raise
+    finally:
+        if os.path.exists(kaynak):
+            os.remove(kaynak)
+    return hedef
+
+
+class Donusturucu:
+    """İndirilen ham ses dosyasını hedef formata getirir.
+
+    Kaynak codec hedefe uyuyorsa yeniden kodlamadan taşınır (yeniden adlandırma veya remux);
+    uymuyorsa kodlama, CPU sayısı kadar ffmpeg sürecinin eşzamanlı çalıştığı ayrı bir havuzda yapılır.
+    Havuz indirmelerle aynı adil zamanlayıcıyı kullanır: kuyruk(etiket) ile açılan her görevin
+    kodlamaları kendi kuyruğunda bekler, büyük bir playlist küçük bir görevin kodlamalarını geciktirmez.
+
+    Kodlama bekleyen (diskte ham duran) dosya sayısı kuyruk_siniri ile sınırlıdır: sınır doluysa
+    donustur() yer açılana kadar çağıranı bekletir. Taşıma/remux yer almaz, indirmeleri yavaşlatmaz.
+    """
+
+    def __init__(self, isci_sayisi=None, zaman_asimi=300, kuyruk_siniri=None, yer_bekleme_olcumu=None):
+        self.isci_sayisi = isci_sayisi or os.cpu_count() or 1
+        self.zaman_asimi = zaman_asimi
+        self._yerler = threading.BoundedSemaphore(kuyruk_siniri or 2 * self.isci_sayisi)
+        # yer_bekleme_olcumu(etiket): yer beklemesini saran context manager (süre ölçümü için)
+        self.yer_bekleme_olcumu = yer_bekleme_olcumu
+        self._zamanlayici = AdilZamanlayici(self.isci_sayisi, ad="donusturme")
+        # Kuyruğu açılmamış görevlerin (ve etiketsiz işlerin) kodlamaları
+        self._ortak_kuyruk = self._zamanlayici.kuyruk(None)
+        self._kuyruklar = {}        # etiket -> GorevKuyrugu
+        self._kilit = threading.Lock()
+        self._surecler = {}         # ffmpeg süreci -> görev etiketi
+        self._iptal_edilenler = {}  # etiket -> None (ekleme sırasıyla; eskiler atılır)
+
+    @contextmanager
+    def _surec_kaydi(self, etiket, surec):
+        with self._kilit:
+            self._surecler[surec] = etiket
+            iptal = etiket is not None and etiket in self._iptal_edilenler
+        try:
+            if iptal:
+                surec.kill()
+            yield
+        finally:
+            with self._kilit:
+                self._surecler.pop(surec, None)
+
+    def _iptal_mi(self, etiket):
+        return etiket is not None and etiket in self._iptal_edilenler
+
+    def _yer_al(self, kaynak, etiket):
+        """Kodlama sırasında yer açılana kadar bekler; görev bu arada iptal edilirse kaynağı silip fırlatır"""
+        with self.yer_bekleme_olcumu(etiket) if self.yer_bekleme_olcumu else nullcontext():
+            while not self._yerler.acquire(timeout=1):
+                if self._iptal_mi(etiket):
+                    if os.path.exists(kaynak):
+                        os.remove(kaynak)
+                    raise DonusturmeHatasi("Görev iptal edildi")
+
+    def _kodla(self, kaynak, hedef, codec_ayarlari, etiket):
+        if self._iptal_mi(etiket):
+            # Havuzda sırası gelmeden görevi iptal edilen dönüştürme hiç başlamaz
+            if os.path.exists(kaynak):
+                os.remove(kaynak)
+            raise DonusturmeHatasi("Görev iptal edildi")
+        return _ffmpeg(kaynak, hedef, codec_ayarlari, self.zaman_asimi,
+                       lambda surec: self._surec_kaydi(etiket, surec))
+
+    @contextmanager
+    def kuyruk(self, etiket, agirlik=1.0):
+        """Görevin kodlama kuyruğunu açar (`with` ile); çıkışta başlamamış kodlamalar iptal edilir"""
+        kuyruk = self._zamanlayici.kuyruk(etiket, agirlik)
+        with self._kilit:
+            self._kuyruklar[etiket] = kuyruk
+        try:
+            yield kuyruk
+        finally:
+            with self._kilit:
+                if self._kuyruklar.get(etiket) is kuyruk:
+                    del self._kuyruklar[etiket]
+            kuyruk.kapat()
+
+    def donustur(self, kaynak, hedef, output_format, etiket=None):
+        """kaynak'ı hedef'e dönüştürür ve hedef yolunu taşıyan bir Future döner.
+
+        Kopyalanabilen dosyalar çağıran thread'de hemen işlenir; kodlama gerekiyorsa
+        iş havuza bırakılır ve çağıran beklemeden devam edebilir. Kaynak her durumda silinir.
+        etiket (görev ID'si) verilirse iptal_et ile o görevin ffmpeg süreçleri durdurulabilir.
+        """
+        uyumlu_codecler, kodlama = HEDEF_FORMATLAR.get(output_format, (set(), ['-c:a', 'copy']))
+        codec = kaynak_codec(kaynak)
+
+        if codec in uyumlu_codecler:
+            try:
+                if os.path.splitext(kaynak)[1].lstrip('.').lower() == output_format:
+                    os.replace(kaynak, hedef)
+                    return hazir(hedef)
+                # Aynı codec, farklı kap (ör. webm içindeki opus): yalnızca remux
+                return hazir(self._kodla(kaynak, hedef, ['-map_metadata', '0', '-c:a', 'copy'], etiket))
+            except Exception as e:
+                gelecek = Future()
+                gelecek.set_exception(e)
+                return gelecek
+
+        try:
+            self._yer_al(kaynak, etiket)
+        except Exception as e:
+            gelecek = Future()
+            gelecek.set_exception(e)
+            return gelecek
+        # Her ffmpeg tek çekirdek kullanır; havuz boyutu eşzamanlı kodlama sayısını CPU sayısıyla sınırlar
+        with self._kilit:
+            kuyruk = self._kuyruklar.get(etiket, self._ortak_kuyruk)
+        try:
+            gelecek = kuyruk.gonder(self._kodla, kaynak, hedef, ['-threads', '1', *kodlama], etiket)
+        except BaseException:
+            self._yerler.release()
+            raise
+        gelecek.add_done_callback(lambda _: self._yerler.release())
+        return gelecek
+
+    def iptal_et(self, etiket):
+        """Etiketin çalışan ffmpeg süreçlerini öldürür; sırada bekleyenleri başlatmaz"""
+        with self._kilit:
+            self._iptal_edilenler[etiket] = None
+            while len(self._iptal_edilenler) > IPTAL_KAYDI_SINIRI:
+                del self._iptal_edilenler[next(iter(self._iptal_edilenler))]
+            kesilecekler = [surec for surec, surec_etiketi in self._surecler.items() if surec_etiketi == etiket]
+        for surec in kesilecekler:
+            surec.kill()
+        return len(kesilecekler)
+
+    def kapat(self):
+        """Ortak kuyruktaki başlamamış kodlamaları iptal eder (işçi thread'leri daemon'dır)"""
+        self._ortak_kuyruk.kapat()
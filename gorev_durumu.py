@@ -0,0 +1,212 @@
+import atexit
+import re
+import threading
+import time
+
+# Bu durumlara geçen görevler bir süre sonra bellekten atılır
+BITIS_DURUMLARI = {"TAMAMLANDI", "HATA", "İPTAL"}
+
+# PostgREST (PGRST204) ve Postgres (42703) bilinmeyen sütun hataları
+_BILINMEYEN_SUTUN_DESENLERI = (
+    re.compile(r"Could not find the '([^']+)' column"),
+    re.compile(r'column "([^"]+)" of relation "[^"]+" does not exist'),
+)
+
+
+def bilinmeyen_sutun(hata):
+    """Hata, tabloda olmayan bir sütuna yazmaktan kaynaklanıyorsa sütunun adını döner"""
+    metin = f"{getattr(hata, 'message', '') or ''} {hata}"
+    for desen in _BILINMEYEN_SUTUN_DESENLERI:
+        eslesme = desen.search(metin)
+        if eslesme:
+            return eslesme.group(1)
+    return None
+
+
+class GorevDurumDeposu:
+    """Görev durumlarını bellekte tutar ve gorevler tablosuna arka planda birleştirerek yazar.
+
+    İlerleme güncellemeleri görev başına en fazla `yazma_araligi` saniyede bir yazılır;
+    durum geçişleri (durum alanındaki her değişiklik) beklemeden yazılır.
+
+    Yazılamayan alanlar en fazla `maks_deneme` kez yeniden denenir, sonra bırakılır. Tabloda
+    olmayan bir sütun (şema güncellenmemiş, bkz. sema.sql) bir kez uyarılır ve sonraki
+    yazmalarda atlanır; böylece diğer alanlar, özellikle bitiş durumu, yine yazılır.
+    """
+
+    def __init__(self, supabase, yazma_araligi=5.0, bellekte_tutma=3600, takipci_bul=None, maks_deneme=5):
+        self.supabase = supabase
+        # Aynı işe bağlanan görevlerin satırları da her yazmada güncellenir
+        self.takipci_bul = takipci_bul
+        self.yazma_araligi = yazma_araligi
+        self.bellekte_tutma = bellekte_tutma
+        self.maks_deneme = maks_deneme
+        self._kilit = threading.Lock()
+        self._kosul = threading.Condition(self._kilit)     # yazıcıyı uyandırır
+        self._degisim = threading.Condition(self._kilit)   # durum dinleyicilerini (SSE) uyandırır
+        self._surumler = {}     # gorev_id -> her değişiklikte artan sayaç
+        self._durumlar = {}     # gorev_id -> güncel satır
+        self._bekleyen = {}     # gorev_id -> henüz yazılmamış alanlar
+        self._acil = set()      # durum geçişi olan, hemen yazılacak görevler
+        self._son_yazma = {}    # gorev_id -> son başarılı yazma zamanı
+        self._eklendi = set()   # tabloya ilk satırı yazılmış görevler
+        self._bitis = {}        # gorev_id -> bitiş durumunun yazıldığı zaman
+        self._son_degisim = {}  # gorev_id -> son değişiklik zamanı
+        self._hatalar = {}      # gorev_id -> art arda başarısız yazma sayısı
+        self._atlanan_sutunlar = set()  # tabloda bulunmayan sütunlar
+        self._yazici = None
+        atexit.register(self.bosalt)
+
+    def _yaziciyi_baslat(self):
+        if self._yazici is None or not self._yazici.is_alive():
+            self._yazici = threading.Thread(target=self._yazma_dongusu, daemon=True)
+            self._yazici.start()
+
+    def olustur(self, gorev_id, **alanlar):
+        """Yeni görevi bellekte açar; tabloya ilk yazma upsert olarak yapılır"""
+        with self._kosul:
+            self._durumlar[gorev_id] = {"id": gorev_id, **alanlar}
+            self._bekleyen[gorev_id] = {"id": gorev_id, **alanlar}
+            self._eklendi.discard(gorev_id)
+            self._bitis.pop(gorev_id, None)
+            self._acil.add(gorev_id)
+            self._degisti(gorev_id)
+
+    def guncelle(self, gorev_id, **alanlar):
+        """Bellekteki durumu hemen günceller; tabloya yazma arka planda yapılır"""
+        with self._kosul:
+            durum = self._durumlar.setdefault(gorev_id, {"id": gorev_id})
+            if "durum" in alanlar and alanlar["durum"] != durum.get("durum"):
+                self._acil.add(gorev_id)
+            durum.update(alanlar)
+            self._bekleyen.setdefault(gorev_id, {}).update(alanlar)
+            self._degisti(gorev_id)
+
+    def _degisti(self, gorev_id):
+        """Yazıcıyı ve dinleyicileri uyandırır (kilit altında çağrılır)"""
+        self._surumler[gorev_id] = self._surumler.get(gorev_id, 0) + 1
+        self._son_degisim[gorev_id] = time.time()
+        self._yaziciyi_baslat()
+        self._kosul.notify()
+        self._degisim.notify_all()
+
+    def al(self, gorev_id):
+        """Bu süreçte bilinen görevin durumunu döner, bilinmiyorsa None"""
+        with self._kosul:
+            durum = self._durumlar.get(gorev_id)
+            return dict(durum) if durum else None
+
+    def degisiklik_bekle(self, gorev_id, son_surum, zaman_asimi):
+        """Görevin sürümü son_surum'u geçene kadar (en fazla zaman_asimi sn) bekler.
+
+        (surum, durum) döner; görev bu süreçte bilinmiyorsa durum None olur.
+        """
+        with self._degisim:
+            self._degisim.wait_for(
+                lambda: gorev_id not in self._durumlar or self._surumler.get(gorev_id, 0) > son_surum,
+                timeout=zaman_asimi
+            )
+            durum = self._durumlar.get(gorev_id)
+            return self._surumler.get(gorev_id, 0), (dict(durum) if durum else None)
+
+    def _yazilacaklari_sec(self, simdi, hepsi=False):
+        """Yazma zamanı gelen görevlerin bekleyen alanlarını çeker (kilit altında çağrılır)"""
+        secilenler = []
+        for gorev_id in list(self._bekleyen):
+            if hepsi or gorev_id in self._acil or \
+                    simdi - self._son_yazma.get(gorev_id, 0) >= self.yazma_araligi:
+                secilenler.append((gorev_id, self._bekleyen.pop(gorev_id)))
+                self._acil.discard(gorev_id)
+        return secilenler
+
+    def _yaz(self, gorev_id, alanlar):
+        alanlar = {k: v for k, v in alanlar.items() if k not in self._atlanan_sutunlar}
+        if not alanlar:
+            return
+        if gorev_id in self._eklendi:
+            self.supabase.table("gorevler").update(alanlar).eq("id", gorev_id).execute()
+        else:
+            with self._kosul:
+                satir = dict(self._durumlar.get(gorev_id, {}))
+            satir.update(alanlar)
+            satir = {k: v for k, v in satir.items() if k not in self._atlanan_sutunlar}
+            # Kuyruktan yeniden alınan görevin satırı başka bir süreçte açılmış olabilir
+            self.supabase.table("gorevler").upsert(satir).execute()
+            self._eklendi.add(gorev_id)
+            alanlar = satir
+
+        takipciler = self.takipci_bul(gorev_id) if self.takipci_bul else []
+        if takipciler:
+            yansima = {k: v for k, v in alanlar.items() if k not in ("id", "kaynak")}
+            self.supabase.table("gorevler").update(yansima).in_("id", takipciler).execute()
+
+    def _yazilanlari_isle(self, secilenler, simdi):
+        for gorev_id, alanlar in secilenler:
+            try:
+                self._yaz(gorev_id, alanlar)
+            except Exception as e:
+                sutun = bilinmeyen_sutun(e)
+                with self._kosul:
+                    if sutun and sutun not in self._atlanan_sutunlar:
+                        # Deneme sayılmaz: alanlar bu sütun olmadan hemen yeniden yazılır
+                        print(f"[{gorev_id}] gorevler tablosunda '{sutun}' sütunu yok, yazılmayacak (sema.sql uygulanmalı)")
+                        self._atlanan_sutunlar.add(sutun)
+                        deneme = 0
+                    else:
+                        deneme = self._hatalar.get(gorev_id, 0) + 1
+                    if deneme >= self.maks_deneme:
+                        print(f"[{gorev_id}] Durum {deneme} denemede yazılamadı, bırakılıyor: {str(e)}")
+                        self._hatalar.pop(gorev_id, None)
+                        continue
+                    if deneme:
+                        print(f"[{gorev_id}] Durum yazılamadı, tekrar denenecek: {str(e)}")
+                        self._hatalar[gorev_id] = deneme
+                    # Yazılamayan alanlar, bu arada gelen daha yeni alanların altına geri konur
+                    self._bekleyen[gorev_id] = {**alanlar, **self._bekleyen.get(gorev_id, {})}
+                    if "durum" in alanlar or not deneme:
+                        self._acil.add(gorev_id)
+                continue
+
+            with self._kosul:
+                self._hatalar.pop(gorev_id, None)
+                self._son_yazma[gorev_id] = simdi
+                durum = self._durumlar.get(gorev_id, {}).get("durum")
+                if durum in BITIS_DURUMLARI and gorev_id not in self._bekleyen:
+                    self._bitis.setdefault(gorev_id, simdi)
+
+    def _eskileri_at(self, simdi):
+        """Bitişi yazılmış ya da saklama süresince hiç değişmemiş görevleri bellekten atar (kilit altında).
+
+        Bitmeden sessizleşen görev (ör. başka sürece geçmiş iş) bellekte bayat durumla kalmaz;
+        yazılmamış alanı olan görev atılmaz.
+        """
+        atilacaklar = [g for g, zaman in self._bitis.items() if simdi - zaman >= self.bellekte_tutma]
+        atilacaklar += [
+            g for g, zaman in self._son_degisim.items()
+            if simdi - zaman >= self.bellekte_tutma and g not in self._bekleyen and g not in self._bitis
+        ]
+        for gorev_id in atilacaklar:
+            for tablo in (self._durumlar, self._son_yazma, self._bitis, self._surumler, self._son_degisim, self._hatalar):
+                tablo.pop(gorev_id, None)
+            self._eklendi.discard(gorev_id)
+
+    def _yazma_dongusu(self):
+        while True:
+            with self._kosul:
+                if not self._acil:
+                    self._kosul.wait(timeout=self.yazma_araligi)
+                simdi = time.time()
+                secilenler = self._yazilacaklari_sec(simdi)
+                self._eskileri_at(simdi)
+
+            self._yazilanlari_isle(secilenler, simdi)
+
+            # Hata sonrası aynı görevi sürekli denememek için kısa bir bekleme
+            if secilenler and any(g in self._hatalar for g, _ in secilenler):
+                time.sleep(1)
+
+    def bosalt(self):
+        """Bekleyen tüm yazmaları hemen yapar (kapanışta çağrılır)"""
+        with self._kosul:
+            secilenler = self._yazilacaklari_sec(time.time(), hepsi=True)
+        self._yazilanlari_isle(secilenler, time.time())
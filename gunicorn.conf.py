@@ -0,0 +1,27 @@
+import os
+
+# gunicorn bu dosyayı çalışma dizininden kendiliğinden okur: `gunicorn app:app`
+#
+# SSE akışları (/api/status/<id>/events) SSE_MAKS_SURE boyunca açık kalır. Varsayılan sync
+# worker bir isteği `timeout` saniyeden uzun tutunca worker'ı öldürür ve süreçteki kuyruk
+# işçileri (IsciHavuzu) de onunla ölür. gthread worker'da istekler thread'lerde çalışır; ana
+# döngü canlılık bildirmeyi sürdürdüğünden uzun akışlar zaman aşımına takılmaz.
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+# Worker başına eşzamanlı istek sayısı; açık her SSE bağlantısı bir thread tutar
+threads = int(os.environ.get("GUNICORN_THREADS", "64"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+# Kapanışta açık SSE bağlantıları bu kadar beklenir; tarayıcı yeniden bağlanır
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+
+def post_worker_init(worker):
+    """Her worker süreci, uygulama yüklenir yüklenmez kendi kuyruk işçilerini başlatır.
+
+    İlk HTTP isteği beklenmez: yeniden başlatma veya deploy sonrası kuyruktaki ve yarıda kalmış
+    işler trafik gelmeden devam eder. --preload ile de güvenlidir (havuz süreç kimliğine bakar).
+    """
+    from app import is_havuzu
+    is_havuzu.baslat()
@@ -0,0 +1,147 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+
+def kota_sifirlanma_zamani(simdi=None):
+    """YouTube Data API günlük kotasının sıfırlanacağı an (Pasifik saatiyle gece yarısı), epoch saniye"""
+    simdi = simdi or time.time()
+    try:
+        pasifik = ZoneInfo("America/Los_Angeles")
+    except Exception:
+        # Sistemde saat dilimi verisi yoksa en kötü durumda bir gün beklenir
+        return simdi + 24 * 3600
+    yarin = (datetime.fromtimestamp(simdi, pasifik) + timedelta(days=1)).date()
+    return datetime(yarin.year, yarin.month, yarin.day, tzinfo=pasifik).timestamp()
+
+
+class HizSinirlayici:
+    """Tüm görevlerin paylaştığı token bucket ve jitter'lı üstel geri çekilme.
+
+    Saniyede `hiz` istek, en fazla `kapasite` kadar ani yük. 429/5xx gibi geçici hatalarda
+    geri_cekil() tüm çağıranları birlikte duraklatır; ardışık hatalarda bekleme üstel büyür
+    (full jitter). Kota bittiyse kota_bitti_isaretle() ile sıfırlanma zamanına kadar istek yapılmaz.
+
+    db_yolu verilirse jetonlar, duraklama ve kota durumu bu SQLite dosyasında tutulur ve her
+    değişiklik süreçler arası yazma kilidiyle (BEGIN IMMEDIATE) yapılır: aynı dosyayı kullanan
+    tüm worker süreçleri tek bir hız sınırını ve geri çekilmeyi paylaşır. Verilmezse durum
+    yalnızca bu süreçtedir.
+    """
+
+    def __init__(self, hiz, kapasite, taban_bekleme=1.0, maks_bekleme=60.0, db_yolu=None, ad="varsayilan"):
+        self.hiz = hiz
+        self.kapasite = kapasite
+        self.taban_bekleme = taban_bekleme
+        self.maks_bekleme = maks_bekleme
+        self.db_yolu = db_yolu
+        # Aynı dosyada birden çok sınırlayıcı tutulabilir
+        self.ad = ad
+        self._kilit = threading.Lock()
+        self._yerel = threading.local()
+        self._jetonlar = float(kapasite)
+        self._son_dolum = time.time()
+        self._duraklama_bitisi = 0.0    # bu ana kadar kimse istek yapmaz
+        self._ardisik_hata = 0
+        self._kota_bitisi = 0.0         # günlük kota sıfırlanana kadar
+
+        if self.db_yolu:
+            klasor = os.path.dirname(self.db_yolu)
+            if klasor:
+                os.makedirs(klasor, exist_ok=True)
+            with self._baglanti() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS hiz_siniri (
+                        ad TEXT PRIMARY KEY,
+                        jetonlar REAL NOT NULL,
+                        son_dolum REAL NOT NULL,
+                        duraklama_bitisi REAL NOT NULL,
+                        ardisik_hata INTEGER NOT NULL,
+                        kota_bitisi REAL NOT NULL
+                    )
+                """)
+
+    def _baglanti(self):
+        """Her thread kendi SQLite bağlantısını kullanır (fork sonrası yeniden açılır)"""
+        conn = getattr(self._yerel, 'conn', None)
+        if conn is None or self._yerel.pid != os.getpid():
+            conn = sqlite3.connect(self.db_yolu, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._yerel.conn = conn
+            self._yerel.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _durum(self):
+        """Durum alanlarını kilit altında açar; ortak dosya varsa önce oradan okur, çıkışta geri yazar"""
+        with self._kilit:
+            if not self.db_yolu:
+                yield
+                return
+            conn = self._baglanti()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT jetonlar, son_dolum, duraklama_bitisi, ardisik_hata, kota_bitisi "
+                    "FROM hiz_siniri WHERE ad = ?", (self.ad,)
+                ).fetchone()
+                if row is not None:
+                    (self._jetonlar, self._son_dolum, self._duraklama_bitisi,
+                     self._ardisik_hata, self._kota_bitisi) = row
+                yield
+                conn.execute(
+                    "INSERT OR REPLACE INTO hiz_siniri "
+                    "(ad, jetonlar, son_dolum, duraklama_bitisi, ardisik_hata, kota_bitisi) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.ad, self._jetonlar, self._son_dolum, self._duraklama_bitisi,
+                     self._ardisik_hata, self._kota_bitisi)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    @property
+    def kota_bitti(self):
+        with self._durum():
+            return time.time() < self._kota_bitisi
+
+    def al(self):
+        """Bir istek hakkı alınana kadar bekler (duraklama ve token bucket)"""
+        while True:
+            with self._durum():
+                simdi = time.time()
+                self._jetonlar = min(self.kapasite, self._jetonlar + max(0.0, simdi - self._son_dolum) * self.hiz)
+                self._son_dolum = simdi
+                if simdi < self._duraklama_bitisi:
+                    bekleme = self._duraklama_bitisi - simdi
+                elif self._jetonlar >= 1:
+                    self._jetonlar -= 1
+                    return
+                else:
+                    bekleme = (1 - self._jetonlar) / self.hiz
+            time.sleep(bekleme)
+
+    def basarili(self):
+        with self._durum():
+            self._ardisik_hata = 0
+
+    def geri_cekil(self, retry_after=None):
+        """Geçici hata sonrası tüm çağıranları duraklatır; bekleme süresini döner"""
+        with self._durum():
+            self._ardisik_hata += 1
+            if retry_after is not None:
+                bekleme = min(self.maks_bekleme, retry_after)
+            else:
+                ust_sinir = min(self.maks_bekleme, self.taban_bekleme * 2 ** (self._ardisik_hata - 1))
+                bekleme = random.uniform(0, ust_sinir)
+            self._duraklama_bitisi = max(self._duraklama_bitisi, time.time() + bekleme)
+            return bekleme
+
+    def kota_bitti_isaretle(self, bitis=None):
+        with self._durum():
+            self._kota_bitisi = bitis or kota_sifirlanma_zamani()
@@ -0,0 +1,241 @@
+import json
+import os
+import queue
+import select
+import subprocess
+import sys
+import threading
+
+
+class IndirmeHatasi(Exception):
+    """yt-dlp işçisinin bildirdiği indirme hatası"""
+
+
+class SinirAsildi(IndirmeHatasi):
+    """Video süre veya boyut sınırını aştığı için indirilmedi"""
+
+
+# İptal edilen görev etiketlerinden bellekte tutulan en fazla sayı
+IPTAL_KAYDI_SINIRI = 1000
+
+
+# Hedef formata yeniden kodlamadan taşınabilecek kaynak akışı tercih edilir
+KAYNAK_TERCIHI = {
+    'm4a': 'bestaudio[acodec^=mp4a]/bestaudio/best',
+    'opus': 'bestaudio[acodec=opus]/bestaudio/best',
+    'ogg': 'bestaudio[acodec=opus]/bestaudio/best',
+}
+
+
+def _ydl_ayarlari(output_format):
+    """Yalnızca indirme; dönüştürme ayrı aşamada (donusturme.Donusturucu) yapılır"""
+    return {
+        'format': KAYNAK_TERCIHI.get(output_format, 'bestaudio/best'),
+        'outtmpl': {'default': '%(id)s.%(ext)s'},
+        'noplaylist': True,
+        'quiet': True,
+        'no_warnings': True,
+        'noprogress': True,
+    }
+
+
+# Kotasız arama: yalnızca sonuç listesi okunur, video bilgisi çözülmez
+ARAMA_AYARLARI = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': 'in_playlist',
+    'skip_download': True,
+}
+
+
+def _sinir_filtresi(maks_sure, reddedilen):
+    """Bilgi çözülünce, indirme başlamadan önce çalışan match_filter; fazla uzun videoyu reddeder"""
+    def filtre(bilgi, *, incomplete=False):
+        sure = bilgi.get('duration')
+        if maks_sure and sure and sure > maks_sure:
+            reddedilen.append(f"Video çok uzun ({int(sure)} sn > {int(maks_sure)} sn)")
+            return reddedilen[-1]
+        return None
+    return filtre
+
+
+def isci_dongusu():
+    """İşçi süreci: stdin'den JSON istek okur, YoutubeDL ile indirir/arar, stdout'a JSON yanıt yazar"""
+    import yt_dlp
+
+    # Yanıt kanalını ayır; yt-dlp'nin stdout'a yazdığı her şey stderr'e gider
+    yanit_kanali = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    os.dup2(2, 1)
+
+    # Format başına tek YoutubeDL: extractor'lar ve HTTP bağlantıları istekler arasında yeniden kullanılır
+    ydl_ornekleri = {}
+    arama_ydl = None
+
+    for satir in sys.stdin:
+        try:
+            istek = json.loads(satir)
+            if istek.get('islem') == 'ara':
+                if arama_ydl is None:
+                    arama_ydl = yt_dlp.YoutubeDL(ARAMA_AYARLARI)
+                aday_sayisi = max(1, int(istek.get('aday_sayisi', 1)))
+                bilgi = arama_ydl.extract_info(f"ytsearch{aday_sayisi}:{istek['sorgu']}", download=False)
+                girdiler = [g for g in (bilgi or {}).get('entries') or [] if g and g.get('id')]
+                adaylar = [{"video_id": g['id'], "sure": g.get('duration')} for g in girdiler]
+                yanit = {"ok": True, "adaylar": adaylar, "hata": None}
+            else:
+                output_format = istek['output_format']
+                ydl = ydl_ornekleri.get(output_format)
+                if ydl is None:
+                    ydl = yt_dlp.YoutubeDL(_ydl_ayarlari(output_format))
+                    ydl_ornekleri[output_format] = ydl
+
+                ydl.params['outtmpl']['default'] = istek['cikti_sablonu']
+                # Sınırlar indirme başlamadan uygulanır: süre bilgi çözülünce, boyut bilinen
+                # format boyutuyla (bilinmiyorsa sunucunun bildirdiği uzunlukla) karşılaştırılır
+                reddedilen = []
+                ydl.params['match_filter'] = _sinir_filtresi(istek.get('maks_sure'), reddedilen)
+                ydl.params['max_filesize'] = istek.get('maks_boyut')
+                bilgi = ydl.extract_info(istek['youtube_url'], download=True)
+                indirilenler = (bilgi or {}).get('requested_downloads') or [{}]
+                dosya = indirilenler[0].get('filepath')
+                if reddedilen:
+                    yanit = {"ok": False, "hata": reddedilen[0], "sinir": True}
+                elif istek.get('maks_boyut') and dosya and not os.path.exists(dosya):
+                    yanit = {"ok": False, "hata": f"Dosya boyut sınırını ({istek['maks_boyut']} bayt) aşıyor", "sinir": True}
+                else:
+                    yanit = {"ok": True, "dosya": dosya, "hata": None}
+        except Exception as e:
+            yanit = {"ok": False, "hata": str(e)}
+
+        yanit_kanali.write(json.dumps(yanit) + "\n")
+        yanit_kanali.flush()
+
+
+class _IsciSureci:
+    """Tek bir uzun ömürlü yt-dlp işçi süreci"""
+
+    def __init__(self):
+        self.surec = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        self.is_sayisi = 0
+
+    @property
+    def canli(self):
+        return self.surec.poll() is None
+
+    def calistir(self, istek, zaman_asimi):
+        """İsteği gönderir ve yanıtı bekler; süre aşılırsa TimeoutError fırlatır"""
+        self.is_sayisi += 1
+        self.surec.stdin.write(json.dumps(istek) + "\n")
+        self.surec.stdin.flush()
+
+        hazir, _, _ = select.select([self.surec.stdout], [], [], zaman_asimi)
+        if not hazir:
+            raise TimeoutError(f"İndirme {zaman_asimi} saniyede bitmedi")
+
+        satir = self.surec.stdout.readline()
+        if not satir:
+            raise IndirmeHatasi("yt-dlp işçisi beklenmedik şekilde kapandı")
+        return json.loads(satir)
+
+    def durdur(self):
+        if self.canli:
+            self.surec.kill()
+        self.surec.wait()
+
+
+class IndirmeMotoru:
+    """yt-dlp'yi her parça için yeni süreç açmadan, uzun ömürlü işçi süreçlerinde çalıştırır"""
+
+    def __init__(self, isci_sayisi, zaman_asimi=300, isci_omru=200):
+        self.isci_sayisi = isci_sayisi
+        self.zaman_asimi = zaman_asimi
+        # Uzun süre çalışan işçilerdeki bellek birikimine karşı belirli sayıda işten sonra yenilenir
+        self.isci_omru = isci_omru
+        self._bosta = queue.LifoQueue()
+        self._kilit = threading.Lock()
+        self._olusturulan = 0
+        self._calisanlar = {}       # işçi -> isteği gönderen görevin etiketi
+        self._iptal_edilenler = {}  # etiket -> None (ekleme sırasıyla; eskiler atılır)
+
+    def _isci_al(self):
+        with self._kilit:
+            if self._bosta.empty() and self._olusturulan < self.isci_sayisi:
+                self._olusturulan += 1
+                return _IsciSureci()
+        return self._bosta.get()
+
+    def _isci_birak(self, isci, saglam):
+        if saglam and isci.canli and isci.is_sayisi < self.isci_omru:
+            self._bosta.put(isci)
+            return
+        # Bozuk, süresi aşılmış veya ömrünü doldurmuş işçinin yerine yenisi açılır
+        isci.durdur()
+        self._bosta.put(_IsciSureci())
+
+    def _calistir(self, istek, zaman_asimi, etiket=None):
+        isci = self._isci_al()
+        with self._kilit:
+            if etiket is not None and etiket in self._iptal_edilenler:
+                self._bosta.put(isci)
+                raise IndirmeHatasi("Görev iptal edildi")
+            self._calisanlar[isci] = etiket
+        saglam = False
+        try:
+            yanit = isci.calistir(istek, zaman_asimi)
+            saglam = True
+        finally:
+            with self._kilit:
+                self._calisanlar.pop(isci, None)
+            self._isci_birak(isci, saglam)
+
+        if not yanit.get("ok"):
+            hata = SinirAsildi if yanit.get("sinir") else IndirmeHatasi
+            raise hata(yanit.get("hata") or "Bilinmeyen yt-dlp hatası")
+        return yanit
+
+    def ara(self, sorgu, aday_sayisi=1, zaman_asimi=30, etiket=None):
+        """YouTube'da API kotası harcamadan (`ytsearchN:`) arar; [(video_id, süre_sn veya None)] döner"""
+        yanit = self._calistir({"islem": "ara", "sorgu": sorgu, "aday_sayisi": aday_sayisi}, zaman_asimi, etiket)
+        return [(aday["video_id"], aday.get("sure")) for aday in yanit.get("adaylar") or []]
+
+    def indir(self, youtube_url, cikti_sablonu, output_format, maks_sure=None, maks_boyut=None, etiket=None):
+        """Parçanın ses akışını (output_format'a en uygun kaynakla) indirir ve dosya yolunu döner.
+
+        maks_sure (sn) / maks_boyut (bayt) aşılıyorsa indirme hiç başlamadan reddedilir (SinirAsildi).
+        etiket (görev ID'si) iptal_et ile durdurulabilir. Hata durumunda IndirmeHatasi/TimeoutError fırlatır.
+        """
+        return self._calistir({
+            "youtube_url": youtube_url,
+            "cikti_sablonu": cikti_sablonu,
+            "output_format": output_format,
+            "maks_sure": maks_sure,
+            "maks_boyut": maks_boyut
+        }, self.zaman_asimi, etiket).get("dosya")
+
+    def iptal_et(self, etiket):
+        """Etiketin çalışan indirmelerini işçi sürecini öldürerek keser; sonraki istekleri reddeder"""
+        with self._kilit:
+            self._iptal_edilenler[etiket] = None
+            while len(self._iptal_edilenler) > IPTAL_KAYDI_SINIRI:
+                del self._iptal_edilenler[next(iter(self._iptal_edilenler))]
+            kesilecekler = [isci for isci, isci_etiketi in self._calisanlar.items() if isci_etiketi == etiket]
+        # Bekleyen çağıran EOF alır; işçi bozuk sayılıp yenisiyle değiştirilir
+        for isci in kesilecekler:
+            if isci.canli:
+                isci.surec.kill()
+        return len(kesilecekler)
+
+    def kapat(self):
+        """Boşta bekleyen tüm işçi süreçlerini sonlandırır"""
+        while not self._bosta.empty():
+            self._bosta.get_nowait().durdur()
+
+
+if __name__ == '__main__':
+    isci_dongusu()
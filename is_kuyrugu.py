@@ -0,0 +1,437 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+
+class KuyrukDolu(Exception):
+    """Bekleyen iş sayısı sınıra ulaştığında fırlatılır"""
+
+
+class GorevIptalEdildi(Exception):
+    """Çalışan iş kullanıcı isteğiyle veya sahipsiz kaldığı için iptal edildi"""
+
+
+class IsKuyrugu:
+    """SQLite tabanlı kalıcı iş kuyruğu; aynı dosyayı kullanan birden çok süreç (gunicorn worker) güvenle paylaşır.
+
+    Çalışan işler süreli bir kira ile tutulur. Kirayı yenilemeyen (çökmüş, yeniden başlatılmış)
+    bir sürecin işi kira bitince tekrar kuyruğa döner.
+    """
+
+    def __init__(self, db_yolu, maks_bekleyen=50, maks_calisan=2, kira_suresi=60, sonuc_saklama=6 * 3600):
+        self.db_yolu = db_yolu
+        self.maks_bekleyen = maks_bekleyen
+        self.maks_calisan = maks_calisan
+        self.kira_suresi = kira_suresi
+        # Aynı anahtarla gelen istekler bu süre boyunca biten işin ZIP'ini yeniden kullanır
+        self.sonuc_saklama = sonuc_saklama
+        self._yerel = threading.local()
+
+        klasor = os.path.dirname(self.db_yolu)
+        if klasor:
+            os.makedirs(klasor, exist_ok=True)
+        with self._baglanti() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS isler (
+                    id TEXT PRIMARY KEY,
+                    playlist_url TEXT NOT NULL,
+                    output_format TEXT NOT NULL,
+                    durum TEXT NOT NULL,
+                    olusturma REAL NOT NULL,
+                    kiralayan TEXT,
+                    kira_bitis REAL,
+                    deneme INTEGER NOT NULL DEFAULT 0,
+                    secenekler TEXT,
+                    anahtar TEXT,
+                    iptal INTEGER NOT NULL DEFAULT 0,
+                    son_yoklama REAL
+                )
+            """)
+            # Eski kuyruk dosyalarına sonradan eklenen sütunlar
+            sutunlar = [row[1] for row in conn.execute("PRAGMA table_info(isler)")]
+            for sutun, tur in (('secenekler', 'TEXT'), ('anahtar', 'TEXT'),
+                               ('iptal', 'INTEGER NOT NULL DEFAULT 0'), ('son_yoklama', 'REAL')):
+                if sutun not in sutunlar:
+                    conn.execute(f"ALTER TABLE isler ADD COLUMN {sutun} {tur}")
+            conn.execute("CREATE INDEX IF NOT EXISTS isler_durum ON isler (durum, olusturma)")
+            conn.execute("CREATE INDEX IF NOT EXISTS isler_anahtar ON isler (anahtar)")
+            # Aynı işe bağlanan istekler (takipçi görev -> asıl görev)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS takipciler (
+                    takipci_id TEXT PRIMARY KEY,
+                    lider_id TEXT NOT NULL,
+                    olusturma REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS takipciler_lider ON takipciler (lider_id)")
+            # Yakın zamanda başarıyla biten işlerin sonuçları
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS hazir_sonuclar (
+                    anahtar TEXT PRIMARY KEY,
+                    gorev_id TEXT NOT NULL,
+                    indirme_url TEXT NOT NULL,
+                    ilerleme TEXT,
+                    bitis REAL NOT NULL
+                )
+            """)
+
+    def _baglanti(self):
+        """Her thread kendi SQLite bağlantısını kullanır.
+
+        Bağlantı süreç kimliğiyle tutulur: fork edilen süreç (gunicorn --preload) ebeveynden
+        kalan bağlantıyı kullanmaz, kendi bağlantısını açar.
+        """
+        conn = getattr(self._yerel, 'conn', None)
+        if conn is None or self._yerel.pid != os.getpid():
+            conn = sqlite3.connect(self.db_yolu, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._yerel.conn = conn
+            self._yerel.pid = os.getpid()
+        return conn
+
+    def _islem(self):
+        """Süreçler arası yazma kilidi alan (BEGIN IMMEDIATE) bir işlem açar"""
+        return _Islem(self._baglanti())
+
+    def ekle(self, gorev_id, playlist_url, output_format, secenekler=None, anahtar=None):
+        """İşi kuyruğa ekler; kuyruk doluysa KuyrukDolu fırlatır.
+
+        anahtar verilirse aynı anahtarlı iş zaten bekliyor/çalışıyorsa yeni iş açılmaz, görev ona
+        takipçi olarak bağlanır; yakın zamanda bitmiş bir sonuç varsa o döner. Dönüş değeri:
+        {"sira": n} | {"lider_id": id, "sira": n veya None} | {"hazir": {...}}
+        """
+        simdi = time.time()
+        with self._islem() as conn:
+            if anahtar:
+                hazir = conn.execute(
+                    "SELECT gorev_id, indirme_url, ilerleme FROM hazir_sonuclar WHERE anahtar = ? AND bitis > ?",
+                    (anahtar, simdi - self.sonuc_saklama)
+                ).fetchone()
+                if hazir is not None:
+                    return {"hazir": dict(hazir)}
+
+                # İptal edilmekte olan işe bağlanılmaz; onun yerine yeni bir asıl iş açılır
+                lider = conn.execute(
+                    "SELECT id FROM isler WHERE anahtar = ? AND iptal = 0 ORDER BY olusturma LIMIT 1", (anahtar,)
+                ).fetchone()
+                if lider is not None:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO takipciler (takipci_id, lider_id, olusturma) VALUES (?, ?, ?)",
+                        (gorev_id, lider['id'], simdi)
+                    )
+                    # Eski takipçi kayıtlarını temizle
+                    conn.execute("DELETE FROM takipciler WHERE olusturma < ?", (simdi - 24 * 3600,))
+                    return {"lider_id": lider['id'], "sira": self._sira(conn, lider['id'])}
+
+            bekleyen = conn.execute("SELECT COUNT(*) FROM isler WHERE durum = 'BEKLIYOR'").fetchone()[0]
+            if bekleyen >= self.maks_bekleyen:
+                raise KuyrukDolu(f"Kuyruk dolu ({bekleyen} iş bekliyor)")
+            conn.execute(
+                "INSERT INTO isler (id, playlist_url, output_format, durum, olusturma, secenekler, anahtar) "
+                "VALUES (?, ?, ?, 'BEKLIYOR', ?, ?, ?)",
+                (gorev_id, playlist_url, output_format, simdi, json.dumps(secenekler or {}), anahtar)
+            )
+            return {"sira": bekleyen + 1}
+
+    def lider(self, gorev_id):
+        """Görev başka bir işe takipçi olarak bağlandıysa asıl görevin ID'sini döner"""
+        row = self._baglanti().execute(
+            "SELECT lider_id FROM takipciler WHERE takipci_id = ?", (gorev_id,)
+        ).fetchone()
+        return row['lider_id'] if row else None
+
+    def takipciler(self, lider_id):
+        """Bu işe bağlanan takipçi görevlerin ID'leri"""
+        rows = self._baglanti().execute(
+            "SELECT takipci_id FROM takipciler WHERE lider_id = ?", (lider_id,)
+        ).fetchall()
+        return [row['takipci_id'] for row in rows]
+
+    def sonuc_kaydet(self, anahtar, gorev_id, indirme_url, ilerleme):
+        """Başarıyla biten işin sonucunu aynı anahtarlı sonraki istekler için saklar"""
+        simdi = time.time()
+        with self._islem() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO hazir_sonuclar (anahtar, gorev_id, indirme_url, ilerleme, bitis) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (anahtar, gorev_id, indirme_url, ilerleme, simdi)
+            )
+            conn.execute("DELETE FROM hazir_sonuclar WHERE bitis < ?", (simdi - self.sonuc_saklama,))
+
+    def sira(self, gorev_id):
+        """Bekleyen işin kuyruktaki sırasını (1'den başlar) döner; beklemiyorsa None"""
+        return self._sira(self._baglanti(), self.lider(gorev_id) or gorev_id)
+
+    def _sira(self, conn, gorev_id):
+        row = conn.execute("SELECT olusturma FROM isler WHERE id = ? AND durum = 'BEKLIYOR'", (gorev_id,)).fetchone()
+        if row is None:
+            return None
+        return conn.execute(
+            "SELECT COUNT(*) FROM isler WHERE durum = 'BEKLIYOR' AND olusturma <= ?", (row['olusturma'],)
+        ).fetchone()[0]
+
+    def yoklandi(self, gorev_id):
+        """İstemcinin görevi hâlâ izlediğini kaydeder (takipçiyse asıl işe yazılır)"""
+        with self._islem() as conn:
+            conn.execute(
+                "UPDATE isler SET son_yoklama = ? WHERE id = ?", (time.time(), self.lider(gorev_id) or gorev_id)
+            )
+
+    def iptal_et(self, gorev_id):
+        """Görevi iptal eder. Dönüş:
+
+        "takipci"      — görev başka bir işe bağlıydı; bağı koparıldı, iş diğerleri için sürer
+        "paylasiliyor" — işe başka görevler bağlı; iptal edilmedi
+        "bekliyordu"   — iş kuyruktan silindi
+        "calisiyor"    — işe iptal işareti kondu; çalıştıran süreç işi durdurur
+        None           — kuyrukta böyle bir iş yok (bitmiş veya hiç olmamış)
+        """
+        with self._islem() as conn:
+            if conn.execute("DELETE FROM takipciler WHERE takipci_id = ?", (gorev_id,)).rowcount:
+                return "takipci"
+            row = conn.execute("SELECT durum FROM isler WHERE id = ?", (gorev_id,)).fetchone()
+            if row is None:
+                return None
+            if conn.execute("SELECT 1 FROM takipciler WHERE lider_id = ? LIMIT 1", (gorev_id,)).fetchone():
+                return "paylasiliyor"
+            if row['durum'] == 'BEKLIYOR':
+                conn.execute("DELETE FROM isler WHERE id = ?", (gorev_id,))
+                return "bekliyordu"
+            conn.execute("UPDATE isler SET iptal = 1 WHERE id = ?", (gorev_id,))
+            return "calisiyor"
+
+    def iptal_edilenler(self, gorev_idleri):
+        """Verilen işlerden iptal işareti konmuş olanlar"""
+        if not gorev_idleri:
+            return set()
+        yer_tutucular = ",".join("?" * len(gorev_idleri))
+        rows = self._baglanti().execute(
+            f"SELECT id FROM isler WHERE iptal = 1 AND id IN ({yer_tutucular})", list(gorev_idleri)
+        ).fetchall()
+        return {row['id'] for row in rows}
+
+    def sessizleri_iptal_et(self, sessiz_sure):
+        """sessiz_sure saniyedir ne kendisi ne takipçisi yoklanan işleri iptal eder.
+
+        Bekleyenler kuyruktan silinir ve ID'leri döner; çalışanlara iptal işareti konur.
+        """
+        sinir = time.time() - sessiz_sure
+        with self._islem() as conn:
+            kosul = "iptal = 0 AND COALESCE(son_yoklama, olusturma) < ?"
+            bekleyenler = [row['id'] for row in conn.execute(
+                f"SELECT id FROM isler WHERE durum = 'BEKLIYOR' AND {kosul}", (sinir,)
+            ).fetchall()]
+            conn.executemany("DELETE FROM isler WHERE id = ?", [(gorev_id,) for gorev_id in bekleyenler])
+            conn.execute(f"UPDATE isler SET iptal = 1 WHERE durum = 'CALISIYOR' AND {kosul}", (sinir,))
+        return bekleyenler
+
+    def sahipsiz_kiralari_birak(self):
+        """Bu makinede ölmüş süreçlerin tuttuğu işleri kira süresini beklemeden kuyruğa geri koyar"""
+        on_ek = f"{socket.gethostname()}:"
+        with self._islem() as conn:
+            rows = conn.execute(
+                "SELECT id, kiralayan FROM isler WHERE durum = 'CALISIYOR' AND kiralayan LIKE ?", (on_ek + '%',)
+            ).fetchall()
+            birakilanlar = []
+            for row in rows:
+                try:
+                    os.kill(int(row['kiralayan'][len(on_ek):]), 0)
+                except ProcessLookupError:
+                    birakilanlar.append(row['id'])
+                except (ValueError, PermissionError):
+                    # PermissionError: süreç yaşıyor ama başka kullanıcıya ait
+                    pass
+            conn.executemany(
+                "UPDATE isler SET durum = 'BEKLIYOR', kiralayan = NULL, kira_bitis = NULL WHERE id = ?",
+                [(gorev_id,) for gorev_id in birakilanlar]
+            )
+        return birakilanlar
+
+    def kirala(self, kiralayan):
+        """Sıradaki işi bu süreç adına kiralar; boş kapasite veya bekleyen iş yoksa None"""
+        simdi = time.time()
+        with self._islem() as conn:
+            # Kirası dolmuş işler sahibi ölmüş sayılır ve kuyruğa geri döner
+            conn.execute(
+                "UPDATE isler SET durum = 'BEKLIYOR', kiralayan = NULL, kira_bitis = NULL "
+                "WHERE durum = 'CALISIYOR' AND kira_bitis < ?", (simdi,)
+            )
+            calisan = conn.execute("SELECT COUNT(*) FROM isler WHERE durum = 'CALISIYOR'").fetchone()[0]
+            if calisan >= self.maks_calisan:
+                return None
+
+            row = conn.execute(
+                "SELECT * FROM isler WHERE durum = 'BEKLIYOR' ORDER BY olusturma LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                "UPDATE isler SET durum = 'CALISIYOR', kiralayan = ?, kira_bitis = ?, deneme = deneme + 1 WHERE id = ?",
+                (kiralayan, simdi + self.kira_suresi, row['id'])
+            )
+            return {
+                **dict(row),
+                "durum": "CALISIYOR",
+                "kiralayan": kiralayan,
+                "deneme": row['deneme'] + 1,
+                "secenekler": json.loads(row['secenekler'] or '{}')
+            }
+
+    def kira_yenile(self, gorev_idleri, kiralayan):
+        """Bu sürecin çalıştırdığı işlerin kirasını uzatır"""
+        if not gorev_idleri:
+            return
+        with self._islem() as conn:
+            conn.executemany(
+                "UPDATE isler SET kira_bitis = ? WHERE id = ? AND kiralayan = ?",
+                [(time.time() + self.kira_suresi, gorev_id, kiralayan) for gorev_id in gorev_idleri]
+            )
+
+    def tamamla(self, gorev_id):
+        """Biten (başarılı veya hatalı) işi kuyruktan siler"""
+        with self._islem() as conn:
+            conn.execute("DELETE FROM isler WHERE id = ?", (gorev_id,))
+
+
+class _Islem:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+class IsciHavuzu:
+    """Kuyruktan iş çeken sabit sayıda işçi thread'i; her süreç kendi havuzunu çalıştırır"""
+
+    def __init__(self, kuyruk, calistir, isci_sayisi=2, bos_bekleme=2.0,
+                 iptal_kontrol_araligi=2.0, sessiz_sure=0, iptal_cagrisi=None, bekleyen_iptal_cagrisi=None):
+        self.kuyruk = kuyruk
+        self.calistir = calistir
+        self.isci_sayisi = isci_sayisi
+        self.bos_bekleme = bos_bekleme
+        # Başka süreçten konan iptal işaretleri bu aralıkla okunur
+        self.iptal_kontrol_araligi = iptal_kontrol_araligi
+        # Bu kadar saniye yoklanmayan işler iptal edilir (0 = kapalı)
+        self.sessiz_sure = sessiz_sure
+        # iptal_cagrisi(gorev_id): çalışan iş iptal edilince (alt süreçleri durdurmak için)
+        # bekleyen_iptal_cagrisi(gorev_id): hiç başlamadan iptal edilen iş için
+        self.iptal_cagrisi = iptal_cagrisi
+        self.bekleyen_iptal_cagrisi = bekleyen_iptal_cagrisi
+        self._kilit = threading.Lock()
+        self._pid = None
+        self._calisanlar = {}   # gorev_id -> iptal Event'i
+        self._uyandir = threading.Event()
+
+    @property
+    def kiralayan(self):
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def baslat(self):
+        """Bu süreçte havuz henüz çalışmıyorsa başlatır (fork sonrası da güvenli)"""
+        with self._kilit:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._calisanlar = {}
+            # Yeniden başlatma/çökme sonrası yarıda kalan işler hemen devralınır
+            for gorev_id in self.kuyruk.sahipsiz_kiralari_birak():
+                print(f"[{gorev_id}] Sahibi kapanmış iş kuyruğa geri alındı")
+            for _ in range(self.isci_sayisi):
+                threading.Thread(target=self._isci_dongusu, daemon=True).start()
+            threading.Thread(target=self._kira_dongusu, daemon=True).start()
+
+    def uyandir(self):
+        """Yeni iş eklendiğinde boşta bekleyen işçileri hemen uyandırır"""
+        self._uyandir.set()
+
+    def _isci_dongusu(self):
+        while True:
+            try:
+                is_ = self.kuyruk.kirala(self.kiralayan)
+            except Exception as e:
+                print(f"Kuyruk okunamadı: {str(e)}")
+                is_ = None
+
+            if is_ is None:
+                self._uyandir.wait(self.bos_bekleme)
+                self._uyandir.clear()
+                continue
+
+            # İş, iptal işaretini is_['iptal'] Event'inden izler; sahibi ölmeden önce iptal
+            # edilip kuyruğa dönen iş hemen iptal durumuna geçer
+            iptal = threading.Event()
+            if is_.get('iptal'):
+                iptal.set()
+            is_['iptal'] = iptal
+            with self._kilit:
+                self._calisanlar[is_['id']] = is_['iptal']
+            try:
+                self.calistir(is_)
+            except Exception as e:
+                print(f"[{is_['id']}] İş işçisi hatası: {str(e)}")
+            finally:
+                with self._kilit:
+                    self._calisanlar.pop(is_['id'], None)
+                try:
+                    self.kuyruk.tamamla(is_['id'])
+                except Exception as e:
+                    print(f"[{is_['id']}] Kuyruktan silinemedi: {str(e)}")
+
+    def calisiyor(self, gorev_id):
+        """İş şu anda bu süreçteki bir işçide çalışıyorsa True"""
+        with self._kilit:
+            return self._pid == os.getpid() and gorev_id in self._calisanlar
+
+    def iptal_et(self, gorev_id):
+        """İş bu süreçte çalışıyorsa hemen durdurur; çalışmıyorsa False"""
+        with self._kilit:
+            iptal = self._calisanlar.get(gorev_id)
+        if iptal is None or iptal.is_set():
+            return iptal is not None
+        iptal.set()
+        if self.iptal_cagrisi:
+            try:
+                self.iptal_cagrisi(gorev_id)
+            except Exception as e:
+                print(f"[{gorev_id}] İptal sırasında hata: {str(e)}")
+        return True
+
+    def _kira_dongusu(self):
+        kira_araligi = max(1, self.kuyruk.kira_suresi / 3)
+        son_kira = time.monotonic()
+        while True:
+            time.sleep(min(kira_araligi, self.iptal_kontrol_araligi))
+            with self._kilit:
+                calisanlar = list(self._calisanlar)
+            try:
+                for gorev_id in self.kuyruk.iptal_edilenler(calisanlar):
+                    self.iptal_et(gorev_id)
+            except Exception as e:
+                print(f"İptal işaretleri okunamadı: {str(e)}")
+
+            if time.monotonic() - son_kira < kira_araligi:
+                continue
+            son_kira = time.monotonic()
+            try:
+                self.kuyruk.kira_yenile(calisanlar, self.kiralayan)
+            except Exception as e:
+                print(f"Kira yenilenemedi: {str(e)}")
+            if self.sessiz_sure:
+                try:
+                    for gorev_id in self.kuyruk.sessizleri_iptal_et(self.sessiz_sure):
+                        print(f"[{gorev_id}] {self.sessiz_sure} sn yoklanmadı, kuyruktan iptal edildi")
+                        if self.bekleyen_iptal_cagrisi:
+                            self.bekleyen_iptal_cagrisi(gorev_id)
+                except Exception as e:
+                    print(f"Sessiz işler iptal edilemedi: {str(e)}")
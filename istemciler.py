@@ -0,0 +1,70 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+import spotipy
+from spotipy.cache_handler import MemoryCacheHandler
+from spotipy.oauth2 import SpotifyClientCredentials
+
+SPOTIFY_CLIENT_ID = os.environ.get("SPOTIFY_CLIENT_ID")
+SPOTIFY_CLIENT_SECRET = os.environ.get("SPOTIFY_CLIENT_SECRET")
+# Yerel test/benchmark sunucusuna yönlendirmek için değiştirilebilir
+SPOTIFY_API_URL = os.environ.get("SPOTIFY_API_URL")
+SPOTIFY_TOKEN_URL = os.environ.get("SPOTIFY_TOKEN_URL")
+# Süreç başına açık tutulacak keep-alive bağlantı sayısı (host başına)
+HTTP_HAVUZ_BOYUTU = int(os.environ.get("HTTP_HAVUZ_BOYUTU", "32"))
+
+_kilit = threading.Lock()
+_oturum = None
+_spotify = None
+_pid = None
+
+
+def _fork_sonrasi_sifirla():
+    """Fork edilen süreç ebeveynin soketlerini paylaşmasın diye istemcileri yeniden kurar (kilit altında)"""
+    global _oturum, _spotify, _pid
+    if _pid != os.getpid():
+        _oturum = None
+        _spotify = None
+        _pid = os.getpid()
+
+
+def http_oturumu():
+    """Süreç genelinde paylaşılan, bağlantı havuzlu requests.Session"""
+    global _oturum
+    with _kilit:
+        _fork_sonrasi_sifirla()
+        if _oturum is None:
+            oturum = requests.Session()
+            adaptor = HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_HAVUZ_BOYUTU)
+            oturum.mount("https://", adaptor)
+            oturum.mount("http://", adaptor)
+            _oturum = oturum
+        return _oturum
+
+
+def spotify_istemcisi():
+    """Süreç genelinde paylaşılan Spotify istemcisi.
+
+    Token bellekte tutulur ve spotipy tarafından süresi dolmadan (son 60 sn içinde) yenilenir;
+    böylece her görev için yeni OAuth token alınmaz.
+    """
+    global _spotify
+    oturum = http_oturumu()
+    with _kilit:
+        if _spotify is None:
+            if not SPOTIFY_CLIENT_ID or not SPOTIFY_CLIENT_SECRET:
+                raise ValueError("Spotify kimlik bilgileri (CLIENT_ID veya SECRET) ortam değişkenlerinden okunamadı.")
+            auth_manager = SpotifyClientCredentials(
+                client_id=SPOTIFY_CLIENT_ID,
+                client_secret=SPOTIFY_CLIENT_SECRET,
+                cache_handler=MemoryCacheHandler(),
+                requests_session=oturum
+            )
+            if SPOTIFY_TOKEN_URL:
+                auth_manager.OAUTH_TOKEN_URL = SPOTIFY_TOKEN_URL
+            _spotify = spotipy.Spotify(auth_manager=auth_manager, requests_session=oturum)
+            if SPOTIFY_API_URL:
+                _spotify.prefix = SPOTIFY_API_URL.rstrip('/') + '/'
+        return _spotify
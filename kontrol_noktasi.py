@@ -0,0 +1,126 @@
+import json
+import os
+import zipfile
+
+# Merkez dizinini yeniden kurmak için saklanan ZipInfo alanları
+_ZIPINFO_ALANLARI = (
+    'compress_type', 'create_system', 'create_version', 'extract_version', 'reserved',
+    'flag_bits', 'volume', 'internal_attr', 'external_attr', 'header_offset',
+    'CRC', 'compress_size', 'file_size',
+)
+
+
+def _zipinfo_sozluk(zinfo):
+    sozluk = {alan: getattr(zinfo, alan) for alan in _ZIPINFO_ALANLARI}
+    sozluk.update(
+        filename=zinfo.filename,
+        date_time=list(zinfo.date_time),
+        extra=zinfo.extra.hex(),
+        comment=zinfo.comment.hex(),
+    )
+    return sozluk
+
+
+def _zipinfo_kur(sozluk):
+    zinfo = zipfile.ZipInfo(sozluk['filename'], tuple(sozluk['date_time']))
+    for alan in _ZIPINFO_ALANLARI:
+        setattr(zinfo, alan, sozluk[alan])
+    zinfo.extra = bytes.fromhex(sozluk['extra'])
+    zinfo.comment = bytes.fromhex(sozluk['comment'])
+    return zinfo
+
+
+class GorevManifesti:
+    """Görev dizinindeki manifest.jsonl: ZIP'e yazılan her parça için bir kontrol noktası satırı.
+
+    Her satır, parça ZIP'lere yazılıp diske indirildikten (fsync) sonra eklenir ve ZIP'lerin o
+    andaki boyutunu ve yeni girdinin başlık bilgisini taşır. Süreç ölürse aynı görev yeniden
+    çalıştığında ZIP'ler son kontrol noktasına kırpılır, merkez dizini kayıtlardan yeniden
+    kurulur ve yalnızca bitmemiş parçalar işlenir.
+    """
+
+    def __init__(self, gorev_dizini):
+        self.yol = os.path.join(gorev_dizini, "manifest.jsonl")
+        self.parcalar = {}      # anahtar -> kayıt
+        self._zipler = {}       # zip adı -> {"son": bayt, "girdiler": [ZipInfo sözlüğü]}
+        self._acik = []
+        self._oku()
+        self._dosya = open(self.yol, 'a', encoding='utf-8')
+
+    def _oku(self):
+        if not os.path.exists(self.yol):
+            return
+        with open(self.yol, encoding='utf-8') as f:
+            for satir in f:
+                try:
+                    kayit = json.loads(satir)
+                except ValueError:
+                    # Yazılırken kesilen son satır: o parça yeniden işlenir
+                    break
+                for ad, zip_kaydi in kayit.pop('zipler', {}).items():
+                    durum = self._zipler.setdefault(ad, {"son": 0, "girdiler": []})
+                    durum["son"] = zip_kaydi["son"]
+                    durum["girdiler"].append(zip_kaydi["girdi"])
+                self.parcalar[kayit['anahtar']] = kayit
+
+    def devam_edilebilir(self, zip_yollari):
+        """Kayıtlı her ZIP diskte en az son kontrol noktası kadar duruyorsa True; değilse manifest sıfırlanır"""
+        for ad, durum in self._zipler.items():
+            yol = zip_yollari.get(ad)
+            if yol is None or not os.path.exists(yol) or os.path.getsize(yol) < durum["son"]:
+                self.sifirla()
+                return False
+        return bool(self.parcalar)
+
+    def sifirla(self):
+        self.parcalar.clear()
+        self._zipler.clear()
+        with open(self.yol, 'w', encoding='utf-8'):
+            pass
+
+    def girdi_sayisi(self, ad):
+        return len(self._zipler.get(ad, {}).get("girdiler", []))
+
+    def zip_ac(self, zip_yolu, ad):
+        """ZIP'i yazmak için açar; kontrol noktası varsa kırpıp önceki girdileri geri yükler"""
+        durum = self._zipler.get(ad)
+        if durum and durum["son"]:
+            dosya = open(zip_yolu, 'r+b')
+            dosya.seek(durum["son"])
+            # Son kontrol noktasından sonra yazılmış yarım girdi ve eski merkez dizini atılır
+            dosya.truncate()
+        else:
+            dosya = open(zip_yolu, 'w+b')
+        self._acik.append(dosya)
+
+        zipf = zipfile.ZipFile(dosya, 'w')
+        for sozluk in (durum or {}).get("girdiler", []):
+            zinfo = _zipinfo_kur(sozluk)
+            zipf.filelist.append(zinfo)
+            zipf.NameToInfo[zinfo.filename] = zinfo
+        return zipf
+
+    def kaydet(self, anahtar, yazilanlar, **bilgi):
+        """Parçanın ZIP'lere yazıldığını kalıcı olarak işaretler; yazilanlar: {zip adı: (zipf, arsiv_adi)}"""
+        zipler = {}
+        for ad, (zipf, arsiv_adi) in yazilanlar.items():
+            zipf.fp.flush()
+            os.fsync(zipf.fp.fileno())
+            zipler[ad] = {"son": zipf.fp.tell(), "girdi": _zipinfo_sozluk(zipf.getinfo(arsiv_adi))}
+        kayit = {"anahtar": anahtar, **bilgi}
+        self._dosya.write(json.dumps({**kayit, "zipler": zipler}, ensure_ascii=False) + "\n")
+        self._dosya.flush()
+        os.fsync(self._dosya.fileno())
+        self.parcalar[anahtar] = kayit
+
+    def kapat(self):
+        self._dosya.close()
+        for dosya in self._acik:
+            dosya.close()
+        self._acik.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.kapat()
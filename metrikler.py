@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Aşama süreleri için histogram sınırları (saniye)
+SURE_SINIRLARI = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Özeti alınmış (bitmiş) görev ID'lerinden bellekte tutulan en fazla sayı
+BITEN_GOREV_SINIRI = 10000
+
+
+def _etiket_metni(etiketler):
+    if not etiketler:
+        return ""
+    parcalar = []
+    for anahtar, deger in etiketler:
+        deger = str(deger).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parcalar.append(f'{anahtar}="{deger}"')
+    return "{" + ",".join(parcalar) + "}"
+
+
+def _yuzdelik(sirali, oran):
+    return sirali[min(len(sirali) - 1, int(oran * len(sirali)))]
+
+
+class Metrikler:
+    """Aşama süreleri (histogram) ve olay sayaçları; /metrics için Prometheus metin biçimi üretir.
+
+    Süreler iki yere yazılır: süreç genelindeki histograma ve (gorev_id verilirse) görevin
+    kendi özetine. Görev bitince (gorev_ozeti/gorevi_bitir) özeti bellekten atılır; iptal sonrası
+    hâlâ süren indirme/dönüştürmelerin geç gelen ölçümleri yalnızca histograma yazılır.
+    Her gunicorn worker'ı kendi değerlerini raporlar.
+    """
+
+    def __init__(self, onek="nexus"):
+        self.onek = onek
+        self._kilit = threading.Lock()
+        self._histogramlar = {}     # aşama -> [kova sayıları..., toplam, adet]
+        self._sayaclar = {}         # (ad, etiketler) -> değer
+        self._gorevler = {}         # gorev_id -> {aşama: [süreler]}
+        self._bitenler = OrderedDict()  # özeti alınmış gorev_id -> None (eskiler atılır)
+
+    def kaydet(self, asama, sure, gorev_id=None):
+        """Bir aşamanın tek bir ölçümünü kaydeder"""
+        with self._kilit:
+            histogram = self._histogramlar.setdefault(asama, [0] * (len(SURE_SINIRLARI) + 2))
+            for i, sinir in enumerate(SURE_SINIRLARI):
+                if sure <= sinir:
+                    histogram[i] += 1
+            histogram[-2] += sure
+            histogram[-1] += 1
+            if gorev_id is not None and gorev_id not in self._bitenler:
+                self._gorevler.setdefault(gorev_id, {}).setdefault(asama, []).append(sure)
+
+    @contextmanager
+    def olc(self, asama, gorev_id=None):
+        """`with` bloğunun süresini aşama ölçümü olarak kaydeder (hata olsa da)"""
+        baslangic = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.kaydet(asama, time.perf_counter() - baslangic, gorev_id)
+
+    def say(self, ad, miktar=1, **etiketler):
+        """Sayaç artırır (ör. say("youtube_arama", sonuc="BULUNAMADI"))"""
+        anahtar = (ad, tuple(sorted(etiketler.items())))
+        with self._kilit:
+            self._sayaclar[anahtar] = self._sayaclar.get(anahtar, 0) + miktar
+
+    def gorevi_bitir(self, gorev_id):
+        """Görevin ölçümlerini bellekten atar ve sonra gelenleri görev özetine almaz; atılanları döner"""
+        with self._kilit:
+            self._bitenler[gorev_id] = None
+            self._bitenler.move_to_end(gorev_id)
+            while len(self._bitenler) > BITEN_GOREV_SINIRI:
+                self._bitenler.popitem(last=False)
+            return self._gorevler.pop(gorev_id, {})
+
+    def gorev_ozeti(self, gorev_id):
+        """Görevin aşama başına adet/toplam/p50/p95/maks özetini döner ve görevi bitirir (bkz. gorevi_bitir)"""
+        asamalar = self.gorevi_bitir(gorev_id)
+        ozet = {}
+        for asama, sureler in asamalar.items():
+            sirali = sorted(sureler)
+            ozet[asama] = {
+                "adet": len(sirali),
+                "toplam_sn": round(sum(sirali), 3),
+                "p50_sn": round(_yuzdelik(sirali, 0.50), 3),
+                "p95_sn": round(_yuzdelik(sirali, 0.95), 3),
+                "maks_sn": round(sirali[-1], 3),
+            }
+        return ozet
+
+    def prometheus_metni(self):
+        """Prometheus text exposition biçimi (0.0.4)"""
+        with self._kilit:
+            histogramlar = {asama: list(degerler) for asama, degerler in self._histogramlar.items()}
+            sayaclar = dict(self._sayaclar)
+
+        satirlar = []
+        ad = f"{self.onek}_asama_suresi_saniye"
+        satirlar.append(f"# HELP {ad} Aşama başına süre (spotify_sayfa, youtube_arama, ortak_depo, yt_dlp, donusturme, zip, yukleme, gorev)")
+        satirlar.append(f"# TYPE {ad} histogram")
+        for asama in sorted(histogramlar):
+            degerler = histogramlar[asama]
+            for sinir, adet in zip(SURE_SINIRLARI, degerler):
+                satirlar.append(f"{ad}_bucket{_etiket_metni([('asama', asama), ('le', sinir)])} {adet}")
+            satirlar.append(f"{ad}_bucket{_etiket_metni([('asama', asama), ('le', '+Inf')])} {degerler[-1]}")
+            satirlar.append(f"{ad}_sum{_etiket_metni([('asama', asama)])} {degerler[-2]}")
+            satirlar.append(f"{ad}_count{_etiket_metni([('asama', asama)])} {degerler[-1]}")
+
+        for sayac_adi in sorted({sayac for sayac, _ in sayaclar}):
+            tam_ad = f"{self.onek}_{sayac_adi}_total"
+            satirlar.append(f"# TYPE {tam_ad} counter")
+            for (ad_, etiketler), deger in sorted(sayaclar.items()):
+                if ad_ == sayac_adi:
+                    satirlar.append(f"{tam_ad}{_etiket_metni(etiketler)} {deger}")
+
+        return "\n".join(satirlar) + "\n"
@@ -0,0 +1,346 @@
+import fcntl
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import unicodedata
+import uuid
+from contextlib import contextmanager
+
+# YouTube video ID'leri 11 karakterlik güvenli bir alfabe kullanır
+VIDEO_ID_DESENI = re.compile(r'^[A-Za-z0-9_-]{6,20}$')
+
+
+def dosya_bagla(kaynak, hedef):
+    """Dosyayı mümkünse hard link ile, değilse kopyalayarak hedefe koyar"""
+    try:
+        os.link(kaynak, hedef)
+    except OSError:
+        shutil.copy2(kaynak, hedef)
+
+
+class ParcaOnbellegi:
+    """Video ID + format anahtarlı, bayt bütçeli LRU disk önbelleği (dönüştürülmüş parçalar için).
+
+    Dizin birden çok worker süreci arasında paylaşılır; doğruluk kaynağı dizinin kendisidir.
+    Erişim sırası mtime'dan okunur. Süreçler, dizindeki sayaç dosyasında tutulan kullanım
+    tahminini kilit dosyası üzerinde flock ile günceller; her ekleme tahmine yalnızca kendi
+    boyutunu ekler. Dizin ancak tahmin bütçeyi aşınca ya da tam_tarama_araligi dolunca
+    taranır. Tarama hem tahmini düzeltir hem de kullanımı bütçenin tahliye_orani'na kadar
+    indirir. Böylece toplam kullanım süreç sayısından bağımsız olarak bütçede kalır.
+    """
+
+    KILIT_ADI = ".kilit"
+    SAYAC_ADI = ".kullanim"
+    # Bu kadar saniyedir dokunulmamış .tmp dosyaları yarım kalmış yazmadır (süreç çökmüş)
+    YARIM_YAZMA_SURESI = 3600
+
+    def __init__(self, dizin, butce_bayt, tam_tarama_araligi=600, tahliye_orani=0.9):
+        self.dizin = dizin
+        self.butce_bayt = butce_bayt
+        # Dışarıdan silinen dosyalar tahmini şişirir; düzeltme için dizin bu aralıkla baştan sayılır
+        self.tam_tarama_araligi = tam_tarama_araligi
+        # Tahliye kullanımı bütçenin bu oranına indirir; dolu önbellekte her ekleme taramaya yol açmaz
+        self.tahliye_orani = tahliye_orani
+        self._kilit = threading.Lock()
+
+        if self.etkin:
+            os.makedirs(self.dizin, exist_ok=True)
+            with self._dizin_kilidi():
+                self._tahliye_et()
+
+    @property
+    def etkin(self):
+        return self.butce_bayt > 0
+
+    def _anahtar(self, video_id, output_format):
+        if not VIDEO_ID_DESENI.match(video_id or '') or not output_format.isalnum():
+            return None
+        return f"{video_id}.{output_format}"
+
+    def _yol(self, anahtar):
+        return os.path.join(self.dizin, anahtar)
+
+    @contextmanager
+    def _dizin_kilidi(self):
+        """Süreç içinde thread kilidi, süreçler arasında kilit dosyası üzerinde flock"""
+        with self._kilit, open(os.path.join(self.dizin, self.KILIT_ADI), 'a') as kilit_dosyasi:
+            fcntl.flock(kilit_dosyasi, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(kilit_dosyasi, fcntl.LOCK_UN)
+
+    def _girdileri_oku(self, simdi):
+        """Dizindeki girdileri (mtime, ad, boyut) olarak döner; eski yarım yazmaları siler"""
+        girdiler = []
+        with os.scandir(self.dizin) as dizin:
+            for girdi in dizin:
+                if girdi.name in (self.KILIT_ADI, self.SAYAC_ADI):
+                    continue
+                try:
+                    bilgi = girdi.stat()
+                except FileNotFoundError:
+                    continue
+                if girdi.name.endswith('.tmp'):
+                    if simdi - bilgi.st_mtime >= self.YARIM_YAZMA_SURESI:
+                        self._sil(girdi.path)
+                    continue
+                girdiler.append((bilgi.st_mtime, girdi.name, bilgi.st_size))
+        return girdiler
+
+    @staticmethod
+    def _sil(yol):
+        try:
+            os.remove(yol)
+        except FileNotFoundError:
+            pass
+
+    def _sayaci_oku(self):
+        """Kullanım tahmini ve son tam taramanın zamanı (dizin kilidi altında çağrılır); sayaç yoksa None"""
+        try:
+            with open(os.path.join(self.dizin, self.SAYAC_ADI)) as f:
+                bayt, son_tarama = f.read().split()
+            return int(bayt), float(son_tarama)
+        except (OSError, ValueError):
+            return None
+
+    def _sayaci_yaz(self, bayt, son_tarama):
+        with open(os.path.join(self.dizin, self.SAYAC_ADI), 'w') as f:
+            f.write(f"{bayt} {son_tarama}")
+
+    def _tahliye_et(self, koru=None):
+        """Kullanımı dizinden yeniden hesaplar (dizin kilidi altında çağrılır).
+
+        Bütçe aşılıyorsa en uzun süredir kullanılmayanları, kullanım bütçenin tahliye_orani'na
+        inene kadar siler ve sayacı gerçek kullanımla günceller.
+        """
+        simdi = time.time()
+        girdiler = sorted(self._girdileri_oku(simdi))
+        toplam_bayt = sum(boyut for _, _, boyut in girdiler)
+        if toplam_bayt > self.butce_bayt:
+            hedef = self.butce_bayt * self.tahliye_orani
+            for _, ad, boyut in girdiler:
+                if toplam_bayt <= hedef:
+                    break
+                if ad == koru:
+                    continue
+                self._sil(self._yol(ad))
+                toplam_bayt -= boyut
+        self._sayaci_yaz(toplam_bayt, simdi)
+
+    def al(self, video_id, output_format, hedef_yol):
+        """Önbellekte varsa parçayı hedef_yol'a bağlar ve yolu döner, yoksa None"""
+        if not self.etkin:
+            return None
+        anahtar = self._anahtar(video_id, output_format)
+        if anahtar is None:
+            return None
+
+        # Başka bir süreç eklemiş ya da tahliye etmiş olabilir: dosyanın kendisine bakılır
+        yol = self._yol(anahtar)
+        try:
+            os.utime(yol)
+            dosya_bagla(yol, hedef_yol)
+        except FileNotFoundError:
+            return None
+        return hedef_yol
+
+    def ekle(self, video_id, output_format, kaynak_yol):
+        """İndirilen parçayı önbelleğe ekler; kaynak dosya yerinde kalır"""
+        if not self.etkin:
+            return False
+        anahtar = self._anahtar(video_id, output_format)
+        if anahtar is None:
+            return False
+
+        boyut = os.path.getsize(kaynak_yol)
+        if boyut > self.butce_bayt:
+            return False
+
+        yol = self._yol(anahtar)
+        gecici_yol = f"{yol}.{uuid.uuid4().hex[:8]}.tmp"
+        dosya_bagla(kaynak_yol, gecici_yol)
+
+        with self._dizin_kilidi():
+            try:
+                eski_boyut = os.path.getsize(yol)
+            except FileNotFoundError:
+                eski_boyut = 0
+            os.replace(gecici_yol, yol)
+            # Hard link kaynağın eski mtime'ını taşır; yeni eklenen girdi en son kullanılan sayılır
+            os.utime(yol)
+
+            sayac = self._sayaci_oku()
+            if sayac is None:
+                self._tahliye_et(koru=anahtar)
+                return True
+            tahmin, son_tarama = sayac
+            tahmin += boyut - eski_boyut
+            if tahmin > self.butce_bayt or time.time() - son_tarama >= self.tam_tarama_araligi:
+                self._tahliye_et(koru=anahtar)
+            else:
+                self._sayaci_yaz(tahmin, son_tarama)
+        return True
+
+
+def sorgu_normallestir(sorgu):
+    """Arama sorgusunu önbellek anahtarı için normalleştirir (büyük/küçük harf, boşluk, unicode)"""
+    sorgu = unicodedata.normalize('NFKC', sorgu or '')
+    return ' '.join(sorgu.casefold().split())
+
+
+class _SqliteOnbellek:
+    """Thread başına bağlantı açan SQLite önbelleklerinin ortak tabanı"""
+
+    TABLO_SQL = None
+
+    def __init__(self, db_yolu):
+        self.db_yolu = db_yolu
+        self.isabet = 0
+        self.iska = 0
+        self._sayac_kilidi = threading.Lock()
+        self._yerel = threading.local()
+
+        klasor = os.path.dirname(self.db_yolu)
+        if klasor:
+            os.makedirs(klasor, exist_ok=True)
+        with self._baglanti() as conn:
+            conn.execute(self.TABLO_SQL)
+
+    def _baglanti(self):
+        """Her thread kendi SQLite bağlantısını kullanır.
+
+        Bağlantı süreç kimliğiyle tutulur: fork edilen süreç (gunicorn --preload) ebeveynden
+        kalan bağlantıyı kullanmaz, kendi bağlantısını açar.
+        """
+        conn = getattr(self._yerel, 'conn', None)
+        if conn is None or self._yerel.pid != os.getpid():
+            conn = sqlite3.connect(self.db_yolu, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._yerel.conn = conn
+            self._yerel.pid = os.getpid()
+        return conn
+
+    def _say(self, isabet):
+        with self._sayac_kilidi:
+            if isabet:
+                self.isabet += 1
+            else:
+                self.iska += 1
+
+    def istatistik(self):
+        with self._sayac_kilidi:
+            return {"isabet": self.isabet, "iska": self.iska}
+
+
+class AramaOnbellegi(_SqliteOnbellek):
+    """Sorgu -> YouTube URL eşlemesini SQLite'ta TTL ile saklar; BULUNAMADI da önbelleğe alınır.
+
+    Seçilen video şarkı süresine bağlı olduğundan anahtar sorgu ile süre dilimini (10 sn) içerir.
+    Anahtar biçimi SURUM ile sürümlenir; seçim kuralları değişince eski kayıtlar kullanılmaz.
+    """
+
+    BULUNAMADI = "BULUNAMADI"
+    SURUM = 2
+    TABLO_SQL = """
+        CREATE TABLE IF NOT EXISTS arama_onbellegi (
+            sorgu TEXT PRIMARY KEY,
+            sonuc TEXT NOT NULL,
+            son_gecerlilik REAL NOT NULL
+        )
+    """
+
+    def __init__(self, db_yolu, ttl_saniye, negatif_ttl_saniye):
+        self.ttl_saniye = ttl_saniye
+        self.negatif_ttl_saniye = negatif_ttl_saniye
+        super().__init__(db_yolu)
+        # Süre denetiminden önceki (sürümsüz ya da eski sürümlü) kayıtlar atılır
+        with self._baglanti() as conn:
+            conn.execute("DELETE FROM arama_onbellegi WHERE sorgu NOT LIKE ?", (f"v{self.SURUM}|%",))
+
+    def _anahtar(self, sorgu, sure_ms):
+        sure_dilimi = int(sure_ms // 10000) if sure_ms else '-'
+        return f"v{self.SURUM}|{sure_dilimi}|{sorgu_normallestir(sorgu)}"
+
+    def al(self, sorgu, sure_ms=None):
+        """Süresi dolmamış sonucu döner (URL veya BULUNAMADI), yoksa None"""
+        row = self._baglanti().execute(
+            "SELECT sonuc FROM arama_onbellegi WHERE sorgu = ? AND son_gecerlilik > ?",
+            (self._anahtar(sorgu, sure_ms), time.time())
+        ).fetchone()
+        self._say(row is not None)
+        return row[0] if row else None
+
+    def kaydet(self, sorgu, sonuc, sure_ms=None):
+        """Başarılı ve BULUNAMADI sonuçlarını saklar; API hataları önbelleğe alınmaz"""
+        if sonuc == self.BULUNAMADI:
+            ttl = self.negatif_ttl_saniye
+        elif sonuc.startswith("https://"):
+            ttl = self.ttl_saniye
+        else:
+            return
+        with self._baglanti() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO arama_onbellegi (sorgu, sonuc, son_gecerlilik) VALUES (?, ?, ?)",
+                (self._anahtar(sorgu, sure_ms), sonuc, time.time() + ttl)
+            )
+
+    def sil(self, sorgu, sure_ms=None):
+        """Kaydı siler (ör. önbellekteki video indirme sınırlarını aşınca); sonraki aramada yeniden seçilir"""
+        with self._baglanti() as conn:
+            conn.execute("DELETE FROM arama_onbellegi WHERE sorgu = ?", (self._anahtar(sorgu, sure_ms),))
+
+
+class PlaylistOnbellegi(_SqliteOnbellek):
+    """Ayrıştırılmış şarkı listesini playlist_id + snapshot_id ile saklar.
+
+    Spotify playlist her değiştiğinde snapshot_id değişir; aynı snapshot için liste
+    yeniden sayfalanmadan önbellekten döner.
+    """
+
+    TABLO_SQL = """
+        CREATE TABLE IF NOT EXISTS playlist_onbellegi (
+            playlist_id TEXT PRIMARY KEY,
+            snapshot_id TEXT NOT NULL,
+            sarkilar TEXT NOT NULL,
+            son_kullanim REAL NOT NULL
+        )
+    """
+
+    def __init__(self, db_yolu, saklama_saniye=30 * 24 * 3600):
+        self.saklama_saniye = saklama_saniye
+        super().__init__(db_yolu)
+
+    def al(self, playlist_id, snapshot_id):
+        """Aynı snapshot için kayıtlı şarkı listesini döner, yoksa None"""
+        conn = self._baglanti()
+        row = conn.execute(
+            "SELECT sarkilar FROM playlist_onbellegi WHERE playlist_id = ? AND snapshot_id = ?",
+            (playlist_id, snapshot_id)
+        ).fetchone()
+        self._say(row is not None)
+        if row is None:
+            return None
+        with conn:
+            conn.execute(
+                "UPDATE playlist_onbellegi SET son_kullanim = ? WHERE playlist_id = ?",
+                (time.time(), playlist_id)
+            )
+        return json.loads(row[0])
+
+    def kaydet(self, playlist_id, snapshot_id, sarkilar):
+        """Playlist'in güncel snapshot'ını saklar; uzun süre kullanılmayan kayıtları temizler"""
+        simdi = time.time()
+        with self._baglanti() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO playlist_onbellegi (playlist_id, snapshot_id, sarkilar, son_kullanim) "
+                "VALUES (?, ?, ?, ?)",
+                (playlist_id, snapshot_id, json.dumps(sarkilar, ensure_ascii=False), simdi)
+            )
+            conn.execute(
+                "DELETE FROM playlist_onbellegi WHERE son_kullanim < ?", (simdi - self.saklama_saniye,)
+            )
@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from onbellek import VIDEO_ID_DESENI, dosya_bagla
+
+
+class OrtakDepoHatasi(Exception):
+    """Ortak depoya erişilemedi; çağıran parçayı yerelde üretmeye devam eder"""
+
+
+def _cakisma_mi(yanit):
+    """Storage, var olan nesneye x-upsert olmadan yazılınca 409 (veya gövdesinde 409/Duplicate taşıyan 400) döner"""
+    if yanit.status_code == 409:
+        return True
+    return yanit.status_code == 400 and ("409" in yanit.text or "Duplicate" in yanit.text or "already exists" in yanit.text)
+
+
+class OrtakParcaDeposu:
+    """Tüm uygulama örneklerinin paylaştığı, Supabase Storage'da tutulan dönüştürülmüş parça deposu.
+
+    Nesneler `<onek>/<video_id>.<format>` yoluna bir kez yazılır; dizin tablosundaki satır yalnızca
+    nesne tamamen yüklendikten sonra eklenir, bu yüzden okuyan hiçbir zaman yarım dosya görmez.
+    Aynı parçayı eşzamanlı üreten düğümler üzerine yazmaz: ilk yükleme kazanır, diğerleri
+    çakışmayı başarı sayar. Yüklemeler arka planda yapılır, parça üretimini bekletmez.
+    """
+
+    def __init__(self, supabase, oturum_getir, supabase_url, anahtar, kova, tablo,
+                 onek="parcalar", gecici_dizin="/tmp/nexus-ortak", isci_sayisi=2, zaman_asimi=60):
+        self.supabase = supabase
+        self.oturum_getir = oturum_getir
+        self.nesne_adresi = f"{(supabase_url or '').rstrip('/')}/storage/v1/object/{kova}"
+        self.anahtar = anahtar
+        self.kova = kova
+        self.tablo = tablo
+        self.onek = onek
+        self.gecici_dizin = gecici_dizin
+        self.zaman_asimi = zaman_asimi
+        self._kilit = threading.Lock()
+        self._yukleniyor = set()
+        self._isler = set()
+        self._havuz = ThreadPoolExecutor(max_workers=isci_sayisi, thread_name_prefix="ortak-depo")
+        os.makedirs(self.gecici_dizin, exist_ok=True)
+
+    def _anahtar(self, video_id, output_format):
+        if not VIDEO_ID_DESENI.match(video_id or '') or not output_format.isalnum():
+            return None
+        return f"{video_id}.{output_format}"
+
+    def _basliklar(self, **ek):
+        return {"Authorization": f"Bearer {self.anahtar}", "apikey": self.anahtar, **ek}
+
+    def _dizin_kaydi(self, anahtar):
+        yanit = self.supabase.table(self.tablo).select("nesne_yolu, boyut").eq("anahtar", anahtar).execute()
+        return yanit.data[0] if yanit.data else None
+
+    def al(self, video_id, output_format, hedef_yol):
+        """Parça ortak depoda varsa hedef_yol'a indirir ve yolu döner, yoksa None"""
+        anahtar = self._anahtar(video_id, output_format)
+        if anahtar is None:
+            return None
+        try:
+            kayit = self._dizin_kaydi(anahtar)
+        except Exception as e:
+            raise OrtakDepoHatasi(f"Dizin okunamadı: {str(e)}")
+        if not kayit:
+            return None
+
+        gecici_yol = f"{hedef_yol}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with self.oturum_getir().get(
+                f"{self.nesne_adresi}/{kayit['nesne_yolu']}",
+                headers=self._basliklar(), stream=True, timeout=self.zaman_asimi
+            ) as yanit:
+                if yanit.status_code == 404:
+                    # Dizinde olup depoda olmayan nesne (elle silinmiş): yeniden üretilir
+                    return None
+                if yanit.status_code != 200:
+                    raise OrtakDepoHatasi(f"Nesne indirilemedi: HTTP {yanit.status_code}")
+                with open(gecici_yol, 'wb') as f:
+                    for parca in yanit.iter_content(1024 * 1024):
+                        f.write(parca)
+            if kayit.get('boyut') is not None and os.path.getsize(gecici_yol) != kayit['boyut']:
+                raise OrtakDepoHatasi("Nesne boyutu dizindekiyle uyuşmuyor")
+            os.replace(gecici_yol, hedef_yol)
+            return hedef_yol
+        except OrtakDepoHatasi:
+            raise
+        except Exception as e:
+            raise OrtakDepoHatasi(f"Nesne indirilemedi: {str(e)}")
+        finally:
+            if os.path.exists(gecici_yol):
+                os.remove(gecici_yol)
+
+    def ekle(self, video_id, output_format, kaynak_yol):
+        """Parçayı arka planda ortak depoya yükler; kaynak dosya yerinde kalır. Kuyruğa alındıysa True"""
+        anahtar = self._anahtar(video_id, output_format)
+        if anahtar is None:
+            return False
+        with self._kilit:
+            # Bu süreçte aynı parça zaten yükleniyor
+            if anahtar in self._yukleniyor:
+                return False
+            self._yukleniyor.add(anahtar)
+
+        # Görev dizini yükleme bitmeden silinebileceği için dosya ayrı bir yere bağlanır
+        kopya_yolu = os.path.join(self.gecici_dizin, f"{anahtar}.{uuid.uuid4().hex[:8]}")
+        try:
+            dosya_bagla(kaynak_yol, kopya_yolu)
+        except OSError:
+            with self._kilit:
+                self._yukleniyor.discard(anahtar)
+            raise
+        is_ = self._havuz.submit(self._yukle, anahtar, video_id, output_format, kopya_yolu)
+        with self._kilit:
+            self._isler.add(is_)
+        is_.add_done_callback(self._is_bitti)
+        return True
+
+    def _is_bitti(self, is_):
+        with self._kilit:
+            self._isler.discard(is_)
+
+    def _yukle(self, anahtar, video_id, output_format, kopya_yolu):
+        nesne_yolu = f"{self.onek}/{anahtar}"
+        try:
+            if self._dizin_kaydi(anahtar):
+                return
+            boyut = os.path.getsize(kopya_yolu)
+            with open(kopya_yolu, 'rb') as f:
+                # x-upsert gönderilmez: başka bir düğüm önce yazdıysa nesnesi korunur
+                yanit = self.oturum_getir().post(
+                    f"{self.nesne_adresi}/{nesne_yolu}", data=f,
+                    headers=self._basliklar(**{"Content-Type": "application/octet-stream", "Content-Length": str(boyut)}),
+                    timeout=self.zaman_asimi
+                )
+            if _cakisma_mi(yanit):
+                # Nesne başka bir düğümün yazdığı dosya; boyutunu bilmediğimiz için dizine boş geçilir
+                boyut = None
+            elif yanit.status_code not in (200, 201):
+                raise OrtakDepoHatasi(f"HTTP {yanit.status_code} {yanit.text[:200]}")
+            self.supabase.table(self.tablo).upsert({
+                "anahtar": anahtar,
+                "video_id": video_id,
+                "format": output_format,
+                "nesne_yolu": nesne_yolu,
+                "boyut": boyut,
+                "olusturma": int(time.time()),
+            }, on_conflict="anahtar", ignore_duplicates=True).execute()
+        except Exception as e:
+            print(f"Ortak depoya yüklenemedi ({anahtar}): {str(e)}")
+        finally:
+            with self._kilit:
+                self._yukleniyor.discard(anahtar)
+            try:
+                os.remove(kopya_yolu)
+            except FileNotFoundError:
+                pass
+
+    def bekle(self, zaman_asimi=None):
+        """O ana kadar kuyruğa alınan yüklemelerin bitmesini bekler"""
+        with self._kilit:
+            isler = list(self._isler)
+        wait(isler, timeout=zaman_asimi)
+
+    def kapat(self):
+        self._havuz.shutdown(wait=True)
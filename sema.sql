@@ -0,0 +1,33 @@
+-- Supabase (Postgres) şeması. Tekrar çalıştırılabilir: var olan tablolar korunur,
+-- eksik sütunlar eklenir. Supabase SQL editöründe veya psql ile uygulanır.
+
+-- Görev durumları (GorevDurumDeposu yazar, /status ve /events okur)
+CREATE TABLE IF NOT EXISTS public.gorevler (
+    id TEXT PRIMARY KEY,
+    durum TEXT NOT NULL,
+    kaynak TEXT,
+    ilerleme TEXT,
+    indirme_url TEXT,
+    hata_mesaji TEXT
+);
+
+-- Senkron modda tam_arsiv=1 ile istenen tüm playlist ZIP'inin linki
+ALTER TABLE public.gorevler ADD COLUMN IF NOT EXISTS tam_arsiv_url TEXT;
+-- Biten görevin aşama başına süre özeti (Metrikler.gorev_ozeti)
+ALTER TABLE public.gorevler ADD COLUMN IF NOT EXISTS zamanlama JSONB;
+-- YÜKLENIYOR durumunda Storage'a yüklenen baytların yüzdesi
+ALTER TABLE public.gorevler ADD COLUMN IF NOT EXISTS yukleme_yuzdesi INTEGER;
+
+-- Ortak parça deposunun dizini (OrtakParcaDeposu; ad ORTAK_DEPO_TABLOSU ile değiştirilebilir).
+-- Nesneler ORTAK_DEPO_KOVASI kovasında parcalar/<video_id>.<format> yolunda durur.
+CREATE TABLE IF NOT EXISTS public.parca_deposu (
+    anahtar TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    format TEXT NOT NULL,
+    nesne_yolu TEXT NOT NULL,
+    boyut BIGINT,
+    olusturma BIGINT NOT NULL
+);
+
+-- PostgREST'in yeni sütunları hemen görmesi için şema önbelleği yenilenir
+NOTIFY pgrst, 'reload schema';
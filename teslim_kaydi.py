@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class TeslimKaydi:
+    """Bir playlist'ten hangi şarkıların (Spotify track ID + format) daha önce teslim edildiğini saklar.
+
+    Geçmiş, istemcinin gönderdiği senkron anahtarına göre ayrıdır: aynı playlist'i senkronlayan
+    her kullanıcı kendi teslimlerine göre delta alır. Senkron modda yalnızca burada olmayan
+    şarkılar işlenir; tam arşiv istenirse önceki şarkılar kayıtlı video ID'leri üzerinden
+    yeniden toplanır.
+    """
+
+    def __init__(self, db_yolu):
+        self.db_yolu = db_yolu
+        self._yerel = threading.local()
+
+        klasor = os.path.dirname(self.db_yolu)
+        if klasor:
+            os.makedirs(klasor, exist_ok=True)
+        conn = self._baglanti()
+        # Birden çok süreç aynı anda açarsa geçiş bir kez yapılır
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            sutunlar = [row[1] for row in conn.execute("PRAGMA table_info(teslim_edilenler)")]
+            if sutunlar and 'senkron_anahtari' not in sutunlar:
+                # Anahtarsız eski kayıtlar hangi kullanıcıya ait olduğu bilinmediğinden atılır
+                conn.execute("DROP TABLE teslim_edilenler")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS teslim_edilenler (
+                    senkron_anahtari TEXT NOT NULL,
+                    playlist_id TEXT NOT NULL,
+                    spotify_id TEXT NOT NULL,
+                    output_format TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    arsiv_adi TEXT NOT NULL,
+                    teslim_zamani REAL NOT NULL,
+                    PRIMARY KEY (senkron_anahtari, playlist_id, spotify_id, output_format)
+                )
+            """)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _baglanti(self):
+        """Her thread kendi SQLite bağlantısını kullanır.
+
+        Bağlantı süreç kimliğiyle tutulur: fork edilen süreç (gunicorn --preload) ebeveynden
+        kalan bağlantıyı kullanmaz, kendi bağlantısını açar.
+        """
+        conn = getattr(self._yerel, 'conn', None)
+        if conn is None or self._yerel.pid != os.getpid():
+            conn = sqlite3.connect(self.db_yolu, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._yerel.conn = conn
+            self._yerel.pid = os.getpid()
+        return conn
+
+    def teslimler(self, senkron_anahtari, playlist_id, output_format):
+        """Bu anahtara daha önce teslim edilenleri {spotify_id: (video_id, arsiv_adi)} olarak döner"""
+        rows = self._baglanti().execute(
+            "SELECT spotify_id, video_id, arsiv_adi FROM teslim_edilenler "
+            "WHERE senkron_anahtari = ? AND playlist_id = ? AND output_format = ?",
+            (senkron_anahtari, playlist_id, output_format)
+        ).fetchall()
+        return {spotify_id: (video_id, arsiv_adi) for spotify_id, video_id, arsiv_adi in rows}
+
+    def kaydet(self, senkron_anahtari, playlist_id, output_format, teslim_edilenler):
+        """Bu anahtara başarıyla teslim edilen (spotify_id, video_id, arsiv_adi) kayıtlarını ekler"""
+        simdi = time.time()
+        with self._baglanti() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO teslim_edilenler "
+                "(senkron_anahtari, playlist_id, spotify_id, output_format, video_id, arsiv_adi, teslim_zamani) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (senkron_anahtari, playlist_id, spotify_id, output_format, video_id, arsiv_adi, simdi)
+                    for spotify_id, video_id, arsiv_adi in teslim_edilenler
+                    if spotify_id
+                ]
+            )
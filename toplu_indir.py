@@ -0,0 +1,193 @@
+"""Flask ve Supabase olmadan toplu playlist indirme.
+
+Her satırında bir Spotify playlist URL'si bulunan dosyayı okur, playlistleri aynı anda --paralel
+kadar işler ve her birinin ZIP'ini çıktı dizinine `<playlist_id>.<format>.zip` olarak yazar.
+Şarkılar tüm playlistlerin paylaştığı --isci kadar indirme işçisinde adil sırayla işlenir.
+
+Sonuçlar çıktı dizinindeki toplu_manifest.jsonl'e işlenir. Yarıda kesilen (Ctrl+C, çökme) bir
+çalıştırma aynı komutla devam eder: biten playlistler atlanır, yarım kalanlar ZIP'e yazılmış son
+şarkıdan sürer, hata alanlar yeniden denenir.
+
+Kullanım (depo kökünden):
+    python toplu_indir.py playlistler.txt --cikti ./indirilenler --paralel 4 --format mp3
+
+Spotify kimlik bilgileri (SPOTIFY_CLIENT_ID/SECRET) ve isteğe bağlı YT_KEY ile önbellek ayarları
+web uygulamasıyla aynı ortam değişkenlerinden okunur.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Çıktı dizininde playlist sonuçlarının tutulduğu dosya
+MANIFEST_ADI = "toplu_manifest.jsonl"
+
+
+class TopluManifest:
+    """Çıktı dizinindeki toplu_manifest.jsonl: her playlist denemesinin sonucu için bir satır.
+
+    Aynı playlist için son satır geçerlidir. Satırlar yazıldıktan sonra diske indirilir (fsync);
+    yazılırken kesilen son satır okunurken yok sayılır ve o playlist yeniden işlenir.
+    """
+
+    def __init__(self, cikti_dizini):
+        self.yol = os.path.join(cikti_dizini, MANIFEST_ADI)
+        self.sonuclar = {}      # anahtar -> son kayıt
+        self._kilit = threading.Lock()
+        self._oku()
+        self._dosya = open(self.yol, 'a', encoding='utf-8')
+
+    def _oku(self):
+        if not os.path.exists(self.yol):
+            return
+        with open(self.yol, encoding='utf-8') as f:
+            for satir in f:
+                try:
+                    kayit = json.loads(satir)
+                except ValueError:
+                    break
+                self.sonuclar[kayit['anahtar']] = kayit
+
+    def bitti(self, anahtar):
+        """Playlist daha önce tamamlandıysa ve ZIP'i hâlâ yerindeyse True"""
+        kayit = self.sonuclar.get(anahtar)
+        return bool(kayit) and kayit.get('durum') == "TAMAMLANDI" and os.path.exists(kayit.get('zip') or '')
+
+    def kaydet(self, anahtar, **kayit):
+        kayit = {"anahtar": anahtar, "zaman": int(time.time()), **kayit}
+        with self._kilit:
+            self._dosya.write(json.dumps(kayit, ensure_ascii=False) + "\n")
+            self._dosya.flush()
+            os.fsync(self._dosya.fileno())
+            self.sonuclar[anahtar] = kayit
+
+    def kapat(self):
+        self._dosya.close()
+
+
+def playlistleri_oku(dosya_yolu):
+    """URL dosyasındaki playlistler (boş satırlar ve # ile başlayanlar atlanır, tekrarlar bir kez alınır)"""
+    urller = []
+    with open(dosya_yolu, encoding='utf-8') as f:
+        for satir in f:
+            satir = satir.strip()
+            if satir and not satir.startswith('#') and satir not in urller:
+                urller.append(satir)
+    return urller
+
+
+def ortami_ayarla(args):
+    """Çekirdek içe aktarılmadan önce işçi sayılarını ortam değişkenlerine yazar"""
+    if args.isci:
+        os.environ["ISCI_SAYISI"] = str(args.isci)
+    if args.donusturme:
+        os.environ["DONUSTURME_ISCI_SAYISI"] = str(args.donusturme)
+
+
+def gorev_kimligi(playlist_id, output_format):
+    """Aynı playlist+format her çalıştırmada aynı görev dizinini kullanır: yarım kalan iş devam eder"""
+    return f"{playlist_id}-{output_format}"
+
+
+def playlist_isle(cekirdek, playlist_url, output_format, cikti_dizini, calisma_dizini, iptal):
+    """Tek playlist'in ZIP'ini hazırlar ve çıktı dizinine taşır; (zip yolu, ZipSonucu, süre) döner"""
+    baslangic = time.perf_counter()
+    playlist_id = cekirdek.playlist_id_cikar(playlist_url)
+    gorev_id = gorev_kimligi(playlist_id, output_format)
+    sonuc = cekirdek.playlist_zipi_hazirla(
+        playlist_url, output_format, gorev_id, iptal=iptal, dizin=calisma_dizini
+    )
+    hedef = os.path.join(cikti_dizini, f"{playlist_id}.{output_format}.zip")
+    os.replace(sonuc.zip_yolu, hedef)
+    return hedef, sonuc, round(time.perf_counter() - baslangic, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spotify playlistlerini toplu olarak ZIP'e indirir (Flask/Supabase gerekmez)")
+    parser.add_argument("dosya", help="Her satırında bir Spotify playlist URL'si bulunan dosya")
+    parser.add_argument("--cikti", default="indirilenler", help="ZIP'lerin ve manifestin yazılacağı dizin")
+    parser.add_argument("--format", default="mp3", help="Ses formatı (mp3, m4a, wav, ...)")
+    parser.add_argument("--paralel", type=int, default=2, help="Aynı anda işlenen playlist sayısı")
+    parser.add_argument("--isci", type=int, help="Tüm playlistlerin paylaştığı indirme işçisi sayısı (ISCI_SAYISI)")
+    parser.add_argument("--donusturme", type=int, help="Eşzamanlı ffmpeg kodlama sayısı (DONUSTURME_ISCI_SAYISI)")
+    args = parser.parse_args()
+
+    ortami_ayarla(args)
+    import cekirdek
+    from is_kuyrugu import GorevIptalEdildi
+
+    cikti_dizini = os.path.abspath(args.cikti)
+    # Yarım kalan görev dizinleri ve ZIP'ler; tamamlanan playlistlerinki silinir
+    calisma_dizini = os.path.join(cikti_dizini, ".calisma")
+    os.makedirs(calisma_dizini, exist_ok=True)
+
+    # Aynı playlist farklı URL biçimleriyle (ör. ?si=...) birden çok kez yazılmışsa bir kez işlenir
+    anahtarlar = {}
+    for url in playlistleri_oku(args.dosya):
+        if 'spotify.com/playlist/' not in url:
+            print(f"Geçersiz Spotify playlist URL'i, atlandı: {url}")
+            continue
+        anahtar = f"{cekirdek.playlist_id_cikar(url)}:{args.format}"
+        if anahtar not in anahtarlar.values():
+            anahtarlar[url] = anahtar
+    urller = list(anahtarlar)
+
+    manifest = TopluManifest(cikti_dizini)
+    islenecekler = [url for url in urller if not manifest.bitti(anahtarlar[url])]
+    print(f"{len(urller)} playlist, {len(urller) - len(islenecekler)} tanesi daha önce tamamlanmış; "
+          f"{len(islenecekler)} işlenecek ({args.paralel} paralel)")
+
+    iptal = threading.Event()
+    basarili = hatali = 0
+    havuz = ThreadPoolExecutor(max_workers=max(1, args.paralel), thread_name_prefix="toplu")
+    try:
+        isler = {
+            havuz.submit(playlist_isle, cekirdek, url, args.format, cikti_dizini, calisma_dizini, iptal): url
+            for url in islenecekler
+        }
+
+        for is_ in as_completed(isler):
+            url = isler[is_]
+            anahtar = anahtarlar[url]
+            gorev_id = gorev_kimligi(cekirdek.playlist_id_cikar(url), args.format)
+            try:
+                hedef, sonuc, sure = is_.result()
+            except GorevIptalEdildi:
+                # Görev dizini yerinde kalır; sonraki çalıştırma kaldığı yerden sürer
+                cekirdek.metrikler.gorevi_bitir(gorev_id)
+                continue
+            except Exception as e:
+                hatali += 1
+                manifest.kaydet(anahtar, url=url, durum="HATA", hata=str(e),
+                                zamanlama=cekirdek.metrikler.gorev_ozeti(gorev_id))
+                print(f"[{gorev_id}] HATA: {str(e)}")
+                continue
+
+            basarili += 1
+            manifest.kaydet(
+                anahtar, url=url, durum="TAMAMLANDI", zip=hedef,
+                eklenen=sonuc.eklenen, toplam=sonuc.toplam, sure_sn=sure,
+                zamanlama=cekirdek.metrikler.gorev_ozeti(gorev_id)
+            )
+            cekirdek.gorev_dosyalarini_sil(gorev_id, calisma_dizini)
+            print(f"[{gorev_id}] {sonuc.eklenen}/{sonuc.toplam} şarkı -> {hedef} ({sure} sn)")
+    except KeyboardInterrupt:
+        print("Durduruluyor; yarım kalan playlistler sonraki çalıştırmada devam edecek...")
+        iptal.set()
+        havuz.shutdown(wait=True, cancel_futures=True)
+        return 130
+    finally:
+        havuz.shutdown(wait=True)
+        manifest.kapat()
+        cekirdek.indirme_motoru.kapat()
+        cekirdek.donusturucu.kapat()
+
+    print(f"Bitti: {basarili} tamamlandı, {hatali} hata (sonuçlar: {manifest.yol})")
+    return 0 if hatali == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
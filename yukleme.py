@@ -0,0 +1,126 @@
+import base64
+import os
+import random
+import time
+
+# Supabase'in TUS uç noktası son parça dışında tam 6 MB'lık parçalar bekler
+PARCA_BOYUTU = 6 * 1024 * 1024
+
+
+class YuklemeHatasi(Exception):
+    """Dosya, tüm denemelere rağmen Storage'a yüklenemedi"""
+
+
+def _metadata(**alanlar):
+    return ",".join(f"{k} {base64.b64encode(v.encode('utf-8')).decode('ascii')}" for k, v in alanlar.items())
+
+
+class TusYukleyici:
+    """Supabase Storage'a TUS (resumable upload) protokolüyle parça parça yükleme.
+
+    Dosya diskten PARCA_BOYUTU'luk parçalarla okunur; bellekte en fazla bir parça durur.
+    Ağ hatası veya 5xx/409'da sunucudaki konum (HEAD) okunup yalnızca eksik kısım yeniden
+    gönderilir; yüklemeyi başlatan istek de geçici hatalarda yeniden denenir. Ardışık hatalarda
+    jitter'lı üstel bekleme yapılır.
+    """
+
+    def __init__(self, oturum, supabase_url, anahtar, parca_boyutu=PARCA_BOYUTU, maks_deneme=5, zaman_asimi=60):
+        self.oturum = oturum
+        self.uc_nokta = f"{supabase_url.rstrip('/')}/storage/v1/upload/resumable"
+        self.anahtar = anahtar
+        self.parca_boyutu = parca_boyutu
+        self.maks_deneme = maks_deneme
+        self.zaman_asimi = zaman_asimi
+
+    def _basliklar(self, **ek):
+        return {
+            "Authorization": f"Bearer {self.anahtar}",
+            "apikey": self.anahtar,
+            "Tus-Resumable": "1.0.0",
+            **ek,
+        }
+
+    def _bekle(self, ardisik_hata, hata):
+        """Deneme hakkı bittiyse fırlatır, yoksa jitter'lı üstel bekler"""
+        if ardisik_hata > self.maks_deneme:
+            raise YuklemeHatasi(f"Yükleme {self.maks_deneme} denemede tamamlanamadı: {hata}")
+        time.sleep(random.uniform(0, min(30, 2 ** ardisik_hata)))
+
+    def _baslat(self, kova, nesne_yolu, boyut, icerik_turu):
+        ardisik_hata = 0
+        while True:
+            try:
+                yanit = self.oturum.post(self.uc_nokta, headers=self._basliklar(**{
+                    "Upload-Length": str(boyut),
+                    "Upload-Metadata": _metadata(
+                        bucketName=kova, objectName=nesne_yolu, contentType=icerik_turu, cacheControl="3600"
+                    ),
+                    # Yeniden denenen görev aynı adı yeniden yükleyebilir
+                    "x-upsert": "true",
+                }), timeout=self.zaman_asimi)
+                if yanit.status_code in (200, 201):
+                    break
+                if yanit.status_code < 500 and yanit.status_code not in (423, 429):
+                    raise YuklemeHatasi(f"Yükleme başlatılamadı: HTTP {yanit.status_code} {yanit.text[:200]}")
+                hata = f"HTTP {yanit.status_code}"
+            except YuklemeHatasi:
+                raise
+            except Exception as e:
+                hata = str(e)
+            ardisik_hata += 1
+            self._bekle(ardisik_hata, f"yükleme başlatılamadı: {hata}")
+
+        konum = yanit.headers.get("Location")
+        if not konum:
+            raise YuklemeHatasi("Yükleme başlatılamadı: Location başlığı yok")
+        # Bazı kurulumlar göreli konum döner
+        return konum if konum.startswith("http") else self.uc_nokta.split("/storage/")[0] + konum
+
+    def _sunucudaki_konum(self, konum):
+        yanit = self.oturum.head(konum, headers=self._basliklar(), timeout=self.zaman_asimi)
+        if yanit.status_code not in (200, 204):
+            raise YuklemeHatasi(f"Yükleme durumu okunamadı: HTTP {yanit.status_code}")
+        return int(yanit.headers["Upload-Offset"])
+
+    def yukle(self, dosya_yolu, kova, nesne_yolu, icerik_turu="application/zip", ilerleme=None):
+        """Dosyayı yükler; ilerleme(gonderilen_bayt, toplam_bayt) her parçadan sonra çağrılır"""
+        boyut = os.path.getsize(dosya_yolu)
+        konum = self._baslat(kova, nesne_yolu, boyut, icerik_turu)
+        gonderilen = 0
+        ardisik_hata = 0
+
+        with open(dosya_yolu, 'rb') as f:
+            while gonderilen < boyut:
+                f.seek(gonderilen)
+                parca = f.read(self.parca_boyutu)
+                try:
+                    yanit = self.oturum.patch(konum, data=parca, headers=self._basliklar(**{
+                        "Upload-Offset": str(gonderilen),
+                        "Content-Type": "application/offset+octet-stream",
+                    }), timeout=self.zaman_asimi)
+                    if yanit.status_code == 204:
+                        gonderilen = int(yanit.headers.get("Upload-Offset", gonderilen + len(parca)))
+                        ardisik_hata = 0
+                        hata = None
+                    elif yanit.status_code < 500 and yanit.status_code not in (409, 423, 429):
+                        raise YuklemeHatasi(f"Parça reddedildi: HTTP {yanit.status_code} {yanit.text[:200]}")
+                    else:
+                        hata = f"HTTP {yanit.status_code}"
+                except YuklemeHatasi:
+                    raise
+                except Exception as e:
+                    hata = str(e)
+
+                if hata is None:
+                    # Geri çağrının fırlattığı hata (ör. görev iptali) yüklemeyi durdurur
+                    if ilerleme:
+                        ilerleme(gonderilen, boyut)
+                    continue
+
+                ardisik_hata += 1
+                self._bekle(ardisik_hata, hata)
+                # Yarım kalan parçanın ne kadarının ulaştığını sunucu söyler
+                try:
+                    gonderilen = self._sunucudaki_konum(konum)
+                except Exception as e:
+                    print(f"Yükleme durumu okunamadı, parça baştan gönderilecek: {str(e)}")
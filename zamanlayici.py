@@ -0,0 +1,130 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+
+class GorevKuyrugu:
+    """Tek bir görevin zamanlayıcıdaki şarkı kuyruğu; ThreadPoolExecutor yerine `with` ile kullanılır.
+
+    Çıkışta henüz başlamamış işler iptal edilir, çalışanların bitmesi beklenir.
+    """
+
+    def __init__(self, zamanlayici, ad, agirlik=1.0):
+        self.zamanlayici = zamanlayici
+        self.ad = ad
+        self.agirlik = agirlik
+        self._isler = deque()       # (Future, fn, args, kwargs)
+        self._calisan = 0
+        self._sanal_zaman = 0.0     # bu kuyruğun sıradaki işinin sanal başlangıç zamanı
+
+    def gonder(self, fn, *args, **kwargs):
+        """İşi kuyruğa ekler; sonucunu taşıyan Future döner"""
+        return self.zamanlayici._ekle(self, fn, args, kwargs)
+
+    def agirlik_ayarla(self, agirlik):
+        with self.zamanlayici._kilit:
+            self.agirlik = agirlik
+
+    def kapat(self):
+        self.zamanlayici._cikar(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.kapat()
+
+
+class AdilZamanlayici:
+    """Tüm görevlerin paylaştığı sabit sayıda işçi (indirme veya kodlama); işleri görevler arasında adil dağıtır.
+
+    Ağırlıklı adil kuyruklama (WFQ): her görev kuyruğu bir sanal zaman taşır, işçi boşalınca
+    sanal zamanı en küçük kuyruğun sıradaki işi alınır ve o kuyruğun zamanı 1/agirlik ilerler.
+    Ağırlıklar eşitken bu round-robin'dir; büyük bir playlist tüm işçileri tutamaz, sonradan
+    gelen küçük görev kendi boyuyla orantılı sürede biter. İş bekleyen bir kuyruk sırasını
+    biriktiremez: yeniden iş geldiğinde zamanı en az o anki sanal zamana çekilir.
+    """
+
+    def __init__(self, isci_sayisi, ad="indirme"):
+        self.isci_sayisi = isci_sayisi
+        # İşçi thread adlarının öneki
+        self.ad = ad
+        self._kilit = threading.Lock()
+        self._is_var = threading.Condition(self._kilit)
+        self._is_bitti = threading.Condition(self._kilit)
+        self._kuyruklar = []
+        self._sanal_zaman = 0.0
+        self._pid = None
+
+    def kuyruk(self, ad, agirlik=1.0):
+        """Görev için yeni bir kuyruk açar"""
+        kuyruk = GorevKuyrugu(self, ad, agirlik)
+        with self._kilit:
+            kuyruk._sanal_zaman = self._sanal_zaman
+            self._kuyruklar.append(kuyruk)
+        return kuyruk
+
+    def bekleyen_is_sayisi(self):
+        with self._kilit:
+            return sum(len(kuyruk._isler) for kuyruk in self._kuyruklar)
+
+    def _baslat(self):
+        """İşçileri bu süreçte ilk işte başlatır (fork sonrası da güvenli; kilit altında çağrılır)"""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        for i in range(self.isci_sayisi):
+            threading.Thread(target=self._isci_dongusu, name=f"{self.ad}-{i}", daemon=True).start()
+
+    def _ekle(self, kuyruk, fn, args, kwargs):
+        is_ = Future()
+        with self._kilit:
+            if kuyruk not in self._kuyruklar:
+                raise RuntimeError("Kapatılmış kuyruğa iş gönderilemez")
+            self._baslat()
+            if not kuyruk._isler:
+                kuyruk._sanal_zaman = max(kuyruk._sanal_zaman, self._sanal_zaman)
+            kuyruk._isler.append((is_, fn, args, kwargs))
+            self._is_var.notify()
+        return is_
+
+    def _sec(self):
+        """Sıradaki işin kuyruğunu seçer (kilit altında çağrılır); iş yoksa None"""
+        secilen = None
+        for kuyruk in self._kuyruklar:
+            if kuyruk._isler and (secilen is None or kuyruk._sanal_zaman < secilen._sanal_zaman):
+                secilen = kuyruk
+        if secilen is not None:
+            self._sanal_zaman = secilen._sanal_zaman
+            secilen._sanal_zaman += 1.0 / secilen.agirlik
+        return secilen
+
+    def _isci_dongusu(self):
+        while True:
+            with self._kilit:
+                kuyruk = self._sec()
+                while kuyruk is None:
+                    self._is_var.wait()
+                    kuyruk = self._sec()
+                is_, fn, args, kwargs = kuyruk._isler.popleft()
+                kuyruk._calisan += 1
+
+            if is_.set_running_or_notify_cancel():
+                try:
+                    is_.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    is_.set_exception(e)
+
+            with self._kilit:
+                kuyruk._calisan -= 1
+                self._is_bitti.notify_all()
+
+    def _cikar(self, kuyruk):
+        with self._kilit:
+            while kuyruk._isler:
+                kuyruk._isler.popleft()[0].cancel()
+            while kuyruk._calisan:
+                self._is_bitti.wait()
+            if kuyruk in self._kuyruklar:
+                self._kuyruklar.remove(kuyruk)